@@ -0,0 +1,420 @@
+"""Importable Smart TV client: many TV sessions from one process, from asyncio or blocking code.
+
+    async with ClientPool() as pool:
+        tv = await pool.session(("127.0.0.1", 65431), device="kitchen")
+        await tv.turn_on()
+        ok, text = await tv.channel_up()
+        replies = await tv.pipeline(["channel up", "channel up", "status"])
+
+    with SmartTvClient() as client:           # the same API, blocking
+        tv = client.session(("127.0.0.1", 65431))
+        ok, text = tv.status()
+
+Every session is one TCP connection, and every connection of a pool is
+served by one asyncio event loop: thousands of sessions cost no threads
+(the blocking SmartTvClient runs that loop in a single background thread).
+Requests are tagged "@<id> <command>", so replies are matched to the
+request that caused them however many are in flight. A session with an
+``on_notification`` callback subscribes to ``topics`` (default: all) on
+every connect, and the untagged "[Notification]" lines go to the callback.
+Commands issued in the same event loop iteration are sent in one write.
+A session that lost its connection reconnects (and reselects its device)
+on the next request, or right away when it has a notification callback;
+requests that were in flight when the connection was lost fail with
+ConnectionError, since the server may or may not have run them.
+
+    python client/SmartTvClient.py --sessions 2000 --fleet   # drive a --fleet server
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from collections import namedtuple
+
+# Reply to one command: ``ok`` is False for the replies the server marks as errors (shown in red)
+Reply = namedtuple("Reply", ["ok", "text"])
+
+ERROR_COLOR = "\033[91m"
+RESET_COLOR = "\033[0m"
+NOTIFICATION = "[Notification]"
+
+
+# ------------------- COMMANDS -------------------
+class _Commands:
+    """Named helpers over ``request``; they return whatever ``request`` returns (a Reply or an awaitable)."""
+
+    def turn_on(self):
+        return self.request("turn on")
+
+    def turn_off(self):
+        return self.request("turn off")
+
+    def status(self):
+        return self.request("status")
+
+    def channel_total(self):
+        return self.request("channel total")
+
+    def channel_active(self):
+        return self.request("channel active")
+
+    def channel_up(self):
+        return self.request("channel up")
+
+    def channel_down(self):
+        return self.request("channel down")
+
+    def set_channel(self, channel: int):
+        return self.request(f"channel set {int(channel)}")
+
+    def heartbeat(self):
+        return self.request("heartbeat")
+
+    def subscribe(self, *topics):
+        return self.request(" ".join(("subscribe",) + topics))
+
+    def unsubscribe(self, *topics):
+        return self.request(" ".join(("unsubscribe",) + topics))
+
+
+# ------------------- ASYNCIO SESSION -------------------
+class TvSession(_Commands):
+    """One remote: a TCP connection to ``address``, optionally bound to a fleet ``device``."""
+
+    # Reconnect attempts per request, and the backoff between them (doubling up to the maximum)
+    RECONNECT_ATTEMPTS = 5
+    RECONNECT_DELAY = 0.05
+    RECONNECT_MAX_DELAY = 2.0
+
+    # Wait for the socket to drain before sending more once this many bytes are unsent
+    WRITE_HIGH_WATER = 64 * 1024
+
+    def __init__(self, address, device=None, on_notification=None, timeout: float = 5.0,
+                 reconnect: bool = True, topics=()):
+        self.address = tuple(address)
+        self.device = device
+        self.on_notification = on_notification  # called with each notification line, on the event loop
+        self.topics = tuple(topics)  # subscribed on connect when there is a callback (empty: all)
+        self.timeout = timeout
+        self.reconnect = reconnect
+        self.connects = 0
+        self.closed = False
+        self._writer = None
+        self._reader_task = None
+        self._resume_task = None
+        self._connect_lock = asyncio.Lock()
+        self._pending = {}  # request id -> future of its Reply
+        self._next_id = 0
+        self._outgoing = []  # encoded commands waiting for the next flush
+        self._last_line = None  # last untagged line that was not a notification ("Server busy ...")
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    async def connect(self):
+        """Connect now (retrying per RECONNECT_* when ``reconnect`` is set); a no-op when connected."""
+        if self._writer is not None:
+            return
+        async with self._connect_lock:
+            delay = self.RECONNECT_DELAY
+            for attempt in range(self.RECONNECT_ATTEMPTS if self.reconnect else 1):
+                if self._writer is not None or self.closed:
+                    break
+                if attempt:
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.RECONNECT_MAX_DELAY)
+                try:
+                    await self._open()
+                    break
+                except (OSError, asyncio.TimeoutError) as e:
+                    error = e
+            else:
+                raise ConnectionError(f"cannot connect to {self.address[0]}:{self.address[1]}: {error}")
+        if self._writer is None:
+            raise ConnectionError("session closed")
+
+    async def _open(self):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(*self.address), self.timeout)
+        self._writer = writer
+        self._reader_task = asyncio.create_task(self._read(reader, writer))
+        self.connects += 1
+        setup = [f"select {self.device}"] if self.device is not None else []
+        if self.on_notification is not None:
+            setup.append(" ".join(("subscribe",) + self.topics))
+        for command in setup:
+            ok, text = await self._send(command)
+            if not ok:
+                self._lost(writer, f"{command} failed: {text}")
+                raise ConnectionError(f"{command} failed: {text}")
+
+    async def request(self, command: str) -> Reply:
+        """Send ``command`` and wait for its reply; other requests may be in flight meanwhile."""
+        if self._writer is None:
+            await self.connect()
+        return await self._send(command)
+
+    async def pipeline(self, commands) -> list:
+        """Send ``commands`` back to back (one write) and return their replies in order."""
+        if self._writer is None:
+            await self.connect()
+        return await asyncio.gather(*(self._send(c) for c in commands))
+
+    async def _send(self, command: str) -> Reply:
+        writer = self._writer
+        if writer is None:
+            raise ConnectionError("not connected")
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        if not self._outgoing:
+            asyncio.get_running_loop().call_soon(self._flush, writer)
+        self._outgoing.append(f"@{request_id} {command}\n".encode("utf-8"))
+        if writer.transport.get_write_buffer_size() > self.WRITE_HIGH_WATER:
+            await writer.drain()
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    def _flush(self, writer):
+        data, self._outgoing = b"".join(self._outgoing), []
+        if writer is self._writer and not writer.is_closing():
+            writer.write(data)
+
+    async def _read(self, reader, writer):
+        reason = "connection closed by the server"
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._on_line(line.decode("utf-8", "replace").rstrip("\r\n"))
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            reason = str(e) or type(e).__name__
+        self._lost(writer, self._last_line or reason)
+
+    def _on_line(self, line: str):
+        if line.startswith("@"):
+            tag, _, text = line.partition(" ")
+            try:
+                future = self._pending.get(int(tag[1:]))
+            except ValueError:
+                return  # "@<id>.<n>": a command inside a batch
+            if future is not None and not future.done():
+                if text.startswith(ERROR_COLOR):
+                    future.set_result(Reply(False, text[len(ERROR_COLOR):].replace(RESET_COLOR, "")))
+                else:
+                    future.set_result(Reply(True, text))
+        elif line.startswith(NOTIFICATION):
+            if self.on_notification is not None:
+                self.on_notification(line[len(NOTIFICATION):].strip())
+        elif line:
+            self._last_line = line
+
+    def _lost(self, writer, reason: str):
+        """Forget ``writer``'s connection; what was in flight on it fails."""
+        if writer is not self._writer:
+            return
+        self._writer = None
+        self._outgoing = []
+        writer.close()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(reason))
+        self._pending.clear()
+        self._last_line = None
+        if self.reconnect and self.on_notification is not None and not self.closed:
+            self._resume_task = asyncio.get_running_loop().create_task(self._resume())
+
+    async def _resume(self):
+        """Reconnect right away, and keep trying, so notifications keep coming."""
+        while not self.closed and self._writer is None:
+            try:
+                await self.connect()
+            except ConnectionError:
+                await asyncio.sleep(self.RECONNECT_MAX_DELAY)
+
+    async def close(self):
+        self.closed = True
+        writer = self._writer
+        if writer is not None:
+            self._lost(writer, "session closed")
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+        if self._resume_task is not None:
+            self._resume_task.cancel()
+        tasks = [t for t in (self._reader_task, self._resume_task) if t is not None]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ------------------- CONNECTION POOL -------------------
+class ClientPool:
+    """Sessions keyed by server address, then by device; asking twice returns the same session."""
+
+    def __init__(self, timeout: float = 5.0, reconnect: bool = True):
+        self.timeout = timeout
+        self.reconnect = reconnect
+        self._sessions = {}  # (host, port) -> {device: TvSession}
+
+    async def session(self, address, device=None, on_notification=None, topics=()) -> TvSession:
+        """The session for ``device`` at ``address``, connected on first use.
+
+        A callback given for a session that already exists replaces its
+        callback (and subscribes it if it had none).
+        """
+        sessions = self._sessions.setdefault(tuple(address), {})
+        session = sessions.get(device)
+        if session is None or session.closed:
+            session = TvSession(address, device, on_notification, self.timeout, self.reconnect, topics)
+            sessions[device] = session
+        elif on_notification is not None:
+            subscribe = session.on_notification is None and session.connected
+            session.on_notification = on_notification
+            if subscribe:
+                session.topics = tuple(topics)
+                await session.subscribe(*session.topics)
+        await session.connect()
+        return session
+
+    def sessions(self, address=None) -> list:
+        if address is not None:
+            return list(self._sessions.get(tuple(address), {}).values())
+        return [s for by_device in self._sessions.values() for s in by_device.values()]
+
+    async def discard(self, session: TvSession):
+        """Close ``session`` and drop it from the pool."""
+        by_device = self._sessions.get(session.address, {})
+        if by_device.get(session.device) is session:
+            del by_device[session.device]
+        await session.close()
+
+    async def close(self):
+        sessions = self.sessions()
+        self._sessions.clear()
+        await asyncio.gather(*(s.close() for s in sessions))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+# ------------------- BLOCKING API -------------------
+class RemoteControl(_Commands):
+    """Blocking face of a TvSession; every call runs on the client's event loop thread."""
+
+    def __init__(self, client, session: TvSession):
+        self._client = client
+        self.session = session
+
+    def request(self, command: str) -> Reply:
+        return self._client.call(self.session.request(command))
+
+    def submit(self, command: str):
+        """Send ``command`` without waiting; returns a concurrent.futures.Future of its Reply."""
+        return asyncio.run_coroutine_threadsafe(self.session.request(command), self._client.loop)
+
+    def pipeline(self, commands) -> list:
+        return self._client.call(self.session.pipeline(commands))
+
+    def close(self):
+        self._client.call(self._client.pool.discard(self.session))
+
+
+class SmartTvClient:
+    """A ClientPool for blocking code: its event loop runs in one background thread.
+
+    Notification callbacks run on that thread, so they should hand work
+    off rather than block.
+    """
+
+    def __init__(self, timeout: float = 5.0, reconnect: bool = True):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="smarttv-client", daemon=True)
+        self._thread.start()
+        self.pool = self.call(self._make_pool(timeout, reconnect))
+
+    @staticmethod
+    async def _make_pool(timeout, reconnect):
+        return ClientPool(timeout, reconnect)
+
+    def call(self, coro):
+        """Run ``coro`` on the client's loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def session(self, address, device=None, on_notification=None, topics=()) -> RemoteControl:
+        return RemoteControl(self, self.call(self.pool.session(address, device, on_notification, topics)))
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+        self.call(self.pool.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------- DEMO / SELF-CHECK -------------------
+async def drive(address, sessions: int, fleet: bool, rounds: int) -> dict:
+    """Ask the pool for ``sessions`` sessions (one device each in fleet mode) and surf channels on all of them."""
+    notifications = 0
+
+    def count(_):
+        nonlocal notifications
+        notifications += 1
+
+    async with ClientPool() as pool:
+        start = time.perf_counter()
+        remotes = await asyncio.gather(*(
+            pool.session(address, f"tv{n}" if fleet else None, count) for n in range(sessions)))
+        connected = time.perf_counter() - start
+
+        await asyncio.gather(*(r.turn_on() for r in (remotes if fleet else remotes[:1])))
+        start = time.perf_counter()
+        replies = await asyncio.gather(*(
+            r.pipeline([f"channel set {1 + n % 100}"] + ["channel up"] * rounds + ["channel active"])
+            for n, r in enumerate(remotes)))
+        elapsed = time.perf_counter() - start
+        if fleet:  # every device is driven by exactly one session, so its final channel is known
+            for n, reply in enumerate(replies):
+                assert reply[-1] == Reply(True, f"Active channel: {1 + n % 100 + rounds}"), (n, reply[-1])
+        requests = sum(len(r) for r in replies)
+        failed = sum(1 for r in replies for ok, _ in r if not ok)
+        return {
+            "sessions": sessions,
+            "connections": len(pool.sessions()),  # without --fleet every session is the same one
+            "threads": threading.active_count(),
+            "connect_s": round(connected, 3),
+            "requests": requests,
+            "failed": failed,
+            "requests_per_s": round(requests / elapsed),
+            "notifications": notifications,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=65431)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=10, help="pipelined channel ups per session")
+    parser.add_argument("--fleet", action="store_true", help="one device per session (server runs --fleet)")
+    args = parser.parse_args()
+    print(asyncio.run(drive((args.host, args.port), args.sessions, args.fleet, args.rounds)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""Headless load generator for the Smart TV server.
+
+Opens N remotes over TCP and/or UDP, replays a command mix for a fixed
+time and prints one JSON report per (transport, mix) run:
+
+    python client/SmartTvLoadGenerator.py --remotes 100 --duration 10 --mix channel-surf
+    python client/SmartTvLoadGenerator.py --transport tcp --transport udp --mix all -o results.json
+
+Every command is tagged with a request id ("@<id> <command>"), so replies are
+matched to requests even when ``--depth`` commands are in flight. Latency is
+measured from send to reply. Notification lag is measured from the send of
+the command that produced a channel to the arrival of the notification for
+that channel at every other remote.
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import random
+import socket
+import sys
+import time
+from collections import defaultdict
+
+from SmartTvRemoteClient import open_socket, encode_command
+
+PROTOCOLS = {"tcp": socket.SOCK_STREAM, "udp": socket.SOCK_DGRAM}
+
+# Command mixes: (weight, command). "{channel}" is replaced by a random channel.
+# "senders" is the share of remotes that send commands; the others only listen.
+MIXES = {
+    "status-heavy": {
+        "commands": [(80, "status"), (15, "channel active"), (5, "channel total")],
+        "senders": 1.0,
+    },
+    "channel-surf": {
+        "commands": [(40, "channel up"), (40, "channel down"), (10, "channel set {channel}"), (10, "status")],
+        "senders": 1.0,
+    },
+    "broadcast-storm": {
+        "commands": [(1, "channel set {channel}")],
+        "senders": 0.1,
+    },
+}
+
+CHANNELS = 120
+NOTIFICATION = b"[Notification]"
+ERROR_COLOR = b"\033[91m"
+CHANNEL_CHANGES = (b"Channel went up to", b"Channel went down to", b"Active channel set to:")
+
+
+# ------------------- Statistics -------------------
+def percentile(samples, pct: float):
+    """Nearest-rank percentile of already sorted ``samples`` (``pct`` in 0-100)."""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, round(pct / 100 * len(samples)) - 1))
+    return samples[rank]
+
+
+def summarize_ms(samples) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50": round(percentile(ordered, 50) * 1000, 3),
+        "p95": round(percentile(ordered, 95) * 1000, 3),
+        "p99": round(percentile(ordered, 99) * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+class RunStats:
+    def __init__(self):
+        self.latencies = []
+        self.rejected = 0
+        self.timeouts = 0
+        self.changes = defaultdict(list)  # channel -> send times of the commands that set it
+        self.arrivals = []                 # (channel, arrival time) per received notification
+
+    def notification_lags(self):
+        """Lag of every notification behind the latest change to its channel sent before it arrived."""
+        for times in self.changes.values():
+            times.sort()
+        lags = []
+        for channel, arrived in self.arrivals:
+            times = self.changes.get(channel)
+            if times:
+                i = bisect.bisect_right(times, arrived) - 1
+                if i >= 0:
+                    lags.append(arrived - times[i])
+        return lags
+
+
+# ------------------- Remote -------------------
+class Remote:
+    """One simulated remote: a sender coroutine and a reader coroutine sharing one socket."""
+
+    def __init__(self, protocol, address, stats: RunStats, depth: int, timeout: float):
+        self.protocol = protocol
+        self.address = address
+        self.stats = stats
+        self.timeout = timeout
+        self.sock = open_socket(protocol, address)
+        self.sock.setblocking(False)
+        self.window = asyncio.Semaphore(depth)
+        self.pending = {}  # request id -> (send time, command)
+        self.next_id = 0
+
+    async def send(self, command: str):
+        loop = asyncio.get_running_loop()
+        data = encode_command(self.protocol, command)
+        if self.protocol == socket.SOCK_STREAM:
+            await loop.sock_sendall(self.sock, data)
+        else:
+            await loop.sock_sendto(self.sock, data, self.address)
+
+    async def run_sender(self, pick, deadline: float, think: float):
+        while time.perf_counter() < deadline:
+            try:
+                await asyncio.wait_for(self.window.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self._expire()
+                continue
+            self.next_id += 1
+            command = pick()
+            self.pending[self.next_id] = (time.perf_counter(), command)
+            await self.send(f"@{self.next_id} {command}")
+            if think:
+                await asyncio.sleep(think)
+
+    async def run_reader(self):
+        loop = asyncio.get_running_loop()
+        buf = b""
+        while True:
+            if self.protocol == socket.SOCK_STREAM:
+                data = await loop.sock_recv(self.sock, 65536)
+                if not data:
+                    return
+                *lines, buf = (buf + data).split(b"\n")
+            else:
+                data, _ = await loop.sock_recvfrom(self.sock, 65536)
+                lines = data.split(b"\n")
+            now = time.perf_counter()
+            for line in lines:
+                if line:
+                    self._on_line(line, now)
+
+    def _on_line(self, line: bytes, now: float):
+        if line.startswith(NOTIFICATION):
+            value = line.rsplit(b" ", 1)[1]
+            if value.isdigit():  # channel changes; power notifications end in on/off
+                self.stats.arrivals.append((int(value), now))
+            return
+        if not line.startswith(b"@"):
+            return
+        tag, _, text = line.partition(b" ")
+        entry = self.pending.pop(int(tag[1:]), None)
+        if entry is None:
+            return  # already counted as a timeout
+        sent, _ = entry
+        self.stats.latencies.append(now - sent)
+        if text.startswith(ERROR_COLOR):
+            self.stats.rejected += 1
+        elif text.startswith(CHANNEL_CHANGES):
+            self.stats.changes[int(text.rsplit(b" ", 1)[1])].append(sent)
+        self.window.release()
+
+    def _expire(self):
+        """Give up on requests older than the timeout (lost UDP datagrams) and free their slots."""
+        cutoff = time.perf_counter() - self.timeout
+        for request_id, (sent, _) in list(self.pending.items()):
+            if sent < cutoff:
+                del self.pending[request_id]
+                self.stats.timeouts += 1
+                self.window.release()
+
+    def close(self):
+        self.sock.close()
+
+
+# ------------------- Runs -------------------
+def command_picker(mix: dict, rng: random.Random):
+    weights = [w for w, _ in mix["commands"]]
+    commands = [c for _, c in mix["commands"]]
+
+    def pick():
+        command = rng.choices(commands, weights)[0]
+        return command.format(channel=rng.randint(1, CHANNELS)) if "{" in command else command
+    return pick
+
+
+async def run_load(transport: str, address, mix_name: str, mix: dict, remotes: int, duration: float,
+                   depth: int, think: float, timeout: float, seed: int) -> dict:
+    protocol = PROTOCOLS[transport]
+    stats = RunStats()
+    rng = random.Random(seed)
+    clients = [Remote(protocol, address, stats, depth, timeout) for _ in range(remotes)]
+    readers = [asyncio.create_task(c.run_reader()) for c in clients]
+
+    # Every remote subscribes to channel changes (UDP remotes only receive notifications
+    # after sending something) and the TV is turned on so channel commands succeed. Not measured.
+    for c in clients:
+        await c.send("subscribe channel")
+    await clients[0].send("turn on")
+    await asyncio.sleep(0.2)
+
+    senders = clients[:max(1, round(remotes * mix["senders"]))]
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(c.run_sender(command_picker(mix, rng), deadline, think) for c in senders))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(min(timeout, 0.5))  # let in-flight replies and notifications arrive
+    for r in readers:
+        r.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+    for c in clients:
+        c.close()
+
+    lags = stats.notification_lags()
+    return {
+        "transport": transport,
+        "mix": mix_name,
+        "remotes": remotes,
+        "senders": len(senders),
+        "depth": depth,
+        "duration_s": round(elapsed, 3),
+        "requests": len(stats.latencies),
+        "rejected": stats.rejected,
+        "timeouts": stats.timeouts,
+        "throughput_rps": round(len(stats.latencies) / elapsed, 1),
+        "latency_ms": summarize_ms(stats.latencies),
+        "notifications": {
+            "received": len(stats.arrivals),
+            "matched": len(lags),
+            "lag_ms": summarize_ms(lags),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=65431)
+    parser.add_argument("--udp-port", type=int, help="UDP server port (default: --port)")
+    parser.add_argument("--transport", choices=sorted(PROTOCOLS), action="append")
+    parser.add_argument("--mix", choices=sorted(MIXES) + ["all"], default="status-heavy")
+    parser.add_argument("--remotes", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--depth", type=int, default=1, help="commands in flight per remote")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds between a remote's commands")
+    parser.add_argument("--timeout", type=float, default=2.0, help="seconds before a request counts as lost")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    mixes = sorted(MIXES) if args.mix == "all" else [args.mix]
+    results = []
+    for transport in args.transport or ["tcp"]:
+        port = (args.udp_port or args.port) if transport == "udp" else args.port
+        for mix in mixes:
+            results.append(asyncio.run(run_load(
+                transport, (args.host, port), mix, MIXES[mix], args.remotes, args.duration,
+                args.depth, args.think, args.timeout, args.seed,
+            )))
+
+    report = json.dumps(results if len(results) > 1 else results[0], indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    return 0 if all(r["requests"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -30,6 +30,24 @@ def choose_protocol():
         print("Invalid choice. Please enter 1 or 2.")
 
 
+# ------------------- Connection -------------------
+def open_socket(protocol, address):
+    """Connect a TCP socket to ``address``, or bind a UDP socket to a free local port."""
+    s = socket.socket(socket.AF_INET, protocol)
+    if protocol == socket.SOCK_STREAM:
+        s.connect(address)
+    else:
+        s.bind(("", 0))
+    return s
+
+
+def encode_command(protocol, cmd: str) -> bytes:
+    """Wire form of a command: TCP is a byte stream, so commands are newline-terminated."""
+    if protocol == socket.SOCK_STREAM:
+        return (cmd + "\n").encode("utf-8")
+    return cmd.encode("utf-8")
+
+
 # ------------------- Listener Threads -------------------
 def tcp_listener(sock):
     """Continuously listen for TCP server messages."""
@@ -73,20 +91,20 @@ def main():
         try:
             host, port_str = addr_input.split(":")
             address = (host, int(port_str))
-            s = socket.socket(socket.AF_INET, protocol)
+            s = open_socket(protocol, address)
 
             # --- TCP ---
             if protocol == socket.SOCK_STREAM:
-                s.connect(address)
                 print(f"Connected to {address} via TCP.")
                 threading.Thread(target=tcp_listener, args=(s,), daemon=True).start()
 
             # --- UDP ---
             else:
-                s.bind(("", 0))
                 local_addr = s.getsockname()
                 print(f"UDP client bound to {local_addr}, sending to {address}")
                 threading.Thread(target=udp_listener, args=(s,), daemon=True).start()
+                # The server only notifies UDP remotes it has heard from
+                s.sendto(encode_command(protocol, "status"), address)
 
             # --- Main input loop ---
             while True:
@@ -102,16 +120,16 @@ def main():
                     safe_print("Closing connection...")
                     if protocol == socket.SOCK_STREAM:
                         try:
-                            s.sendall(cmd.encode("utf-8"))
+                            s.sendall(encode_command(protocol, cmd))
                         except Exception:
                             pass
                     break
 
                 try:
                     if protocol == socket.SOCK_STREAM:
-                        s.sendall(cmd.encode("utf-8"))
+                        s.sendall(encode_command(protocol, cmd))
                     else:
-                        s.sendto(cmd.encode("utf-8"), address)
+                        s.sendto(encode_command(protocol, cmd), address)
                 except Exception as e:
                     safe_print(f"[Error] Failed to send: {e}")
                     break
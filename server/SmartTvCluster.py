@@ -0,0 +1,125 @@
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from SmartTvLogic import SmartTV, TvState, channel_messages
+from SmartTvTcpServer import SmartTVServer
+from transport.TcpTransport import TcpTransport
+from transport.UdpTransport import UdpTransport
+from transport.AsyncioTransport import AsyncioTcpTransport, AsyncioUdpTransport
+from transport.BatchedUdpTransport import BatchedUdpTransport
+
+TRANSPORTS = {
+    "tcp": TcpTransport,
+    "udp": UdpTransport,
+    "batched-udp": BatchedUdpTransport,
+    "asyncio-tcp": AsyncioTcpTransport,
+    "asyncio-udp": AsyncioUdpTransport,
+}
+
+
+# ------------------- SHARED TV STATE -------------------
+class SharedSmartTV(SmartTV):
+    """SmartTV whose state lives in shared memory, visible to every worker process.
+
+    Writers and readers take one process-shared lock, so the three state
+    fields are always read and replaced together.
+    """
+
+    def __init__(self, available_channels):
+        self.available_channels = available_channels
+        self.messages = channel_messages(available_channels)
+        self._fields = multiprocessing.RawArray("i", [0, 1, 0])  # is_on, active_channel, version
+        self._lock = multiprocessing.RLock()
+
+    @property
+    def state(self) -> TvState:
+        with self._lock:
+            is_on, channel, version = self._fields
+        return TvState(bool(is_on), channel, version)
+
+    def _commit(self, state: TvState, **changes) -> TvState:
+        new = state._replace(version=state.version + 1, **changes)
+        self._fields[:] = [int(new.is_on), new.active_channel, new.version]
+        return new
+
+
+# ------------------- CROSS-WORKER BROADCAST -------------------
+class ClusterBus:
+    """Forwards encoded notifications between worker processes, one inbox queue per worker."""
+
+    def __init__(self, inboxes, index: int):
+        self.inboxes = inboxes
+        self.index = index
+
+    def forward(self, payloads, topic=None):
+        for i, inbox in enumerate(self.inboxes):
+            if i != self.index:
+                inbox.put((topic, payloads))
+
+    def listen(self, server: SmartTVServer):
+        threading.Thread(target=self._listen_loop, args=(server,), name="cluster-bus", daemon=True).start()
+
+    def _listen_loop(self, server):
+        inbox = self.inboxes[self.index]
+        while True:
+            message = inbox.get()
+            if message is None:
+                break
+            topic, payloads = message
+            server.deliver_remote(payloads, topic)
+
+
+# ------------------- PRE-FORK WORKERS -------------------
+def _worker(index, host, port, transport_name, available_channels, smart_tv, inboxes):
+    transport = TRANSPORTS[transport_name](host, port, None, reuse_port=True)
+    server = SmartTVServer(transport, available_channels, smart_tv=smart_tv)
+    transport.server = server
+    server.cluster = ClusterBus(inboxes, index)
+    server.cluster.listen(server)
+    server.log.info("worker_started", worker=index, pid=os.getpid())
+    server.start()
+
+
+def run_prefork(host, port, workers, transport_name="tcp", available_channels=120):
+    """Start ``workers`` processes that all bind ``host:port`` with SO_REUSEPORT.
+
+    The kernel spreads connections (or datagrams) across the workers; TV state
+    is shared and broadcasts reach clients on every worker.
+    """
+    smart_tv = SharedSmartTV(available_channels)
+    inboxes = [multiprocessing.Queue() for _ in range(workers)]
+    procs = [
+        multiprocessing.Process(
+            target=_worker,
+            args=(i, host, port, transport_name, available_channels, smart_tv, inboxes),
+            name=f"smarttv-worker-{i}",
+        )
+        for i in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    # Installed after forking so only the parent turns SIGTERM into a clean exit.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            p.terminate()
+    return procs
+
+
+# ------------------- ENTRY POINT -------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Smart TV server as N SO_REUSEPORT worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=65431)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), default="asyncio-tcp")
+    args = parser.parse_args()
+    run_prefork(args.host, args.port, args.workers, args.transport)
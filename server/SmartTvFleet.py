@@ -0,0 +1,77 @@
+import threading
+from SmartTvLogic import SmartTV
+from helpers.FanOut import FanOut
+from helpers.SubscriberRegistry import SubscriberRegistry
+from helpers.NotificationCoalescer import NotificationCoalescer
+from helpers.ProtocolConfig import Protocol
+from helpers.TopicIndex import TopicIndex
+
+
+class Device:
+    """One hosted TV together with its clients, its topic subscribers and notification coalescer.
+
+    ``tcp_clients`` and ``udp_clients`` are the remotes using the TV;
+    notifications only go to the subscribers of their topic.
+    """
+
+    def __init__(self, device_id, smart_tv, server, tcp_clients=None, udp_clients=None):
+        self.id = device_id
+        self.smart_tv = smart_tv
+        # FanOut defines __len__, so an empty one is falsy; compare with None.
+        if tcp_clients is None:
+            tcp_clients = FanOut(server._deliver_tcp)
+        if udp_clients is None:
+            udp_clients = SubscriberRegistry(server._deliver_udp, server.UDP_CLIENT_TTL)
+        self.tcp_clients = tcp_clients
+        self.udp_clients = udp_clients
+        self.tcp_topics = TopicIndex(Protocol.TOPICS, lambda: FanOut(server._deliver_tcp))
+        self.udp_topics = TopicIndex(
+            Protocol.TOPICS, lambda: SubscriberRegistry(server._deliver_udp, server.UDP_CLIENT_TTL))
+        self.channel_notifications = NotificationCoalescer(
+            server.NOTIFICATION_WINDOW,
+            lambda message, exclude=None: server.broadcast(message, exclude=exclude, device=self, topic="channel"),
+            server._call_later,
+        )
+        if server.state_store is not None:
+            server.state_store.attach(device_id, smart_tv)
+
+
+class DeviceFleet:
+    """Devices keyed by id, spread over shards that each have their own lock.
+
+    Lookups of existing devices take no lock; creating a device only locks
+    its shard. Each device's SmartTV has its own state lock, so commands for
+    different devices never contend.
+    """
+
+    def __init__(self, server, available_channels: int, shards: int = 64, max_devices: int = 100_000):
+        self.server = server
+        self.available_channels = available_channels
+        self.max_devices = max_devices
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self._count = 0
+        self._count_lock = threading.Lock()
+
+    def get(self, device_id, create: bool = True):
+        """Return the device for ``device_id``, creating it on first use (None when full)."""
+        devices, lock = self._shards[hash(device_id) % len(self._shards)]
+        device = devices.get(device_id)
+        if device is not None or not create:
+            return device
+        with lock:
+            device = devices.get(device_id)
+            if device is None:
+                with self._count_lock:
+                    if self._count >= self.max_devices:
+                        return None
+                    self._count += 1
+                device = Device(device_id, SmartTV(self.available_channels), self.server)
+                devices[device_id] = device
+        return device
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for devices, _ in self._shards:
+            yield from list(devices.values())
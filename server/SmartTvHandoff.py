@@ -0,0 +1,165 @@
+"""Zero-downtime restart: a new server process takes over the listening socket and TV state.
+
+    python SmartTvHandoff.py --transport asyncio-tcp               # first start
+    python SmartTvHandoff.py --transport asyncio-tcp --takeover    # replace the running server
+
+The serving process listens on a Unix socket (``--handoff-path``). A process
+started with ``--takeover`` connects to it and the two exchange:
+
+    new -> old   "takeover <transport>"
+    old -> new   the bound listening socket (SCM_RIGHTS)
+    new -> old   "prepared"            (the old process keeps serving until here)
+    old -> new   state snapshot        (after it stopped accepting and reading commands)
+    new -> old   "ready"               (serving on the inherited socket)
+
+The listening socket is never closed, so connections that arrive during
+the exchange wait in its backlog instead of being refused. The old process
+then drains its own clients (see SmartTVServer.shutdown) and exits; those
+remotes reconnect and land on the new process. If the new process fails
+before "prepared", the old one carries on as if nothing happened.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+from SmartTvTcpServer import SmartTVServer
+from SmartTvCluster import TRANSPORTS
+from helpers.TraceLog import TraceRecorder
+
+HANDOFF_PATH = "/tmp/smarttv-handoff.sock"
+HANDOFF_TIMEOUT = 10.0  # seconds either side waits for the other's next message
+
+_LENGTH = struct.Struct("!I")  # prefix of the JSON state snapshot
+
+
+# ------------------- SERVING SIDE -------------------
+class HandoffListener:
+    """Answers takeover requests for a running server; the first that succeeds stops it."""
+
+    def __init__(self, server: SmartTVServer, transport_name: str, path: str = HANDOFF_PATH):
+        self.server = server
+        self.transport_name = transport_name
+        self.path = path
+        self.quiesced = False
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if os.path.exists(path):
+            os.unlink(path)  # stale, or left behind by the process this one took over from
+        self.sock.bind(path)
+        self.sock.listen(1)
+
+    def start(self):
+        threading.Thread(target=self._serve, name="handoff", daemon=True).start()
+
+    def _serve(self):
+        while True:
+            conn, _ = self.sock.accept()
+            with conn:
+                conn.settimeout(HANDOFF_TIMEOUT)
+                try:
+                    self._hand_over(conn)
+                except (OSError, ValueError) as e:
+                    self.server.log.error("handoff_failed", error=str(e), quiesced=self.quiesced)
+            if self.quiesced:
+                # Handed over, or failed too late to take it back: this process is done.
+                self.sock.close()
+                self.server.shutdown()
+                return
+
+    def _hand_over(self, conn):
+        reader = conn.makefile("rb")
+        request = reader.readline().split()
+        if request != [b"takeover", self.transport_name.encode()]:
+            conn.sendall(f"error expected 'takeover {self.transport_name}'\n".encode())
+            return
+        if not self.server.transport.ready.wait(HANDOFF_TIMEOUT):
+            conn.sendall(b"error server not listening yet\n")
+            return
+        socket.send_fds(conn, [b"F"], [self.server.transport.listener.fileno()])
+        if reader.readline().strip() != b"prepared":
+            self.server.log.warning("handoff_abandoned")
+            return
+
+        # From here on the new process owns the state: stop changing it, then send it.
+        self.quiesced = True
+        self.server.quiesce()
+        deadline = time.monotonic() + self.server.DRAIN_TIMEOUT
+        while self.server.tcp_clients and time.monotonic() < deadline:
+            time.sleep(0.005)  # sessions leave once they have processed what they already read
+        snapshot = json.dumps(self.server.snapshot_state()).encode("utf-8")
+        conn.sendall(_LENGTH.pack(len(snapshot)) + snapshot)
+        if reader.readline().strip() != b"ready":
+            raise ValueError("new process did not report ready")
+        self.server.log.info("handed_over")
+
+
+# ------------------- TAKING OVER -------------------
+def take_over(transport_name: str, path: str = HANDOFF_PATH):
+    """Ask the running server for its listening socket; returns ``(socket, control connection)``."""
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(HANDOFF_TIMEOUT)
+    conn.connect(path)
+    conn.sendall(f"takeover {transport_name}\n".encode())
+    msg, fds, _, _ = socket.recv_fds(conn, 256, 1)
+    if not fds:
+        raise RuntimeError(f"takeover refused: {msg.decode(errors='replace').strip()}")
+    return socket.socket(fileno=fds[0]), conn
+
+
+def receive_state(conn) -> dict:
+    """Send "prepared" and read the old process's state snapshot."""
+    conn.sendall(b"prepared\n")
+    reader = conn.makefile("rb")
+    (length,) = _LENGTH.unpack(reader.read(_LENGTH.size))
+    return json.loads(reader.read(length))
+
+
+def _report_ready(server, conn, listener_args):
+    server.transport.ready.wait()
+    conn.sendall(b"ready\n")
+    conn.close()
+    HandoffListener(server, *listener_args).start()
+
+
+# ------------------- ENTRY POINT -------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=65431)
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), default="asyncio-tcp")
+    parser.add_argument("--channels", type=int, default=120)
+    parser.add_argument("--fleet", action="store_true", help="host many TVs (select <id>)")
+    parser.add_argument("--handoff-path", default=HANDOFF_PATH)
+    parser.add_argument("--takeover", action="store_true", help="replace the server running on --handoff-path")
+    parser.add_argument("--trace", help="record incoming traffic to this file (replay it with SmartTvReplay.py)")
+    args = parser.parse_args()
+
+    transport = TRANSPORTS[args.transport](args.host, args.port, None)
+    trace = TraceRecorder(args.trace) if args.trace else None
+    server = SmartTVServer(transport, available_channels=args.channels, fleet=args.fleet, trace=trace)
+    transport.server = server
+    listener_args = (args.transport, args.handoff_path)
+
+    if args.takeover:
+        try:
+            transport.inherited_socket, conn = take_over(args.transport, args.handoff_path)
+        except (OSError, RuntimeError) as e:
+            server.log.error("takeover_failed", error=str(e))
+            return 1
+        server.restore_state(receive_state(conn))
+        threading.Thread(target=_report_ready, args=(server, conn, listener_args), daemon=True).start()
+    else:
+        HandoffListener(server, *listener_args).start()  # waits for the transport to be listening
+
+    # SIGTERM drains and stops; shutdown() blocks, so it runs in its own thread.
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    server.start()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,48 +1,148 @@
 # Business logic for the smart tv
+import functools
+import threading
+from collections import namedtuple
+
+# Immutable snapshot of the TV; version increases by one on every change.
+TvState = namedtuple("TvState", ["is_on", "active_channel", "version"])
+
+# Prebuilt reply strings for one channel count; the lists are indexed by channel
+ChannelMessages = namedtuple("ChannelMessages", ["went_up", "went_down", "set_to", "active", "total", "highest"])
+
+
+@functools.lru_cache(maxsize=None)
+def channel_messages(available_channels: int) -> ChannelMessages:
+    """Build the channel reply strings once per channel count; every TV with that count shares them."""
+    channels = range(available_channels + 1)
+    return ChannelMessages(
+        went_up=[f"Channel went up to {n}" for n in channels],
+        went_down=[f"Channel went down to {n}" for n in channels],
+        set_to=[f"Active channel set to: {n}" for n in channels],
+        active=[f"Active channel: {n}" for n in channels],
+        total=f"Total number of channels: {available_channels}",
+        highest=f"Channel cannot go any higher than channel {available_channels}",
+    )
+
+
 class SmartTV:
+    """Smart TV state engine.
+
+    The current state is one immutable ``TvState`` that writers replace under
+    a lock, so readers just load the reference and never block. Every
+    operation returns ``(ok, message, state)`` where ``state`` is the snapshot
+    the operation produced (or observed), so callers never need a second read.
+    Messages are prebuilt strings wherever the set of possible replies is bounded.
+    """
+
+    # Called with every new snapshot, under the state lock (see helpers.StateStore)
+    on_change = None
+    # Fields compare_and_set may change; the version is always the engine's
+    SETTABLE = frozenset({"is_on", "active_channel"})
+
     def __init__(self, available_channels):
-        self.is_on = False
         self.available_channels = available_channels
-        self.active_channel = 1
-    
+        self.messages = channel_messages(available_channels)
+        self._lock = threading.Lock()
+        self._state = TvState(is_on=False, active_channel=1, version=0)
+
+    # ------------------- SNAPSHOT ACCESS -------------------
+
+    @property
+    def state(self) -> TvState:
+        return self._state
+
+    @property
+    def is_on(self):
+        return self.state.is_on
+
+    @property
+    def active_channel(self):
+        return self.state.active_channel
+
+    def _commit(self, state: TvState, **changes) -> TvState:
+        """Publish a new snapshot derived from ``state``; caller holds the lock."""
+        new = state._replace(version=state.version + 1, **changes)
+        self._state = new
+        if self.on_change is not None:
+            self.on_change(new)
+        return new
+
+    def compare_and_set(self, expected_version: int, **changes):
+        """Apply ``changes`` (``is_on``, ``active_channel``) only if the state is still at ``expected_version``.
+
+        Returns ``(ok, state)``: the new snapshot on success, the current one
+        if another writer got there first. Unknown fields (``version``
+        included) raise TypeError and invalid values raise ValueError, so a
+        bad request is never mistaken for a lost race.
+        """
+        unknown = changes.keys() - self.SETTABLE
+        if unknown:
+            raise TypeError(f"Cannot set {', '.join(sorted(unknown))}")
+        if "is_on" in changes and not isinstance(changes["is_on"], bool):
+            raise ValueError(f"is_on must be True or False, not {changes['is_on']!r}")
+        channel = changes.get("active_channel", 1)
+        if type(channel) is not int or not 1 <= channel <= self.available_channels:
+            raise ValueError(f"Channel {channel!r} is out of range, valid range: 1-{self.available_channels}")
+        with self._lock:
+            state = self.state
+            if state.version != expected_version:
+                return False, state
+            return True, self._commit(state, **changes)
+
+    def restore(self, snapshot: TvState) -> TvState:
+        """Take over a state saved elsewhere (hot restart); the version moves on from the snapshot's."""
+        with self._lock:
+            return self._commit(snapshot)
+
+    # ------------------- OPERATIONS -------------------
+
     def turnOn(self):
-        if self.is_on:
-            return False, "Smart TV is already turned on"
-        self.is_on = True
-        return True, "Smart TV is turned on"
-    
+        with self._lock:
+            state = self.state
+            if state.is_on:
+                return False, "Smart TV is already turned on", state
+            return True, "Smart TV is turned on", self._commit(state, is_on=True)
+
     def turnOff(self):
-        if not self.is_on:
-            return False, "Smart TV is already turned off"
-        self.is_on = False
-        return True, "Smart TV is turned off"
-    
+        with self._lock:
+            state = self.state
+            if not state.is_on:
+                return False, "Smart TV is already turned off", state
+            return True, "Smart TV is turned off", self._commit(state, is_on=False)
+
     def getNumberOfChannels(self):
-        if not self.is_on:
-            return False, "Smart TV is off | Unable to complete this request"
-        return True, f"Total number of channels: {self.available_channels}"
+        state = self.state
+        if not state.is_on:
+            return False, "Smart TV is off | Unable to complete this request", state
+        return True, self.messages.total, state
 
     def getChannel(self):
-        if not self.is_on:
-            return False, "Smart TV is off | Unable to complete this request"
-        return True, f"Active channel: {self.active_channel}"
-    
+        state = self.state
+        if not state.is_on:
+            return False, "Smart TV is off | Unable to complete this request", state
+        return True, self.messages.active[state.active_channel], state
+
     def setChannel(self, channel: int):
-        if not self.is_on:
-            return False, "Smart TV is off | Unable to complete this request"
-        if channel < 1 or channel > self.available_channels:
-            return False, f"Channel {channel} is out of range, valid range: 1-{self.available_channels}"
-        self.active_channel = channel
-        return True, f"Active channel set to: {channel}"
-    
+        with self._lock:
+            state = self.state
+            if not state.is_on:
+                return False, "Smart TV is off | Unable to complete this request", state
+            if channel < 1 or channel > self.available_channels:
+                return False, f"Channel {channel} is out of range, valid range: 1-{self.available_channels}", state
+            return True, self.messages.set_to[channel], self._commit(state, active_channel=channel)
+
     def downChannel(self):
-        if self.active_channel == 1:
-            return False, "Channel cannot go any lower than channel 1"
-        self.active_channel -= 1
-        return True, f"Channel went down to {self.active_channel}"
-    
+        with self._lock:
+            state = self.state
+            if state.active_channel == 1:
+                return False, "Channel cannot go any lower than channel 1", state
+            state = self._commit(state, active_channel=state.active_channel - 1)
+        return True, self.messages.went_down[state.active_channel], state
+
     def upChannel(self):
-        if self.active_channel == self.available_channels:
-            return False, f"Channel cannot go any higher than channel {self.available_channels}"
-        self.active_channel += 1
-        return True, f"Channel went up to {self.active_channel}"
\ No newline at end of file
+        with self._lock:
+            state = self.state
+            if state.active_channel == self.available_channels:
+                return False, self.messages.highest, state
+            state = self._commit(state, active_channel=state.active_channel + 1)
+        return True, self.messages.went_up[state.active_channel], state
@@ -0,0 +1,260 @@
+"""Replay a recorded trace (helpers.TraceLog) in process or against a live server.
+
+    python SmartTvHandoff.py --trace smarttv.trace             # record traffic
+    python SmartTvReplay.py smarttv.trace                      # in process, as fast as possible
+    python SmartTvReplay.py smarttv.trace --speed 1            # in process, at the recorded pace
+    python SmartTvReplay.py smarttv.trace --mode loopback --port 65431 --speed 10
+
+In process, every recorded read is fed to a fresh server through the same
+path a socket read takes (SmartTVServer._receive, handle_datagram), with
+in-memory connections and no sockets, so parsing, dispatch and fan-out are
+measured on their own. Notifications are not coalesced in this mode, so
+the same trace always produces the same replies: the report's ``digest``
+(CRC-32 of everything each connection received) and final TV states can
+be compared across runs and code changes. In loopback mode the trace is
+sent over real TCP connections and UDP sockets to a running server.
+
+``--speed`` scales the recorded timing (1 = real time, 10 = ten times
+faster); 0 replays as fast as possible.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import zlib
+
+from SmartTvTcpServer import SmartTVServer, AsyncClientSession
+from helpers.TraceLog import TraceKind, read_trace
+from transport.BaseTransport import BaseTransport
+
+YIELD_EVERY = 64  # events replayed at full speed between turns of the event loop (flushes outboxes)
+
+
+class ReplayServer(SmartTVServer):
+    NOTIFICATION_WINDOW = 0  # one notification per change, independent of replay timing
+    IDLE_TIMEOUT = None
+    LOG_LEVEL = "warning"
+    COMMAND_TIMING = True  # the report's per-command latencies
+
+
+class _MemoryConnection:
+    """What a replayed TCP session writes to: a running CRC and byte count instead of a socket."""
+
+    def __init__(self):
+        self.crc = 0
+        self.size = 0
+
+    def set_write_limit(self, limit):
+        pass
+
+    def buffered(self):
+        return 0
+
+    def writelines(self, chunks):
+        for chunk in chunks:
+            self.crc = zlib.crc32(chunk, self.crc)
+            self.size += len(chunk)
+
+    def stop_reading(self):
+        pass
+
+    def abort(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _MemoryDatagramTarget(_MemoryConnection):
+    """A replayed UDP remote: replies arrive through send(), broadcasts through sendto()."""
+
+    def __init__(self, addr):
+        super().__init__()
+        self.addr = addr
+
+    def send(self, message: str):
+        self.writelines([message.encode("utf-8") if isinstance(message, str) else message])
+
+
+class _MemoryDatagramSocket:
+    """Stands in for the UDP server socket that broadcasts to remotes go through."""
+
+    def __init__(self, targets):
+        self.targets = targets  # address -> _MemoryDatagramTarget
+
+    def sendto(self, payload, addr):
+        target = self.targets.get(addr)
+        if target is not None:
+            target.writelines([payload])
+
+
+def output_digest(outputs) -> str:
+    """One checksum of what every connection received: ``outputs`` maps trace ids to memory connections."""
+    digest = 0
+    for conn in sorted(outputs):
+        digest = zlib.crc32(outputs[conn].crc.to_bytes(4, "big"), digest)
+    return f"{digest:08x}"
+
+
+async def _pace(start, event_time, speed, lag):
+    """Sleep until the event is due at ``speed``; returns how late it is (for the lag report)."""
+    loop = asyncio.get_running_loop()
+    delay = start + event_time / speed - loop.time()
+    if delay > 0:
+        await asyncio.sleep(delay)
+        return lag
+    return max(lag, -delay)
+
+
+# ------------------- IN PROCESS -------------------
+async def replay_in_process(events, speed: float = 0, channels: int = 120, fleet: bool = False) -> dict:
+    """Feed ``events`` to a new server on this event loop; returns the report."""
+    loop = asyncio.get_running_loop()
+    transport = BaseTransport("127.0.0.1", 0, None)
+    transport.loop = loop
+    udp_targets = {}
+    transport.server_socket = _MemoryDatagramSocket(udp_targets)
+    server = ReplayServer(transport, available_channels=channels, fleet=fleet)
+
+    sessions, framers, outputs = {}, {}, {}
+    counts = dict.fromkeys(("events", "connections", "udp_remotes"), 0)
+    lag = 0.0
+    start = loop.time()
+    for event in events:
+        if speed:
+            lag = await _pace(start, event.time, speed, lag)
+        elif counts["events"] % YIELD_EVERY == 0:
+            await asyncio.sleep(0)
+        counts["events"] += 1
+        kind, conn = event.kind, event.conn
+        if kind == TraceKind.DATA:
+            session = sessions.get(conn)
+            if session is not None:
+                framers[conn] = server._receive(session, framers[conn], event.payload)
+        elif kind == TraceKind.DATAGRAM:
+            server.handle_datagram(event.payload, outputs[conn])
+        elif kind == TraceKind.OPEN:
+            session = AsyncClientSession(server, _MemoryConnection(), event.payload)
+            server.tcp_clients.add(session)
+            sessions[conn], framers[conn], outputs[conn] = session, None, session.conn
+            counts["connections"] += 1
+        elif kind == TraceKind.CLOSE:
+            session = sessions.pop(conn, None)
+            if session is not None:
+                server._remove_client(session)
+        elif kind == TraceKind.UDP_OPEN:
+            outputs[conn] = udp_targets[event.payload] = _MemoryDatagramTarget(event.payload)
+            counts["udp_remotes"] += 1
+    await asyncio.sleep(0)  # flush the last replies
+    elapsed = loop.time() - start
+    for session in list(sessions.values()):
+        server._remove_client(session)
+
+    return {
+        **counts,
+        "elapsed_s": round(elapsed, 4),
+        "events_per_s": round(counts["events"] / elapsed) if elapsed else None,
+        "max_lag_ms": round(lag * 1000, 3),
+        "bytes_out": sum(output.size for output in outputs.values()),
+        "digest": output_digest(outputs),
+        "tv_states": {device.id or "": list(device.smart_tv.state[:2])
+                      for device in server._devices()},
+        "commands": server.metrics.snapshot({})["commands"],
+    }
+
+
+# ------------------- LOOPBACK -------------------
+class _DatagramCounter(asyncio.DatagramProtocol):
+    def __init__(self, received):
+        self.received = received
+
+    def datagram_received(self, data, addr):
+        self.received["udp"] += len(data)
+
+
+async def _drain_replies(reader, received):
+    with contextlib.suppress(OSError):
+        while data := await reader.read(65536):
+            received["tcp"] += len(data)
+
+
+async def replay_loopback(events, host: str, port: int, speed: float = 0, settle: float = 0.5) -> dict:
+    """Send ``events`` to the server at ``host:port``; returns the report."""
+    loop = asyncio.get_running_loop()
+    writers, closing, readers, datagrams = {}, [], [], {}
+    received = {"tcp": 0, "udp": 0}
+    counts = dict.fromkeys(("events", "connections", "udp_remotes", "errors"), 0)
+    lag = 0.0
+    start = loop.time()
+    for event in events:
+        if speed:
+            lag = await _pace(start, event.time, speed, lag)
+        counts["events"] += 1
+        kind, conn = event.kind, event.conn
+        try:
+            if kind == TraceKind.DATA:
+                writer = writers.get(conn)
+                if writer is not None:
+                    writer.write(event.payload)
+                    if writer.transport.get_write_buffer_size() > 64 * 1024:
+                        await writer.drain()
+            elif kind == TraceKind.DATAGRAM:
+                datagrams[conn].sendto(event.payload)
+            elif kind == TraceKind.OPEN:
+                reader, writers[conn] = await asyncio.open_connection(host, port)
+                readers.append(loop.create_task(_drain_replies(reader, received)))
+                counts["connections"] += 1
+            elif kind == TraceKind.CLOSE:
+                writer = writers.pop(conn, None)
+                if writer is not None:
+                    writer.write_eof()  # the server still sends its replies, then closes
+                    closing.append(writer)
+            elif kind == TraceKind.UDP_OPEN:
+                datagrams[conn], _ = await loop.create_datagram_endpoint(
+                    lambda: _DatagramCounter(received), remote_addr=(host, port))
+                counts["udp_remotes"] += 1
+        except (OSError, KeyError):
+            counts["errors"] += 1
+    elapsed = loop.time() - start
+    await asyncio.sleep(settle)  # replies still on their way
+    for writer in [*writers.values(), *closing]:
+        writer.close()
+    for endpoint in datagrams.values():
+        endpoint.close()
+    await asyncio.gather(*readers, return_exceptions=True)
+    return {
+        **counts,
+        "elapsed_s": round(elapsed, 4),
+        "events_per_s": round(counts["events"] / elapsed) if elapsed else None,
+        "max_lag_ms": round(lag * 1000, 3),
+        "bytes_received": received,
+    }
+
+
+# ------------------- ENTRY POINT -------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace")
+    parser.add_argument("--mode", choices=("inprocess", "loopback"), default="inprocess")
+    parser.add_argument("--speed", type=float, default=0, help="1 = recorded pace, N = N times faster, 0 = max")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=65431)
+    parser.add_argument("--channels", type=int, default=120, help="in process: channels per TV")
+    parser.add_argument("--fleet", action="store_true", help="in process: host many TVs (select <id>)")
+    args = parser.parse_args()
+
+    events = list(read_trace(args.trace))
+    if args.mode == "inprocess":
+        # The server logs to stdout; only the report is printed
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = asyncio.run(replay_in_process(events, args.speed, args.channels, args.fleet))
+    else:
+        report = asyncio.run(replay_loopback(events, args.host, args.port, args.speed))
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,101 +1,444 @@
+import asyncio
+import ipaddress
+import json
+import signal
 import threading
-import queue
+import time
 import traceback
-from SmartTvLogic import SmartTV
+from SmartTvLogic import SmartTV, TvState
+from SmartTvFleet import Device, DeviceFleet
 from helpers.ProtocolConfig import Protocol
+from helpers.BinaryProtocol import BinaryProtocol, Notification, Status
 from helpers.Colors import Colors
+from helpers.FanOut import FanOut
+from helpers.SubscriberRegistry import SubscriberRegistry
+from helpers.CommandRouter import CommandRouter, CommandArgumentError
+from helpers.OutboundQueue import OutboundQueue, SlowConsumerPolicy
+from helpers.ResponseCache import ResponseCache
+from helpers.AdmissionControl import AdmissionControl
+from helpers.EventLog import EventLog
+from helpers.Metrics import Metrics
+from helpers.MetricsEndpoint import MetricsEndpoint
+from helpers.StateStore import ChangeLogStore, MmapStateFile
+from helpers.TraceLog import TraceRecorder
+from helpers.TimerQueue import TimerQueue
 from transport.BaseTransport import BaseTransport
+from transport.LineFramer import LineFramer
+from transport.BinaryFramer import BinaryFramer
 from transport.TcpTransport import TcpTransport
 from transport.UdpTransport import UdpTransport
+from transport.AsyncioTransport import AsyncioTcpTransport, AsyncioUdpTransport
+from transport.BatchedUdpTransport import BatchedUdpTransport
 
 
 # ------------------- TCP CLIENT HANDLER -------------------
-class ClientSession:
-    """Handles a single TCP client connection asynchronously."""
+class TcpSession:
+    """State and reply helpers shared by the threaded and asyncio TCP sessions.
+
+    Subclasses queue bytes with send_reply() (replies, never dropped) and
+    send_bytes() (notifications, slow-consumer policy), and implement
+    abort() and close().
+    """
 
     def __init__(self, server, conn, addr):
         self.server = server
         self.conn = conn
         self.addr = addr
-        self.queue = queue.Queue()
+        self.outbox = server._new_outbox()
         self.active = True
-
-        threading.Thread(target=self._recv_loop, name=f"recv-{addr}", daemon=True).start()
-        threading.Thread(target=self._send_loop, name=f"send-{addr}", daemon=True).start()
+        self.device = server._initial_device()
+        self.binary = False  # set when the client negotiates the binary protocol
+        self.opcode = 0      # binary opcode of the command being answered
+        self.tag = None      # request id of the text command being answered
+        self._corked = None  # replies held back by cork()
+        self.last_seen = time.monotonic()  # last time bytes arrived (idle timeout)
+        self.closed = False  # set once the socket is closed (shutdown waits for it)
+        self.trace_id = None  # connection id in the server's trace, once recorded
+        self.in_batch = False  # set while a batch runs (batches do not nest)
 
     def send(self, msg: str):
+        """Queue a text reply to this client's own command."""
         if not msg.endswith("\n"):
             msg += "\n"
-        if self.active:
-            self.queue.put(msg)
+        self.send_reply(msg.encode("utf-8"))
 
-    def close(self):
-        self.active = False
-        try:
-            self.queue.put_nowait(None)
-        except Exception:
-            pass
+    def cork(self):
+        """Hold replies back until uncork(), then queue them as one message (one write)."""
+        self._corked = []
+        self._corked_size = 0
+
+    def uncork(self):
+        corked, self._corked = self._corked, None
+        if corked:
+            self.send_reply(b"".join(corked))
+
+    def _hold(self, corked, data: bytes):
+        corked.append(data)
+        self._corked_size += len(data)
+        if self._corked_size >= self.server.MAX_WRITE_BYTES:
+            self.uncork()
+            self.cork()
+
+    def stop_reading(self):
+        """Process nothing more from this client; it is closed once its replies are sent."""
+        self.conn.stop_reading()
+
+
+class ClientSession(TcpSession):
+    """Handles a single TCP client connection with a receive and a send thread."""
+
+    def __init__(self, server, conn, addr):
+        super().__init__(server, conn, addr)
+        self.wakeup = threading.Condition(threading.Lock())
+
+    def start(self):
+        # Called once the session is registered, so a disconnect always finds it
+        threading.Thread(target=self._recv_loop, name=f"recv-{self.addr}", daemon=True).start()
+        threading.Thread(target=self._send_loop, name=f"send-{self.addr}", daemon=True).start()
+
+    def send_reply(self, data: bytes):
+        """Queue an encoded reply to this client's own command.
+
+        Replies are never dropped: when the outbox is full the calling
+        (receive) thread waits, which stops reading and pushes back on a
+        client that pipelines faster than it reads.
+        """
+        corked = self._corked
+        if corked is not None:
+            self._hold(corked, data)
+            return
+        with self.wakeup:
+            while self.active and not self.outbox.has_room(len(data)):
+                self.wakeup.wait()
+            if not self.active:
+                return
+            self.outbox.push_reply(data)
+            self.wakeup.notify_all()
+
+    def send_bytes(self, data: bytes):
+        """Queue an already encoded notification; the slow-consumer policy applies."""
+        if not self.active:
+            return
+        with self.wakeup:
+            accepted = self.outbox.push(data)
+            self.wakeup.notify_all()
+        if not accepted:
+            self.abort()
+
+    def abort(self, reason: str = "slow_client"):
+        """Drop everything queued and disconnect immediately (slow consumer, idle timeout)."""
+        self._corked = None
+        # Shut the socket down before waking the send thread, which closes it:
+        # a closed socket would not wake the receive thread.
         try:
-            self.conn.close()
+            self.conn.abort()
         except Exception:
             pass
+        with self.wakeup:
+            self.active = False
+            self.outbox.clear()
+            self.wakeup.notify_all()
+        self.server.log.warning("client_aborted", addr=self.addr, reason=reason)
+
+    def close(self):
+        # The send thread flushes what is already queued and then closes the socket.
+        self.uncork()
+        with self.wakeup:
+            self.active = False
+            self.wakeup.notify_all()
 
     def _send_loop(self):
-        """Continuously send queued messages to this TCP client."""
-        while self.active:
+        """Sleep until messages are queued, then write them out in as few syscalls as possible."""
+        limit = self.server.MAX_WRITE_BYTES
+        metrics = self.server.metrics
+        try:
+            while True:
+                with self.wakeup:
+                    while self.active and not self.outbox:
+                        self.wakeup.wait()
+                    if not self.outbox:
+                        break
+                    size = self.outbox.size
+                    batch = self.outbox.take(limit)
+                    size -= self.outbox.size
+                    self.wakeup.notify_all()  # room for replies blocked in send()
+                self.conn.writelines(batch)
+                metrics.bytes_out["tcp"] += size
+        except Exception as e:
+            self.server._socket_error("tcp_send_error", self.addr, e)
+        finally:
             try:
-                msg = self.queue.get(timeout=1)
-                if msg is None:
-                    break
-                self.conn.send(msg)
-            except queue.Empty:
-                continue
-            except Exception as e:
-                print(Colors.colorize(f"[TCP send error] {self.addr}: {e}", False))
-                break
+                self.conn.close()
+            except Exception:
+                pass
+            self.closed = True
         self.server._remove_client(self)
 
     def _recv_loop(self):
         """Receive and process commands from the TCP client."""
+        framer = None
+        view = memoryview(bytearray(self.server.BUFFER_SIZE))
+        bytes_in = self.server.metrics.bytes_in
         try:
             while self.active:
                 try:
-                    data = self.conn.recv(self.server.BUFFER_SIZE)
+                    n = self.conn.recv_into(view)
                 except Exception as e:
-                    print(Colors.colorize(f"[TCP recv error] {self.addr}: {e}", False))
+                    self.server._socket_error("tcp_recv_error", self.addr, e)
                     break
-                if not data:
+                if not n:
                     break
+                bytes_in["tcp"] += n
+                self.last_seen = time.monotonic()
+                framer = self.server._receive(self, framer, view[:n])
+        finally:
+            self.server._remove_client(self)
+
+
+class AsyncClientSession(TcpSession):
+    """Handles a single TCP client as a coroutine on the transport's event loop."""
+
+    def __init__(self, server, conn, addr):
+        super().__init__(server, conn, addr)
+        self._flush_scheduled = False
+        self._draining = False
+        self._loop = asyncio.get_running_loop()
+        conn.set_write_limit(server.MAX_WRITE_BYTES)
+
+    def send_reply(self, data: bytes):
+        """Queue an encoded reply to this client's own command (never dropped; see _wait_writable)."""
+        corked = self._corked
+        if corked is not None:
+            self._hold(corked, data)
+        elif self.active:
+            self.outbox.push_reply(data)
+            self._schedule_flush()
+
+    def send_bytes(self, data: bytes):
+        """Queue an already encoded notification; the slow-consumer policy applies."""
+        if not self.active:
+            return
+        if not self.outbox.push(data):
+            self.abort()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        if not self._flush_scheduled and not self._draining:
+            # Everything sent during this loop iteration goes out in one write.
+            self._flush_scheduled = True
+            self._loop.call_soon(self._flush)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        limit = self.server.MAX_WRITE_BYTES
+        # Only hand data to the stream while its own buffer is below the limit;
+        # the rest stays in the bounded outbox where the slow-consumer policy applies.
+        while self.active and self.outbox and self.conn.buffered() < limit:
+            size = self.outbox.size
+            try:
+                self.conn.writelines(self.outbox.take(limit))
+            except Exception as e:
+                self.server._socket_error("tcp_send_error", self.addr, e)
+                self.close()
+                return
+            self.server.metrics.bytes_out["tcp"] += size - self.outbox.size
+        if self.active and self.outbox and not self._draining:
+            self._draining = True
+            self._loop.create_task(self._drain())
+
+    async def _drain(self):
+        try:
+            await self.conn.drain()
+        except Exception:
+            pass
+        self._draining = False
+        self._flush()
+
+    async def _wait_writable(self):
+        """Stop reading until this chunk's replies have reached the stream (backpressure)."""
+        limit = self.server.MAX_WRITE_BYTES
+        while self.active and (self.outbox or self.conn.buffered() >= limit):
+            if self.conn.buffered() >= limit:
+                await self.conn.drain()
+            else:
+                await asyncio.sleep(0)  # let the scheduled flush run
+
+    def abort(self, reason: str = "slow_client"):
+        """Drop everything queued and disconnect immediately (slow consumer, idle timeout)."""
+        self.active = False
+        self._corked = None
+        self.outbox.clear()
+        self.server.log.warning("client_aborted", addr=self.addr, reason=reason)
+        try:
+            self.conn.abort()
+        except Exception:
+            pass
+
+    def close(self):
+        self.uncork()
+        if self.active and self.outbox:
+            self._flush()
+        self.active = False
+        try:
+            self.conn.close()
+        except Exception:
+            pass
 
-                for line in data.decode(errors="ignore").splitlines():
-                    cmd = line.strip().lower()
-                    if cmd:
-                        self.server._process_command(self, cmd)
+    async def run(self):
+        """Receive and process commands until the client disconnects."""
+        framer = None
+        bytes_in = self.server.metrics.bytes_in
+        try:
+            while self.active:
+                try:
+                    data = await self.conn.recv(self.server.BUFFER_SIZE)
+                except Exception as e:
+                    self.server._socket_error("tcp_recv_error", self.addr, e)
+                    break
+                if not data:
+                    break
+                bytes_in["tcp"] += len(data)
+                self.last_seen = time.monotonic()
+                framer = self.server._receive(self, framer, data)
+                await self._wait_writable()
         finally:
             self.server._remove_client(self)
+            await self.conn.wait_closed()
+            self.closed = True
+
+
+class _ReplyCollector:
+    """Stands in for a UDP sender during a batch so all replies go back in one datagram."""
+
+    in_batch = True
+
+    def __init__(self, target):
+        self.target = target
+        self.addr = target.addr
+        self.tag = None
+        self.opcode = 0
+        self._lines = []
+
+    def send(self, data: str):
+        self._lines.append(data if data.endswith("\n") else data + "\n")
+
+    def flush(self):
+        if self._lines:
+            # The transport's send() adds the final newline itself
+            self.target.send("".join(self._lines)[:-1])
+
+
+def _ip(addr):
+    """Host part of a socket address (rate limits and connection caps are per IP)."""
+    return addr[0] if isinstance(addr, tuple) else addr
+
+
+def _address_label(addr) -> str:
+    """``host:port`` for stats keys and metric labels."""
+    return ":".join(map(str, addr)) if isinstance(addr, tuple) else str(addr)
 
 
 # ------------------- SMART TV SERVER -------------------
 class SmartTVServer:
     """Smart TV server supporting:
-    - Multiple concurrent TCP clients (each remote runs in its own threads)
+    - Multiple concurrent TCP clients (each remote runs in its own threads,
+      or as a coroutine when served by an asyncio transport)
     - Connectionless UDP clients
+    - A text protocol, and a compact binary one that TCP clients can negotiate
     - Broadcast notifications across all connected clients
+    - Optionally (fleet mode) many TVs keyed by device id, each with its own subscribers
     """
 
     BUFFER_SIZE = 4096
+    MAX_LINE_LENGTH = 1024  # longer TCP commands (text lines or binary frames) are rejected
+    MAX_WRITE_BYTES = 64 * 1024  # upper bound on bytes handed to a single socket write
+
+    # Per-client outbound queue high-water marks and what to do when they are hit
+    OUTBOX_MAX_MESSAGES = 1024
+    OUTBOX_MAX_BYTES = 256 * 1024
+    SLOW_CONSUMER_POLICY = SlowConsumerPolicy.COALESCE
+
+    # UDP remotes that send nothing (not even a heartbeat) for this long stop receiving broadcasts
+    UDP_CLIENT_TTL = 300.0
+
+    # Channel changes within this many seconds are sent as one notification (0 disables)
+    NOTIFICATION_WINDOW = 0.03
+
+    # Topics a new TCP session, or a UDP remote heard from for the first time, is
+    # subscribed to before it sends "subscribe" (fleet mode: when it selects its
+    # first device). Clients narrow them with "subscribe <topic> ..." or
+    # "unsubscribe"; () makes notifications opt-in.
+    DEFAULT_TOPICS = Protocol.TOPICS
+
+    # Fleet mode: number of device-map shards (each with its own lock)
+    FLEET_SHARDS = 64
+
+    # Admission control, opt-in (None disables a limit): open TCP connections in total
+    # and per IP address, and commands per second per IP (token bucket of COMMAND_BURST)
+    MAX_CONNECTIONS = None
+    MAX_CONNECTIONS_PER_IP = None
+    COMMAND_RATE = None
+    COMMAND_BURST = None
+
+    # TCP sessions that send nothing for this many seconds are disconnected, opt-in
+    # (None disables); remotes must then send "heartbeat" to stay connected
+    IDLE_TIMEOUT = None
 
-    def __init__(self, transport: BaseTransport, available_channels: int):
-        self.smart_tv = SmartTV(available_channels)
+    # Seconds shutdown() gives clients to receive their queued replies before dropping them
+    DRAIN_TIMEOUT = 5.0
+
+    # Observability: event log threshold and lines per event per second,
+    # per-command latency histograms (opt-in: they add ~18% to dispatch), and
+    # the Prometheus /metrics port on 127.0.0.1 (None: only the loopback-only
+    # "stats" command)
+    LOG_LEVEL = "info"
+    LOG_BURST = 20
+    COMMAND_TIMING = False
+    METRICS_PORT = None
+
+    def __init__(self, transport: BaseTransport, available_channels: int, smart_tv=None, fleet: bool = False,
+                 state_store=None, trace=None):
         self.transport = transport
+        # Keeps TV state across restarts (see helpers.StateStore); devices attach to it as they are created
+        self.state_store = state_store
+        # Records incoming traffic for SmartTvReplay.py (see helpers.TraceLog)
+        self.trace = trace
+        self.log = EventLog(self.LOG_LEVEL, self.LOG_BURST)
+        # Delayed callbacks (notification windows, sweeps) for transports without an event loop
+        self.timers = TimerQueue(on_error=lambda: self.log.error("timer_error", traceback=traceback.format_exc()))
+        self.metrics_endpoint = None
+        self.admission = AdmissionControl(self.MAX_CONNECTIONS, self.MAX_CONNECTIONS_PER_IP,
+                                          self.COMMAND_RATE, self.COMMAND_BURST)
+        self._reaping = False
+        self._sweeping = False
+
+        # Set in pre-fork mode; forwards broadcasts to the other workers
+        self.cluster = None
 
         # TCP clients
-        self.tcp_clients = set()
-        self.tcp_lock = threading.RLock()
+        self.tcp_clients = FanOut(self._deliver_tcp)
 
-        # UDP client addresses (connectionless)
-        self.udp_clients = set()
-        self.udp_lock = threading.RLock()
+        # UDP client addresses (connectionless); silent ones expire after UDP_CLIENT_TTL
+        self.udp_clients = SubscriberRegistry(self._deliver_udp, self.UDP_CLIENT_TTL)
+
+        # The single TV of a classic server. Its subscribers are all clients, and rapid
+        # channel surfing produces one notification per window, not per step.
+        # smart_tv may be shared with other worker processes (see SmartTvCluster).
+        self.default_device = Device(
+            None, smart_tv or SmartTV(available_channels), self,
+            tcp_clients=self.tcp_clients, udp_clients=self.udp_clients,
+        )
+        self.smart_tv = self.default_device.smart_tv
+        self.channel_notifications = self.default_device.channel_notifications
+
+        # Fleet mode hosts many TVs; clients pick one with "select <id>"
+        self.fleet = DeviceFleet(self, available_channels, self.FLEET_SHARDS) if fleet else None
+        self.udp_devices = {}  # UDP address -> selected Device (fleet mode; dropped when the address expires)
+        if self.fleet is not None and state_store is not None:
+            for device_id in state_store.recovered:
+                if device_id:
+                    self.fleet.get(device_id)
 
         # Command dispatch map
         self.dispatch = {
@@ -108,7 +451,25 @@ class SmartTVServer:
             Protocol.COMMANDS["CHANNEL_DOWN"]: self._channel_down,
             Protocol.COMMANDS["CHANNEL_UP"]: self._channel_up,
             Protocol.COMMANDS["QUIT"]: self._quit,
+            Protocol.COMMANDS["SUBSCRIBE"]: self._subscribe,
+            Protocol.COMMANDS["HEARTBEAT"]: self._heartbeat,
+            Protocol.COMMANDS["SELECT"]: self._select,
+            Protocol.COMMANDS["BATCH"]: self._batch,
+            Protocol.COMMANDS["STATS"]: self._stats,
+            Protocol.COMMANDS["UNSUBSCRIBE"]: self._unsubscribe,
         }
+        # Commands that do not act on a TV and so work before a device is selected
+        self.deviceless = {self._quit, self._heartbeat, self._select, self._batch, self._stats}
+        self.router = CommandRouter(self.dispatch, Protocol.ARGUMENTS)
+        # Encoded text replies and notifications, reused across requests
+        self.responses = ResponseCache()
+        # Binary protocol: opcode -> (command, handler)
+        self.opcodes = {opcode: (command, self.dispatch[command]) for command, opcode in Protocol.OPCODES.items()}
+
+        # Counters and latency histograms; handler -> its command's histogram
+        self.metrics = Metrics(self.dispatch)
+        self.timings = ({handler: self.metrics.commands[command] for command, handler in self.dispatch.items()}
+                        if self.COMMAND_TIMING else {})
 
     # ------------------- TRANSPORT ENTRYPOINT -------------------
 
@@ -118,28 +479,106 @@ class SmartTVServer:
             self._handle_udp_datagram(conn)
         else:  # TCP (stateful)
             addr = getattr(conn, "addr", "unknown")
+            if not self._admit(conn, addr):
+                return
             client = ClientSession(self, conn, addr)
-            with self.tcp_lock:
-                self.tcp_clients.add(client)
-            print(f"[TCP] Client connected: {addr}")
+            self.tcp_clients.add(client)
+            self._subscribe_defaults(client)
+            self.log.info("client_connected", addr=addr)
+            client.start()
+
+    async def handle_client_async(self, conn):
+        """Called by the asyncio transports; serves one TCP connection to completion."""
+        addr = getattr(conn, "addr", "unknown")
+        if not self._admit(conn, addr):
+            return
+        client = AsyncClientSession(self, conn, addr)
+        self.tcp_clients.add(client)
+        self._subscribe_defaults(client)
+        self.log.info("client_connected", addr=addr)
+        await client.run()
+
+    def _admit(self, conn, addr) -> bool:
+        """Apply the connection limits; a refused connection gets one line and is closed."""
+        reason = self.admission.admit(_ip(addr)) if self.transport.accepting else "shutting down"
+        if reason is not None:
+            self.metrics.refused += 1
+            self.log.warning("connection_refused", addr=addr, reason=reason)
+            conn.refuse(self.responses.encode(f"Server busy: {reason}", False))
+            return False
+        self.metrics.connections += 1
+        if self.IDLE_TIMEOUT and not self._reaping:
+            self._reaping = True
+            self._call_later(self.IDLE_TIMEOUT / 4, self._reap_idle)
+        return True
+
+    def _reap_idle(self):
+        """Disconnect TCP sessions that have sent nothing for IDLE_TIMEOUT seconds; runs periodically."""
+        cutoff = time.monotonic() - self.IDLE_TIMEOUT
+        for client in self.tcp_clients.snapshot():
+            if client.last_seen < cutoff and client.active:
+                self.metrics.idle_timeouts += 1
+                client.abort("idle_timeout")
+        self._call_later(self.IDLE_TIMEOUT / 4, self._reap_idle)
 
     # ------------------- UDP HANDLING -------------------
 
+    def _sweep_udp(self):
+        """Expire silent UDP remotes every UDP_CLIENT_TTL / 4, whether or not anything is broadcast."""
+        self._expire_udp()
+        self._call_later(self.UDP_CLIENT_TTL / 4, self._sweep_udp)
+
+    def _expire_udp(self):
+        """Drop UDP remotes silent for UDP_CLIENT_TTL from every registry (publish only expires its own)."""
+        self.udp_clients.expire()
+        for addr in [addr for addr in list(self.udp_devices) if addr not in self.udp_clients]:
+            self.udp_devices.pop(addr, None)
+        for device in self._devices():
+            if device.udp_clients is not self.udp_clients:
+                device.udp_clients.expire()
+            for registry in device.udp_topics.fanouts.values():
+                registry.expire()
+
+    def _forget_udp(self, addr):
+        """Drop whatever the registries still hold for a lapsed UDP remote (its device and topics)."""
+        device = self.udp_devices.pop(addr, None)
+        if device is not None and device.udp_clients is not self.udp_clients:
+            device.udp_clients.remove(addr)
+        (device or self.default_device).udp_topics.unsubscribe(addr)
+
     def _handle_udp_datagram(self, conn):
         """Handle one UDP request (connectionless)."""
         try:
             data = conn.recv(self.BUFFER_SIZE)
         except Exception as e:
-            print(Colors.colorize(f"[UDP recv error] {e}", False))
+            self._socket_error("udp_recv_error", None, e)
             return
 
         if not data:
             return
+        self.handle_datagram(data, conn)
 
-        addr = getattr(conn, "addr", None)
+    def handle_datagram(self, data: bytes, target):
+        """Process one UDP command; ``target`` has the sender's ``addr`` and a ``send`` method."""
+        self.metrics.bytes_in["udp"] += len(data)
+        addr = getattr(target, "addr", None)
+        if not self._sweeping:
+            self._sweeping = True
+            self._call_later(self.UDP_CLIENT_TTL / 4, self._sweep_udp)
+        if self.trace is not None:
+            self.trace.datagram(addr, data)
         if addr:
-            with self.udp_lock:
-                self.udp_clients.add(addr)
+            # Silent for UDP_CLIENT_TTL: a new remote, even if no sweep or publish has expired it yet
+            returning = self.udp_clients.live(addr)
+            if not returning:
+                self._forget_udp(addr)
+            self.udp_clients.add(addr)
+            device = self.udp_devices.get(addr)
+            if device is not None:
+                device.udp_clients.add(addr)
+            if not returning:
+                self._subscribe_defaults(target)
+            (device or self.default_device).udp_topics.touch(addr)
 
         try:
             text = data.decode("utf-8", "ignore").strip().lower()
@@ -147,7 +586,7 @@ class SmartTVServer:
             text = str(data).strip().lower()
 
         if text:
-            self._process_command(conn, text)
+            self._process_command(target, text)
 
     # ------------------- CORE SENDING -------------------
 
@@ -156,159 +595,659 @@ class SmartTVServer:
         if not message.endswith("\n"):
             message += "\n"
 
-        if isinstance(target, ClientSession):  # TCP
+        if isinstance(target, TcpSession):  # TCP
             target.send(message)
 
         elif hasattr(target, "send") and hasattr(target, "addr"):  # UDP conn wrapper
             try:
                 target.send(message)
             except Exception as e:
-                print(Colors.colorize(f"[UDP send error] {e}", False))
+                self._socket_error("udp_send_error", target.addr, e)
+            else:
+                self.metrics.bytes_out["udp"] += len(message)  # replies are ASCII
 
         elif isinstance(target, tuple) and len(target) == 2:  # UDP addr tuple
             sock = getattr(self.transport, "server_socket", None)
             if sock:
+                data = message.encode("utf-8")
                 try:
-                    sock.sendto(message.encode("utf-8"), target)
+                    sock.sendto(data, target)
                 except Exception as e:
-                    print(Colors.colorize(f"[UDP sendto error] {e}", False))
+                    self._socket_error("udp_send_error", target, e)
+                else:
+                    self.metrics.bytes_out["udp"] += len(data)
 
     # ------------------- BROADCAST -------------------
 
-    def broadcast(self, message: str, exclude=None):
-        """Send a message to all connected TCP and UDP clients."""
-        if not message.endswith("\n"):
-            message += "\n"
+    def broadcast(self, message, exclude=None, device=None, topic=None):
+        """Send a message to the TCP and UDP subscribers of ``topic`` on ``device`` (default: the single TV).
 
-        # TCP clients
-        with self.tcp_lock:
-            for client in list(self.tcp_clients):
-                if client is not exclude:
-                    client.send(message)
-
-        # UDP clients
-        sock = getattr(self.transport, "server_socket", None)
-        if not sock:
-            return
-        with self.udp_lock:
-            for addr in list(self.udp_clients):
-                if hasattr(exclude, "addr") and addr == exclude.addr:
-                    continue
-                try:
-                    sock.sendto(message.encode("utf-8"), addr)
-                except Exception as e:
-                    print(Colors.colorize(f"[UDP broadcast error] {e}", False))
+        Without a topic the message goes to every client of the device.
+        ``message`` is a string, or an already encoded Notification that also
+        carries the frame for binary-protocol clients (text-only messages do
+        not reach them). It is encoded once; every subscriber receives the
+        same bytes.
+        """
+        if isinstance(message, Notification):
+            payloads = message
+        else:
+            if not message.endswith("\n"):
+                message += "\n"
+            payloads = (message.encode("utf-8"), None)
+        device = device or self.default_device
+
+        self._broadcast_local(device, payloads, exclude, topic)
+        if self.cluster is not None and device is self.default_device:
+            self.cluster.forward(payloads, topic)
+
+    def deliver_remote(self, payloads, topic=None):
+        """Broadcast a notification that originated in another worker process."""
+        self._run_on_loop(lambda: self._broadcast_local(self.default_device, payloads, topic=topic))
+
+    def _broadcast_local(self, device, payloads, exclude=None, topic=None):
+        # payloads: (text bytes, binary frame or None)
+        start = time.perf_counter()
+        if topic is None:
+            tcp, udp = device.tcp_clients, device.udp_clients
+        else:
+            tcp, udp = device.tcp_topics.fanouts[topic], device.udp_topics.fanouts[topic]
+        sent = tcp.publish(payloads, exclude=exclude)
+        if getattr(self.transport, "server_socket", None):
+            sent += udp.publish(payloads[0], exclude=getattr(exclude, "addr", None))
+        self.metrics.broadcasts.observe(time.perf_counter() - start)
+        self.metrics.deliveries += sent
+
+    def _deliver_tcp(self, clients, payloads, exclude=None) -> int:
+        """Queue a notification on every session in ``clients`` but ``exclude`` (one call per broadcast)."""
+        text, frame = payloads
+        sent = 0
+        for client in clients:
+            if client is exclude:
+                continue
+            if not client.binary:
+                client.send_bytes(text)
+            elif frame is not None:
+                client.send_bytes(frame)
+            sent += 1
+        return sent
+
+    def _deliver_udp(self, addrs, payload: bytes, exclude=None) -> int:
+        """Send a notification datagram to every address in ``addrs`` but ``exclude``."""
+        sendto = self.transport.server_socket.sendto
+        sent = 0
+        for addr in addrs:
+            if addr == exclude:
+                continue
+            try:
+                sendto(payload, addr)
+            except Exception as e:
+                self._socket_error("udp_broadcast_error", addr, e)
+            else:
+                sent += 1
+        self.metrics.bytes_out["udp"] += sent * len(payload)
+        return sent
+
+    def _notify_channel(self, client, channel):
+        """Queue a channel-change notification for the client's TV; rapid changes are merged into one."""
+        self._device_of(client).channel_notifications.submit(
+            "channel", self.responses.channel_notification(channel), exclude=client
+        )
+
+    def _notify_power(self, client, is_on: bool):
+        """Publish a power change to the client's TV's "power" subscribers, after any pending channel change."""
+        device = self._device_of(client)
+        device.channel_notifications.flush_all()
+        self.broadcast(self.responses.power_notification(is_on), exclude=client, device=device, topic="power")
+
+    def _run_on_loop(self, callback):
+        """Run ``callback`` on the transport's event loop, or right here for threaded transports."""
+        loop = getattr(self.transport, "loop", None)
+        if loop is not None:
+            loop.call_soon_threadsafe(callback)
+        else:
+            callback()
+
+    def _call_later(self, delay: float, callback):
+        """Run ``callback`` after ``delay`` seconds on the transport's event loop, else on the timer thread."""
+        loop = getattr(self.transport, "loop", None)
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.call_later, delay, callback)
+        else:
+            self.timers.call_later(delay, callback)
 
     # ------------------- CLIENT MANAGEMENT -------------------
 
+    def _new_outbox(self):
+        return OutboundQueue(self.OUTBOX_MAX_MESSAGES, self.OUTBOX_MAX_BYTES, self.SLOW_CONSUMER_POLICY)
+
+    def outbox_stats(self) -> dict:
+        """Outbound queue counters per connected TCP client, keyed by "host:port"."""
+        return {_address_label(client.addr): client.outbox.stats() for client in self.tcp_clients.snapshot()}
+
     def _remove_client(self, client):
-        with self.tcp_lock:
-            if client in self.tcp_clients:
-                self.tcp_clients.remove(client)
+        if self.tcp_clients.remove(client):
+            self.admission.release(_ip(client.addr))
+            if client.trace_id is not None:
+                self.trace.close(client.trace_id)
+        device = getattr(client, "device", None)
+        if device is not None:
+            device.tcp_topics.unsubscribe(client)
+            if device is not self.default_device:
+                device.tcp_clients.remove(client)
         client.close()
-        print(f"[TCP] Client {client.addr} disconnected")
+        self.log.info("client_disconnected", addr=client.addr)
+
+    # ------------------- OBSERVABILITY -------------------
+
+    def gauges(self) -> dict:
+        """Current connection, queue and device counts, read on demand."""
+        outboxes = [client.outbox for client in self.tcp_clients.snapshot()]
+        self._expire_udp()
+        subscribers = dict.fromkeys(Protocol.TOPICS, 0)
+        for device in self._devices():
+            for index in (device.tcp_topics, device.udp_topics):
+                for topic, count in index.counts().items():
+                    subscribers[topic] += count
+        return {
+            "tcp_clients": len(outboxes),
+            "udp_subscribers": len(self.udp_clients),
+            "outbox_messages": sum(len(o) for o in outboxes),
+            "outbox_bytes": sum(o.size for o in outboxes),
+            "outbox_max_depth": max((len(o) for o in outboxes), default=0),
+            "outbox_dropped": sum(o.dropped for o in outboxes),
+            "devices": len(self.fleet) if self.fleet is not None else 1,
+            "admitted_connections": self.admission.connections,
+            **{f"{topic}_subscribers": count for topic, count in subscribers.items()},
+        }
+
+    def prometheus(self) -> str:
+        """Metrics page served on METRICS_PORT."""
+        return self.metrics.prometheus(self.gauges(), self.outbox_stats())
+
+    def _socket_error(self, event: str, addr, error: Exception):
+        self.metrics.errors += 1
+        self.log.warning(event, addr=addr, error=str(error))
+
+    # ------------------- DEVICES -------------------
+
+    def _initial_device(self):
+        """Device of a newly connected TCP client (none in fleet mode until it selects one)."""
+        return None if self.fleet is not None else self.default_device
+
+    def _device_of(self, client):
+        """The TV a client's commands act on (None in fleet mode until it selects one)."""
+        if isinstance(client, TcpSession):
+            return client.device
+        if self.fleet is None:
+            return self.default_device
+        return self.udp_devices.get(getattr(client, "addr", None))
+
+    def _devices(self):
+        """The single TV's device and, in fleet mode, every hosted one."""
+        yield self.default_device
+        if self.fleet is not None:
+            yield from self.fleet
+
+    def _tv(self, client):
+        return self._device_of(client).smart_tv
 
     # ------------------- COMMAND DISPATCH -------------------
 
-    def _process_command(self, client, text: str):
+    def _receive(self, client, framer, data):
+        """Run one chunk read from a TCP client; returns the framer for its next chunk (None before the first)."""
+        trace = self.trace
+        if trace is not None:
+            if client.trace_id is None:
+                client.trace_id = trace.open(client.addr)
+            trace.data(client.trace_id, data)
+        if framer is None:
+            framer, data = self._negotiate(client, data)
+        self._process_input(client, framer.feed(data))
+        return framer
+
+    def _negotiate(self, client, data):
+        """Pick a TCP client's protocol from its first bytes; returns ``(framer, remaining data)``."""
+        if data[:1] == BinaryProtocol.MAGIC:
+            client.binary = True
+            client.opcode = BinaryProtocol.HELLO
+            client.send_reply(BinaryProtocol.reply(BinaryProtocol.HELLO, Status.OK, BinaryProtocol.VERSION))
+            return BinaryFramer(self.MAX_LINE_LENGTH), data[1:]
+        return LineFramer(self.MAX_LINE_LENGTH), data
+
+    def _process_input(self, client, items):
+        """Run everything framed from one read; the replies are sent in a single write."""
+        client.cork()
+        try:
+            if client.binary:
+                self._process_frames(client, items)
+            else:
+                self._process_lines(client, items)
+        finally:
+            client.uncork()
+
+    def _process_lines(self, client, lines):
+        """Run framed TCP command lines in order (``None`` marks an over-long line)."""
+        for line in lines:
+            if not client.active:
+                return
+            if line is None:
+                client.tag = None
+                self._reply(client, "Command too long", False, status=Status.TOO_LONG)
+                continue
+            cmd = line.decode("utf-8", "ignore").strip().lower()
+            if cmd:
+                self._process_command(client, cmd)
+
+    def _process_frames(self, client, frames) -> int:
+        """Run binary request frames in order (``None`` marks an over-long frame); returns how many ran."""
+        ran = 0
+        for frame in frames:
+            if not client.active:
+                break
+            client.opcode = frame[0] if frame else 0
+            if frame is None:
+                self._reply(client, "Command too long", False, status=Status.TOO_LONG)
+                continue
+            route = self.opcodes.get(client.opcode)
+            if route is None:
+                self._unsupported(client)
+                continue
+            command, handler = route
+            try:
+                args = BinaryProtocol.decode_arguments(command, frame[1:])
+            except ValueError as e:
+                self._reply(client, str(e), False, status=Status.BAD_REQUEST)
+                continue
+            ran += self._run(client, handler, args)
+        return ran
+
+    def _process_command(self, client, text: str, tag: str = None) -> bool:
+        """Run one text command; a leading "@<id>" overrides ``tag``, which prefixes every reply.
+
+        Returns whether a handler ran (False when the command was refused).
+        """
+        if text.startswith(Protocol.REQUEST_ID_PREFIX):
+            tag, _, text = text.partition(" ")
+            text = text.lstrip()
+        client.tag = tag
         if not text:
-            self._send_to(client, "Invalid command")
-            return
+            self._reply(client, "Invalid command")
+            return False
 
-        parts = text.split()
-        for length in range(len(parts), 0, -1):
-            cmd = " ".join(parts[:length])
-            handler = self.dispatch.get(cmd)
-            if handler:
-                try:
-                    quit_flag = handler(client, parts[length:])
-                    if quit_flag and isinstance(client, ClientSession):
-                        client.close()
-                    return
-                except Exception:
-                    traceback.print_exc()
-                    self._send_to(client, Colors.colorize("Internal server error", False))
-                    return
-        self._unsupported(client)
+        try:
+            route = self.router.route(text)
+        except CommandArgumentError as e:
+            self._reply(client, str(e), False)
+            return False
+        if route is None:
+            self._unsupported(client)
+            return False
+        return self._run(client, *route)
+
+    def _run(self, client, handler, args) -> bool:
+        """Run one routed command unless a limit refuses it; returns whether the handler completed."""
+        if self.COMMAND_RATE is not None and not self.admission.allow_command(_ip(getattr(client, "addr", None))):
+            self.metrics.rate_limited += 1
+            self.log.warning("rate_limited", addr=getattr(client, "addr", None))
+            self._reply(client, "Rate limit exceeded", False, status=Status.RATE_LIMITED)
+            return False
+        if handler not in self.deviceless and self._device_of(client) is None:
+            self._reply(client, f"No device selected | use '{Protocol.COMMANDS['SELECT']} <id>'", False,
+                        status=Status.NO_DEVICE)
+            return False
+        if handler == self._batch and getattr(client, "in_batch", False):
+            self._reply(client, "Batches cannot be nested", False, status=Status.BAD_REQUEST)
+            return False
+        histogram = self.timings.get(handler)
+        start = time.perf_counter()
+        completed = True
+        try:
+            quit_flag = handler(client, args)
+            if quit_flag and isinstance(client, TcpSession):
+                client.close()
+        except Exception:
+            completed = False
+            self.metrics.errors += 1
+            self.log.error("handler_error", addr=getattr(client, "addr", None), traceback=traceback.format_exc())
+            self._reply(client, "Internal server error", False, status=Status.INTERNAL_ERROR)
+        if histogram is not None:
+            histogram.observe(time.perf_counter() - start)
+        return completed
+
+    def _reply(self, client, message: str, ok: bool = None, value: int = 0, status: int = None,
+               cache: bool = True):
+        """Answer the command being processed.
+
+        Text clients get ``message`` (colored when ``ok`` is given); binary
+        clients get a reply frame with ``status`` (default: OK unless ``ok``
+        is False) and ``value``, and the message is never encoded. TCP text
+        replies come pre-encoded from the response cache unless ``cache`` is
+        False (one-off messages). Text replies to a tagged request start
+        with its tag.
+        """
+        tag = getattr(client, "tag", None)
+        if isinstance(client, TcpSession):
+            if client.binary:
+                if status is None:
+                    status = Status.REJECTED if ok is False else Status.OK
+                client.send_reply(BinaryProtocol.reply(client.opcode, status, value))
+            elif not cache:
+                client.send(message if tag is None else f"{tag} {message}")
+            elif tag is None:
+                client.send_reply(self.responses.encode(message, ok))
+            else:
+                client.send_reply(f"{tag} ".encode("utf-8") + self.responses.encode(message, ok))
+        else:
+            if ok is not None:
+                message = Colors.colorize(message, ok)
+            self._send_to(client, message if tag is None else f"{tag} {message}")
 
     # ------------------- COMMAND HANDLERS -------------------
 
     def _turn_on(self, client, _):
-        ok, msg = self.smart_tv.turnOn()
-        self._send_to(client, Colors.colorize(msg, ok))
+        ok, msg, state = self._tv(client).turnOn()
+        self._reply(client, msg, ok, int(state.is_on))
+        if ok:
+            self._notify_power(client, True)
 
     def _turn_off(self, client, _):
-        ok, msg = self.smart_tv.turnOff()
-        self._send_to(client, Colors.colorize(msg, ok))
+        ok, msg, state = self._tv(client).turnOff()
+        self._reply(client, msg, ok, int(state.is_on))
+        if ok:
+            self._notify_power(client, False)
 
     def _status(self, client, _):
-        state = "on" if self.smart_tv.is_on else "off"
-        self._send_to(client, f"Smart TV is {state}")
+        is_on = self._tv(client).state.is_on
+        self._reply(client, "Smart TV is on" if is_on else "Smart TV is off", value=int(is_on))
 
     def _channel_total(self, client, _):
-        ok, msg = self.smart_tv.getNumberOfChannels()
-        self._send_to(client, Colors.colorize(msg, ok))
+        tv = self._tv(client)
+        ok, msg, _ = tv.getNumberOfChannels()
+        self._reply(client, msg, ok, tv.available_channels, None if ok else Status.TV_OFF)
 
     def _channel_active(self, client, _):
-        ok, msg = self.smart_tv.getChannel()
-        self._send_to(client, Colors.colorize(msg, ok))
+        ok, msg, state = self._tv(client).getChannel()
+        self._reply(client, msg, ok, state.active_channel, None if ok else Status.TV_OFF)
 
     def _channel_set(self, client, args):
         if not args:
-            self._send_to(client, f"Usage: {Protocol.COMMANDS['CHANNEL_SET']} <#int>")
-            return
-        try:
-            new_ch = int(args[0])
-        except ValueError:
-            self._send_to(client, Colors.colorize("Channel must be an integer", False))
+            self._reply(client, f"Usage: {Protocol.COMMANDS['CHANNEL_SET']} <#int>", status=Status.BAD_REQUEST)
             return
+        new_ch = args[0]  # converted to int by the router
 
-        ok, msg = self.smart_tv.setChannel(new_ch)
-        self._send_to(client, Colors.colorize(msg, ok))
+        ok, msg, state = self._tv(client).setChannel(new_ch)
+        status = None if ok else (Status.OUT_OF_RANGE if state.is_on else Status.TV_OFF)
+        self._reply(client, msg, ok, state.active_channel, status)
         if ok:
-            self.broadcast(f"[Notification] Channel changed to {new_ch}", exclude=client)
+            self._notify_channel(client, new_ch)
 
     def _channel_down(self, client, _):
-        ok, msg = self.smart_tv.downChannel()
-        self._send_to(client, Colors.colorize(msg, ok))
+        ok, msg, state = self._tv(client).downChannel()
+        self._reply(client, msg, ok, state.active_channel)
         if ok:
-            _, ch = self.smart_tv.getChannel()
-            self.broadcast(f"[Notification] Channel changed to {ch}", exclude=client)
+            self._notify_channel(client, state.active_channel)
 
     def _channel_up(self, client, _):
-        ok, msg = self.smart_tv.upChannel()
-        self._send_to(client, Colors.colorize(msg, ok))
+        ok, msg, state = self._tv(client).upChannel()
+        self._reply(client, msg, ok, state.active_channel)
         if ok:
-            _, ch = self.smart_tv.getChannel()
-            self.broadcast(f"[Notification] Channel changed to {ch}", exclude=client)
+            self._notify_channel(client, state.active_channel)
+
+    def _subscribe(self, client, args):
+        topics = self._topics(client, args)
+        if topics is None:
+            return
+        index, subscriber = self._topic_index(client)
+        if args:  # "subscribe <topic> ..." narrows the subscription to exactly those topics
+            index.unsubscribe(subscriber, [topic for topic in Protocol.TOPICS if topic not in topics])
+        subscribed = index.subscribe(subscriber, topics)
+        message = f"Subscribed to {', '.join(subscribed)} notifications"
+        if subscriber is not client:  # UDP: the subscription lapses when the remote goes silent
+            message += (f" for {self.UDP_CLIENT_TTL:g}s; "
+                        f"send '{Protocol.COMMANDS['HEARTBEAT']}' to stay subscribed")
+        self._reply(client, message, value=BinaryProtocol.topic_mask(subscribed))
+
+    def _unsubscribe(self, client, args):
+        topics = self._topics(client, args)
+        if topics is None:
+            return
+        index, subscriber = self._topic_index(client)
+        index.unsubscribe(subscriber, topics)
+        self._reply(client, f"Unsubscribed from {', '.join(topics)} notifications",
+                    value=BinaryProtocol.topic_mask(index.topics_of(subscriber)))
+
+    def _topics(self, client, args):
+        """Topics named in ``args`` (all when none), or None after replying that one is unknown."""
+        topics = " ".join(map(str, args)).split() or list(Protocol.TOPICS)
+        for topic in topics:
+            if topic not in Protocol.TOPICS:
+                self._reply(client, f"Unknown topic '{topic}' | topics: {', '.join(Protocol.TOPICS)}", False,
+                            status=Status.BAD_REQUEST)
+                return None
+        return topics
+
+    def _topic_index(self, client):
+        """The topic index holding ``client``'s subscriptions and its key there (UDP: the address)."""
+        device = self._device_of(client)
+        if isinstance(client, TcpSession):
+            return device.tcp_topics, client
+        return device.udp_topics, client.addr
+
+    def _subscribe_defaults(self, client):
+        """Subscribe a new TCP session or UDP remote to DEFAULT_TOPICS (once it has a device)."""
+        if self.DEFAULT_TOPICS and self._device_of(client) is not None:
+            index, subscriber = self._topic_index(client)
+            index.subscribe(subscriber, self.DEFAULT_TOPICS)
+
+    def _heartbeat(self, client, _):
+        self._reply(client, "Heartbeat received")
+
+    def _select(self, client, args):
+        if self.fleet is None:
+            self._reply(client, "This server hosts a single Smart TV", False, status=Status.UNAVAILABLE)
+            return
+        if not args:
+            self._reply(client, f"Usage: {Protocol.COMMANDS['SELECT']} <id>", status=Status.BAD_REQUEST)
+            return
+        device = self.fleet.get(args[0])
+        if device is None:
+            self._reply(client, "Device limit reached", False, status=Status.UNAVAILABLE)
+            return
+
+        # Subscriptions move to the new device; a remote's first device gets DEFAULT_TOPICS.
+        previous = self._device_of(client)
+        if isinstance(client, TcpSession):
+            topics = self.DEFAULT_TOPICS
+            if previous is not None:
+                previous.tcp_clients.remove(client)
+                topics = previous.tcp_topics.unsubscribe(client)
+            client.device = device
+            device.tcp_clients.add(client)
+            device.tcp_topics.subscribe(client, topics)
+        else:
+            topics = self.DEFAULT_TOPICS
+            if previous is not None:
+                previous.udp_clients.remove(client.addr)
+                topics = previous.udp_topics.unsubscribe(client.addr)
+            self.udp_devices[client.addr] = device
+            device.udp_clients.add(client.addr)
+            device.udp_topics.subscribe(client.addr, topics)
+        self._reply(client, f"Selected device {device.id}")
+
+    def _batch(self, client, args):
+        """Run several commands in order; their replies go out together.
+
+        Text: ``batch <command>; <command>; ...``. Untagged commands in a
+        tagged batch are tagged ``<batch id>.<n>``. Binary: the payload is a
+        sequence of request frames, answered in order. A final reply reports
+        how many commands ran; refused ones (unknown, rate limited, a nested
+        batch...) are not counted.
+        """
+        tag, opcode = getattr(client, "tag", None), getattr(client, "opcode", 0)
+        if getattr(client, "binary", False):
+            commands = args
+        else:
+            commands = [c.strip() for c in " ".join(args).split(Protocol.BATCH_SEPARATOR)]
+            commands = [c for c in commands if c]
+        if not commands:
+            self._reply(client, f"Usage: {Protocol.COMMANDS['BATCH']} <command>{Protocol.BATCH_SEPARATOR} <command> ...",
+                        status=Status.BAD_REQUEST)
+            return
+
+        session = isinstance(client, TcpSession)
+        target = client if session else _ReplyCollector(client)
+        if session:
+            client.in_batch = True
+        ran = 0
+        try:
+            if getattr(client, "binary", False):
+                ran = self._process_frames(client, commands)
+            else:
+                for n, command in enumerate(commands, start=1):
+                    if session and not client.active:
+                        return  # quit inside the batch
+                    ran += self._process_command(target, command, None if tag is None else f"{tag}.{n}")
+        finally:
+            if session:
+                client.in_batch = False
+
+        target.tag, target.opcode = tag, opcode
+        self._reply(target, f"Batch done: {ran} command{'' if ran == 1 else 's'}", value=ran)
+        if not session:
+            target.flush()
+
+    def _stats(self, client, _):
+        """One line of JSON with every counter and gauge; only answered over loopback.
+
+        Binary clients get the number of commands run so far as the value
+        (counted only with COMMAND_TIMING on).
+        """
+        addr = getattr(client, "addr", None)
+        try:
+            local = ipaddress.ip_address(addr[0]).is_loopback
+        except (TypeError, IndexError, ValueError):
+            local = False
+        if not local:
+            self._reply(client, "Stats are only available from this host", False, status=Status.UNAVAILABLE)
+            return
+        snapshot = self.metrics.snapshot(self.gauges(), self.outbox_stats())
+        total = sum(h["count"] for h in snapshot["commands"].values())
+        self._reply(client, json.dumps(snapshot, separators=(",", ":")), value=total, cache=False)
 
     def _quit(self, client, _):
-        self._send_to(client, "Goodbye!")
-        print(f"[QUIT] {getattr(client, 'addr', 'unknown')}")
+        self._reply(client, "Goodbye!")
+        self.log.info("client_quit", addr=getattr(client, "addr", None))
         return True
 
     def _unsupported(self, client):
-        msg = "Unsupported command received"
-        print(Colors.colorize(msg, False))
-        self._send_to(client, Colors.colorize(msg, False))
+        self.metrics.unsupported += 1
+        self.log.warning("unsupported_command", addr=getattr(client, "addr", None))
+        self._reply(client, "Unsupported command received", False, status=Status.UNSUPPORTED)
 
     # ------------------- SERVER LIFECYCLE -------------------
 
     def start(self):
+        if self.METRICS_PORT is not None:
+            self.metrics_endpoint = MetricsEndpoint("127.0.0.1", self.METRICS_PORT, self.prometheus)
+            self.metrics_endpoint.start()
+            self.log.info("metrics_listening", port=self.metrics_endpoint.port)
         self.transport.start()
 
-    def shutdown(self):
-        print("Server shutting down...")
-        with self.tcp_lock:
-            for c in list(self.tcp_clients):
-                c.close()
-        with self.udp_lock:
-            self.udp_clients.clear()
-        if hasattr(self.transport, "shutdown"):
-            try:
-                self.transport.shutdown()
-            except Exception:
-                pass
+    def shutdown(self, timeout: float = None):
+        """Drain and stop; blocks until done, so call it from any thread but the event loop's.
+
+        New connections are no longer accepted and connected clients are no
+        longer read from. Pending notifications and queued replies are sent
+        for up to ``timeout`` seconds (default DRAIN_TIMEOUT); clients still
+        connected after that are dropped. Then ``start()`` returns.
+        """
+        timeout = self.DRAIN_TIMEOUT if timeout is None else timeout
+        self.log.info("draining", tcp_clients=len(self.tcp_clients), timeout=timeout)
+        self.quiesce()
+
+        deadline = time.monotonic() + timeout
+        clients = set(self.tcp_clients.snapshot())
+        while time.monotonic() < deadline:
+            clients.update(self.tcp_clients.snapshot())
+            if all(c.closed for c in clients):
+                break
+            time.sleep(0.01)
+        dropped = [c for c in clients if not c.closed]
+        self._run_on_loop(lambda: [c.abort("shutdown") for c in dropped])
+
+        self.udp_clients.clear()
+        for device in self._devices():
+            device.udp_topics.clear()
+        if self.metrics_endpoint is not None:
+            self.metrics_endpoint.shutdown()
+        if self.state_store is not None:
+            self.state_store.close()
+        self.timers.stop()
+        if self.trace is not None:
+            self.trace.stop()
+        self.transport.stop()
+        self.log.info("stopped", dropped=len(dropped))
+
+    def quiesce(self):
+        """Stop accepting connections and reading commands; queued replies still go out.
+
+        Each TCP session finishes what it has already read, leaves
+        ``tcp_clients`` and closes once its outbox is empty. Safe to call twice.
+        """
+        self.transport.stop_accepting()
+        self._run_on_loop(self._stop_reading)
+
+    def _stop_reading(self):
+        self.channel_notifications.flush_all()
+        for device in self.fleet if self.fleet is not None else ():
+            device.channel_notifications.flush_all()
+        for client in self.tcp_clients.snapshot():
+            client.stop_reading()
+
+    # ------------------- STATE SNAPSHOT -------------------
+
+    def snapshot_state(self) -> dict:
+        """TV state and UDP subscribers as JSON-ready data (handed to the next process on a hot restart)."""
+        self._expire_udp()
+        return {
+            "tv": self.smart_tv.state._asdict(),
+            "devices": [[d.id, d.smart_tv.state._asdict()] for d in (self.fleet or ())],
+            "udp_clients": [list(addr) for addr in self.udp_clients.snapshot()],
+            "udp_devices": [[list(addr), d.id] for addr, d in list(self.udp_devices.items())],
+            "udp_topics": [[list(addr), device.id, list(topics)] for device in self._devices()
+                           for addr, topics in self._udp_subscriptions(device).items()],
+        }
+
+    @staticmethod
+    def _udp_subscriptions(device) -> dict:
+        subscriptions = {}
+        for topic, registry in device.udp_topics.fanouts.items():
+            for addr in registry.snapshot():
+                subscriptions.setdefault(addr, []).append(topic)
+        return subscriptions
+
+    def restore_state(self, snapshot: dict):
+        """Load a snapshot_state() taken by the previous process."""
+        self.smart_tv.restore(TvState(**snapshot["tv"]))
+        if self.fleet is not None:
+            for device_id, state in snapshot["devices"]:
+                device = self.fleet.get(device_id)
+                if device is not None:
+                    device.smart_tv.restore(TvState(**state))
+            for addr, device_id in snapshot["udp_devices"]:
+                device = self.fleet.get(device_id)
+                if device is not None:
+                    self.udp_devices[tuple(addr)] = device
+                    device.udp_clients.add(tuple(addr))
+        for addr in snapshot["udp_clients"]:
+            self.udp_clients.add(tuple(addr))
+        for addr, device_id, topics in snapshot.get("udp_topics", ()):
+            if device_id is None:
+                device = self.default_device
+            else:
+                device = self.fleet.get(device_id) if self.fleet is not None else None
+            if device is not None:
+                device.udp_topics.subscribe(tuple(addr), topics)
 
 
 # ------------------- ENTRY POINT -------------------
@@ -316,8 +1255,23 @@ if __name__ == "__main__":
     host, port = "127.0.0.1", 65431
     # Choose one
     # transport = UdpTransport(host, port, None)
+    # transport = AsyncioTcpTransport(host, port, None)
+    # transport = AsyncioUdpTransport(host, port, None)
+    # transport = BatchedUdpTransport(host, port, None, workers=4)
     transport = TcpTransport(host, port, None)
 
-    server = SmartTVServer(transport, available_channels=120)
+    # Keep the TV state across restarts (optional): one TV, or a fleet
+    # state_store = MmapStateFile("smarttv.state")
+    # state_store = ChangeLogStore("smarttv-state")
+    state_store = None
+
+    # Record incoming traffic for SmartTvReplay.py (optional)
+    # trace = TraceRecorder("smarttv.trace")
+    trace = None
+
+    server = SmartTVServer(transport, available_channels=120, state_store=state_store, trace=trace)
     transport.server = server
+    # SIGTERM drains and stops; shutdown() blocks, so it runs in its own thread.
+    # (SmartTvHandoff.py runs the server with zero-downtime restarts.)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
     server.start()
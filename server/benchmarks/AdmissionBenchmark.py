@@ -0,0 +1,131 @@
+"""Connection storm, command flood and idle remotes against the admission limits.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.AdmissionBenchmark --cap 200 --storm 600 --transport threads
+
+The server runs in its own process with MAX_CONNECTIONS = ``cap``, a
+command rate limit and a short IDLE_TIMEOUT. Three checks:
+  * storm: ``storm`` remotes connect at once; exactly ``cap`` are served and
+    the rest get a "Server busy" line and are closed, and a remote that
+    connects after the storm is served normally;
+  * flood: one remote pipelines 3x the burst; the excess is rate limited;
+  * idle: a remote that sends nothing is disconnected after IDLE_TIMEOUT.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import time
+
+from SmartTvTcpServer import SmartTVServer
+from transport.TcpTransport import TcpTransport
+from transport.AsyncioTransport import AsyncioTcpTransport
+from benchmarks.TransportBenchmark import _free_port, _wait_for_port
+
+TRANSPORTS = {"threads": TcpTransport, "asyncio": AsyncioTcpTransport}
+COMMAND_RATE = 100.0
+COMMAND_BURST = 50
+IDLE_TIMEOUT = 1.0
+
+
+def _run_server(transport_name, port, cap):
+    SmartTVServer.MAX_CONNECTIONS = cap
+    SmartTVServer.MAX_CONNECTIONS_PER_IP = None
+    SmartTVServer.COMMAND_RATE = COMMAND_RATE
+    SmartTVServer.COMMAND_BURST = COMMAND_BURST
+    SmartTVServer.IDLE_TIMEOUT = IDLE_TIMEOUT
+    transport = TRANSPORTS[transport_name]("127.0.0.1", port, None)
+    server = SmartTVServer(transport, available_channels=120)
+    transport.server = server
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.start()
+
+
+async def _first_line(port, answered, hold):
+    """Connect, send "status" and return the first line; keep the socket open until ``hold`` is set."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"status\n")
+    line = await reader.readline()
+    answered.append(line)
+    await hold.wait()
+    writer.close()
+    return line
+
+
+async def _storm(port, count):
+    """Open ``count`` connections at once; returns every first line and the time until all were answered."""
+    answered, hold = [], asyncio.Event()
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(_first_line(port, answered, hold)) for _ in range(count)]
+    while len(answered) < count:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    hold.set()
+    lines = await asyncio.gather(*tasks)
+    await asyncio.sleep(0.3)  # let the server notice the disconnects
+    return lines, elapsed
+
+
+async def _flood(port, commands):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"status\n" * commands)
+    limited = 0
+    for _ in range(commands):
+        if b"Rate limit exceeded" in await reader.readline():
+            limited += 1
+    writer.close()
+    return limited
+
+
+async def _idle(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    start = time.perf_counter()
+    data = await asyncio.wait_for(reader.read(), IDLE_TIMEOUT * 4)
+    writer.close()
+    return data, time.perf_counter() - start
+
+
+async def _drive(port, cap, storm):
+    await _wait_for_port(port)
+    await asyncio.sleep(0.1)
+    lines, elapsed = await _storm(port, storm)
+    # Every remote shares 127.0.0.1's rate limit, so a served remote may be told it is limited.
+    served = sum(1 for line in lines if line.startswith((b"Smart TV is", b"\033[91mRate limit exceeded")))
+    refused = sum(1 for line in lines if b"Server busy" in line)
+    assert served == cap and refused == storm - cap, (served, refused)
+    after, _ = await _storm(port, 1)
+    assert b"Server busy" not in after[0], after
+    await asyncio.sleep(COMMAND_BURST / COMMAND_RATE)  # refill the bucket
+
+    limited = await _flood(port, COMMAND_BURST * 3)
+    assert limited >= COMMAND_BURST, limited
+
+    data, waited = await _idle(port)
+    assert data == b"" and waited <= IDLE_TIMEOUT * 2, (data, waited)
+    return served, refused, elapsed, limited, waited
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cap", type=int, default=200)
+    parser.add_argument("--storm", type=int, default=600)
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), action="append")
+    args = parser.parse_args()
+
+    for name in args.transport or sorted(TRANSPORTS):
+        port = _free_port()
+        proc = multiprocessing.Process(target=_run_server, args=(name, port, args.cap), daemon=True)
+        proc.start()
+        try:
+            served, refused, elapsed, limited, waited = asyncio.run(_drive(port, args.cap, args.storm))
+        finally:
+            proc.terminate()
+            proc.join()
+        print(f"{name:>8}: storm of {args.storm} -> {served} served, {refused} refused in {elapsed * 1000:.0f} ms | "
+              f"flood of {COMMAND_BURST * 3} -> {limited} rate limited | idle remote closed after {waited:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""Small helpers shared by the benchmark scripts."""
+
+
+def percentile(samples, pct: float):
+    """Nearest-rank percentile of ``samples`` (``pct`` in 0-100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples) -> dict:
+    """p50/p95/p99/max of ``samples``, in the unit they were recorded in."""
+    return {
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "max": max(samples) if samples else 0.0,
+    }
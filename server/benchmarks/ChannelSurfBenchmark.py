@@ -0,0 +1,110 @@
+"""Channel-surf workload: notifications and socket writes with and without coalescing.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.ChannelSurfBenchmark --listeners 50 --windows 0 0.03
+
+One remote holds "channel up" from channel 1 to the top (one command every
+``--repeat-ms``), while the listeners, subscribed to the "channel" topic,
+just receive notifications. The server
+counts its TCP write calls (one sendall each) to show the syscall reduction.
+"""
+import argparse
+import contextlib
+import io
+import socket
+import threading
+import time
+
+from SmartTvTcpServer import SmartTVServer
+from transport.TcpTransport import TcpTransport, TcpConnection
+
+
+class _CountingConnection(TcpConnection):
+    writes = 0
+
+    def writelines(self, chunks):
+        _CountingConnection.writes += 1
+        super().writelines(chunks)
+
+
+class _CountingTransport(TcpTransport):
+    def start(self):
+        server_socket = self._bind(socket.SOCK_STREAM)
+        server_socket.listen()
+        self.ready.set()
+        while True:
+            conn, addr = server_socket.accept()
+            self.server.handle_client(_CountingConnection(conn, addr))
+
+
+def _listen(sock, counts, index):
+    while True:
+        data = sock.recv(4096)
+        if not data:
+            return
+        counts[index] += data.count(b"[Notification]")
+
+
+def run(window, listeners, channels, repeat_ms):
+    transport = _CountingTransport("127.0.0.1", 0, None)
+    server = SmartTVServer(transport, available_channels=channels)
+    server.channel_notifications.window = window
+    transport.server = server
+    threading.Thread(target=server.start, daemon=True).start()
+    transport.ready.wait()
+    port = transport.port  # bound to a port the OS picked
+
+    counts = [0] * listeners
+    socks = []
+    for i in range(listeners):
+        s = socket.create_connection(("127.0.0.1", port))
+        s.sendall(b"subscribe channel\n")
+        threading.Thread(target=_listen, args=(s, counts, i), daemon=True).start()
+        socks.append(s)
+    surfer = socket.create_connection(("127.0.0.1", port))
+    while len(server.tcp_clients) < listeners + 1:
+        time.sleep(0.01)
+
+    surfer.sendall(b"turn on\n")
+    surfer.recv(4096)
+    _CountingConnection.writes = 0
+    start = time.perf_counter()
+    for _ in range(channels - 1):
+        surfer.sendall(b"channel up\n")
+        surfer.recv(4096)
+        time.sleep(repeat_ms / 1000)
+    elapsed = time.perf_counter() - start
+    time.sleep(max(window, 0) + 0.2)  # let the last window flush
+
+    for s in socks + [surfer]:
+        s.close()
+    time.sleep(0.2)  # let the server notice the disconnects
+    return {
+        "notifications_per_listener": sum(counts) / listeners,
+        "server_writes": _CountingConnection.writes,
+        "surf_s": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listeners", type=int, default=50)
+    parser.add_argument("--channels", type=int, default=120)
+    parser.add_argument("--repeat-ms", type=float, default=5.0, help="key repeat interval")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0.0, 0.03])
+    args = parser.parse_args()
+
+    for window in args.windows:
+        # Per-connection server prints would interleave with the results.
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run(window, args.listeners, args.channels, args.repeat_ms)
+        print(
+            f"window {window * 1000:>4.0f} ms: "
+            f"{result['notifications_per_listener']:.1f} notifications/listener | "
+            f"{result['server_writes']} server writes | surf {result['surf_s']:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
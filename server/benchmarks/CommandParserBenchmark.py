@@ -0,0 +1,75 @@
+"""Micro-benchmark: command routing with the old prefix-join loop vs. CommandRouter.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.CommandParserBenchmark --iterations 200000
+"""
+import argparse
+import time
+
+from helpers.ProtocolConfig import Protocol
+from helpers.CommandRouter import CommandRouter, CommandArgumentError
+
+WORKLOAD = [
+    "status",
+    "channel up",
+    "channel set 42",
+    "channel active",
+    "turn on",
+    "volume up",
+    "channel set abc",
+    "junk " * 50,
+]
+
+
+def _handler(client, args):
+    return None
+
+
+def _legacy_route(dispatch, text):
+    """The previous SmartTVServer._process_command lookup."""
+    parts = text.split()
+    for length in range(len(parts), 0, -1):
+        handler = dispatch.get(" ".join(parts[:length]))
+        if handler:
+            args = parts[length:]
+            if handler is dispatch.get(Protocol.COMMANDS["CHANNEL_SET"]) and args:
+                try:
+                    args[0] = int(args[0])
+                except ValueError:
+                    return None
+            return handler, args
+    return None
+
+
+def _measure(route, iterations):
+    workload = WORKLOAD
+    n = len(workload)
+    start = time.perf_counter()
+    for i in range(iterations):
+        route(workload[i % n])
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    dispatch = {command: _handler for command in Protocol.COMMANDS.values()}
+    router = CommandRouter(dispatch, Protocol.ARGUMENTS)
+
+    def new_route(text):
+        try:
+            return router.route(text)
+        except CommandArgumentError:
+            return None
+
+    before = _measure(lambda text: _legacy_route(dispatch, text), args.iterations)
+    after = _measure(new_route, args.iterations)
+    print(f"prefix-join : {before:,.0f} commands/s")
+    print(f"token trie  : {after:,.0f} commands/s ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
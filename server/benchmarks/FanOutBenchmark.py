@@ -0,0 +1,121 @@
+"""Measure broadcast fan-out: encode-once FanOut vs. the old per-subscriber encode under the lock.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.FanOutBenchmark --subscribers 1000 10000
+
+Subscribers are real AsyncClientSessions with in-memory connections, so a
+send is the session's own send_bytes (slow-consumer policy included) and
+the numbers isolate the server-side cost of a broadcast. Two figures per
+broadcast:
+  * latency: time to queue the notification on every subscriber;
+  * lock held: how long the subscriber-set lock is held, which is what a
+    connect or disconnect waits for. One subscriber leaves and rejoins
+    before every broadcast, so FanOut has to rebuild its snapshot.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import threading
+import time
+
+from SmartTvTcpServer import SmartTVServer, AsyncClientSession
+from helpers.FanOut import FanOut
+from transport.BaseTransport import BaseTransport
+from benchmarks.BenchStats import summarize
+from benchmarks.FleetBenchmark import _MemoryConnection
+
+MESSAGE = "[Notification] Channel changed to 42\n"
+
+
+class _TimedLock:
+    """A lock that records how long it was held."""
+
+    def __init__(self, lock):
+        self._lock = lock
+        self.held = 0.0
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._acquired = time.perf_counter()
+
+    def __exit__(self, *_):
+        self.held += time.perf_counter() - self._acquired
+        self._lock.release()
+
+
+def _legacy(sessions, rounds):
+    """The previous broadcast(): hold the set lock and encode for each session."""
+    lock = _TimedLock(threading.RLock())
+    clients = set(sessions)
+    latency, held = [], []
+    for _ in range(rounds):
+        with lock:
+            clients.discard(sessions[0])
+        with lock:
+            clients.add(sessions[0])
+        lock.held = 0.0
+        start = time.perf_counter()
+        with lock:
+            for client in list(clients):
+                client.send_bytes(MESSAGE.encode("utf-8"))
+        latency.append(time.perf_counter() - start)
+        held.append(lock.held)
+        for session in sessions:
+            session.outbox.clear()
+    return latency, held
+
+
+def _fanout(server, sessions, rounds):
+    fanout = FanOut(server._deliver_tcp)
+    fanout._lock = lock = _TimedLock(fanout._lock)
+    for session in sessions:
+        fanout.add(session)
+    payloads = (MESSAGE.encode("utf-8"), None)
+    latency, held = [], []
+    for _ in range(rounds):
+        fanout.remove(sessions[0])
+        fanout.add(sessions[0])
+        lock.held = 0.0
+        start = time.perf_counter()
+        sent = fanout.publish(payloads)
+        latency.append(time.perf_counter() - start)
+        held.append(lock.held)
+        assert sent == len(sessions), sent
+        for session in sessions:
+            session.outbox.clear()
+    return latency, held
+
+
+async def _run(counts, rounds):
+    transport = BaseTransport("127.0.0.1", 0, None)
+    transport.loop = asyncio.get_running_loop()
+    server = SmartTVServer(transport, available_channels=120)
+    results = {}
+    for count in counts:
+        sessions = [AsyncClientSession(server, _MemoryConnection(), ("remote", n)) for n in range(count)]
+        results[count] = {"legacy": _legacy(sessions, rounds), "fanout": _fanout(server, sessions, rounds)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(_run(args.subscribers, args.rounds))
+    for count, runs in results.items():
+        for name, (latency, held) in runs.items():
+            latency, held = summarize(latency), summarize(held)
+            print(
+                f"{name:>6} @ {count:>6} subscribers: "
+                f"p50 {latency['p50'] * 1e3:.3f} ms | p99 {latency['p99'] * 1e3:.3f} ms | "
+                f"lock held p50 {held['p50'] * 1e6:,.1f} us, max {held['max'] * 1e6:,.1f} us"
+            )
+
+
+if __name__ == "__main__":
+    main()
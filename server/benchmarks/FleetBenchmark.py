@@ -0,0 +1,128 @@
+"""Fleet mode: many TVs in one server process, each with its own remotes.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.FleetBenchmark --devices 1000 --remotes 10 --commands 50000
+
+Remotes are real AsyncClientSession objects on one event loop with
+in-memory connections, so the numbers cover routing, per-device state and
+per-device fan-out without socket costs. The run fails if any remote's
+latest notification does not match the channel of the TV it selected.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import sys
+import time
+
+from SmartTvTcpServer import SmartTVServer, AsyncClientSession
+from transport.BaseTransport import BaseTransport
+
+
+class _MemoryConnection:
+    def __init__(self):
+        self.received = []
+
+    def set_write_limit(self, limit):
+        pass
+
+    def buffered(self):
+        return 0
+
+    def writelines(self, chunks):
+        self.received.extend(chunks)
+
+    def close(self):
+        pass
+
+
+def _last_notification(conn):
+    last = None
+    for chunk in conn.received:
+        for line in chunk.splitlines():
+            if line.startswith(b"[Notification]"):
+                last = int(line.rsplit(b" ", 1)[1])
+    return last
+
+
+async def _run(devices, remotes, commands):
+    transport = BaseTransport("127.0.0.1", 0, None)
+    transport.loop = asyncio.get_running_loop()
+    server = SmartTVServer(transport, available_channels=120, fleet=True)
+    server.NOTIFICATION_WINDOW = 0  # publish every change so delivery can be checked exactly
+
+    sessions = []
+    start = time.perf_counter()
+    for d in range(devices):
+        for r in range(remotes):
+            conn = _MemoryConnection()
+            session = AsyncClientSession(server, conn, ("remote", d, r))
+            server.tcp_clients.add(session)
+            server._process_command(session, f"select tv{d}")
+            server._process_command(session, "subscribe channel")
+            sessions.append((d, session, conn))
+    bind_time = time.perf_counter() - start
+
+    for d in range(devices):
+        server._process_command(sessions[d * remotes][1], "turn on")
+    await asyncio.sleep(0)
+    for _, _, conn in sessions:
+        conn.received.clear()
+
+    rng = random.Random(1)
+    choices = ["channel up", "channel down", "status", "channel active"]
+    last_changer = {}
+    start = time.perf_counter()
+    for i in range(commands):
+        d, session, _ = sessions[rng.randrange(len(sessions))]
+        tv = session.device.smart_tv
+        version = tv.state.version
+        server._process_command(session, rng.choice(choices))
+        if tv.state.version != version:
+            last_changer[d] = session
+        if i % 256 == 0:
+            await asyncio.sleep(0)  # let the sessions flush
+    await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    # Every remote's latest notification must be its own TV's channel, unless
+    # it made the latest change itself (senders are not notified).
+    mismatched = 0
+    notifications = 0
+    for d, session, conn in sessions:
+        notifications += sum(chunk.count(b"[Notification]") for chunk in conn.received)
+        last = _last_notification(conn)
+        if last is None or last_changer.get(d) is session:
+            continue
+        if last != session.device.smart_tv.state.active_channel:
+            mismatched += 1
+    return {
+        "devices": len(server.fleet),
+        "bind_s": bind_time,
+        "commands_per_s": commands / elapsed,
+        "notifications": notifications,
+        "mismatched": mismatched,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--remotes", type=int, default=10)
+    parser.add_argument("--commands", type=int, default=50000)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = asyncio.run(_run(args.devices, args.remotes, args.commands))
+    print(
+        f"{result['devices']} devices x {args.remotes} remotes | bind {result['bind_s']:.2f}s | "
+        f"{result['commands_per_s']:,.0f} cmd/s | {result['notifications']} notifications | "
+        f"{result['mismatched']} mismatched"
+    )
+    sys.exit(1 if result["mismatched"] else 0)
+
+
+if __name__ == "__main__":
+    main()
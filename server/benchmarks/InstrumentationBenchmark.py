@@ -0,0 +1,100 @@
+"""Cost of the observability layer: per-command timing and sampled event logging.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.InstrumentationBenchmark --iterations 200000
+
+Two measurements:
+  * dispatch: commands through SmartTVServer._process_command into an
+    in-memory session, with COMMAND_TIMING off (the default) and on (byte
+    and broadcast counters are always on);
+  * logging: a connect/disconnect storm written as one print() per event
+    against the sampled EventLog, both to a line-buffered os.devnull.
+The stats snapshot and the Prometheus page are checked against the number
+of commands that were run.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+
+from SmartTvTcpServer import SmartTVServer, AsyncClientSession
+from helpers.EventLog import EventLog
+from transport.BaseTransport import BaseTransport
+from benchmarks.FleetBenchmark import _MemoryConnection
+
+CHANNELS = 120
+COMMANDS = ["channel up", "channel active", "channel down", "status", "channel set 42", "channel total", "turn on"]
+
+
+class _TimedServer(SmartTVServer):
+    COMMAND_TIMING = True
+
+
+async def _measure_dispatch(server_class, iterations):
+    transport = BaseTransport("127.0.0.1", 0, None)
+    transport.loop = asyncio.get_running_loop()
+    server = server_class(transport, available_channels=CHANNELS)
+    session = AsyncClientSession(server, _MemoryConnection(), ("127.0.0.1", 0))
+    server.tcp_clients.add(session)
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        server._process_command(session, COMMANDS[i % len(COMMANDS)])
+        if i % 256 == 0:
+            session.conn.received.clear()
+            await asyncio.sleep(0)  # let the session flush
+    rate = iterations / (time.perf_counter() - start)
+    await asyncio.sleep(0)
+
+    if server.COMMAND_TIMING:
+        session.conn.received.clear()
+        server._process_command(session, "stats")
+        await asyncio.sleep(0)
+        stats = json.loads(b"".join(session.conn.received))
+        counted = sum(h["count"] for h in stats["commands"].values())
+        assert counted == iterations, (counted, iterations)
+        status_runs = len(range(COMMANDS.index("status"), iterations, len(COMMANDS)))
+        page = server.prometheus()
+        assert f'smarttv_command_seconds_count{{command="status"}} {status_runs}' in page
+        assert 'smarttv_client_outbox_messages{client="127.0.0.1:0"} 0' in page
+        assert stats["outboxes"]["127.0.0.1:0"]["dropped"] == 0, stats["outboxes"]
+    return rate
+
+
+def _measure_logging(events):
+    with open(os.devnull, "w", buffering=1) as devnull:  # line buffered, like stdout on a terminal
+        start = time.perf_counter()
+        for i in range(events):
+            print(f"[TCP] Client connected: ('127.0.0.1', {i})", file=devnull)
+        printed = events / (time.perf_counter() - start)
+
+        log = EventLog(stream=devnull)
+        start = time.perf_counter()
+        for i in range(events):
+            log.info("client_connected", addr=("127.0.0.1", i))
+        sampled = events / (time.perf_counter() - start)
+    return printed, sampled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        untimed = asyncio.run(_measure_dispatch(SmartTVServer, args.iterations))
+        timed = asyncio.run(_measure_dispatch(_TimedServer, args.iterations))
+    print(f"dispatch: untimed {untimed:,.0f} cmd/s | timed {timed:,.0f} cmd/s "
+          f"({(1 - timed / untimed) * 100:+.1f}% overhead)")
+
+    printed, sampled = _measure_logging(args.iterations)
+    print(f"logging:  print {printed:,.0f} events/s | sampled event log {sampled:,.0f} events/s "
+          f"({sampled / printed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Cost of persisting TV state on the command path, crash recovery and startup time.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.PersistenceBenchmark --ops 200000 --devices 10000
+
+Three measurements:
+  * command path: channel up/down on one SmartTV with no store, with an
+    MmapStateFile and with a ChangeLogStore attached (per-operation p50/p99);
+  * crash: a child process changes ``devices`` TVs through a ChangeLogStore
+    and exits with os._exit (no close, no final fsync), leaving half a record
+    at the end of the log; the recovered states must be the ones it reported.
+    The same is done for an MmapStateFile with a torn newer slot;
+  * startup: time to recover ``devices`` TVs from a snapshot plus a log tail.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from SmartTvLogic import SmartTV, TvState
+from helpers.StateStore import ChangeLogStore, MmapStateFile
+from benchmarks.BenchStats import summarize
+
+CHANNELS = 120
+
+
+def _surf(tv, ops):
+    samples = []
+    clock = time.perf_counter_ns
+    for i in range(ops):
+        start = clock()
+        if i % 200 < 100:
+            tv.upChannel()
+        else:
+            tv.downChannel()
+        samples.append(clock() - start)
+    return summarize(samples)
+
+
+def _measure_command_path(directory, ops):
+    stores = {
+        "none": None,
+        "mmap": (MmapStateFile, os.path.join(directory, "path.state")),
+        "changelog": (ChangeLogStore, os.path.join(directory, "path")),
+    }
+    results = {}
+    for name, spec in stores.items():
+        tv = SmartTV(CHANNELS)
+        if spec is None:
+            results[name] = _surf(tv, ops)
+            continue
+        store_class, path = spec
+        store = store_class(path)
+        store.attach(None, tv)
+        results[name] = _surf(tv, ops)
+        store.close()
+        recovered = store_class(path).recovered[""]
+        assert recovered == tv.state, (name, recovered, tv.state)
+    return results
+
+
+def _crash_child(path, devices, seed, report):
+    """Change every device at random, report the final states and die without closing the store."""
+    store = ChangeLogStore(path, compact_bytes=64 * 1024)
+    rng = random.Random(seed)
+    tvs = {}
+    for device_id in map(str, range(devices)):
+        tvs[device_id] = SmartTV(CHANNELS)
+        store.attach(device_id, tvs[device_id])
+    for _ in range(devices * 5):
+        tv = tvs[str(rng.randrange(devices))]
+        tv.turnOn() if rng.random() < 0.1 else tv.setChannel(rng.randint(1, CHANNELS))
+    report.send({device_id: tuple(tv.state) for device_id, tv in tvs.items() if tv.state.version})
+    time.sleep(0.2)  # the writer has long appended everything: it is in the page cache, not yet fsynced
+    with open(path + ".log", "ab") as log:
+        log.write(b"\x00\x01\x02")  # a write torn by the crash
+    os._exit(0)
+
+
+def _check_crash(directory, devices):
+    path = os.path.join(directory, "crash")
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    child = multiprocessing.Process(target=_crash_child, args=(path, devices, 7, sender))
+    child.start()
+    expected = receiver.recv()
+    child.join()
+    start = time.perf_counter()
+    store = ChangeLogStore(path)
+    elapsed = time.perf_counter() - start
+    assert {k: tuple(v) for k, v in store.recovered.items()} == expected, "recovered state differs"
+    assert os.path.exists(path + ".snapshot"), "log was never compacted"
+    store.close()
+
+    # The mmap record: a crash in the middle of writing the newer slot leaves the older one.
+    state_path = os.path.join(directory, "crash.state")
+    store = MmapStateFile(state_path)
+    tv = SmartTV(CHANNELS)
+    store.attach(None, tv)
+    tv.turnOn()
+    tv.setChannel(42)
+    ok, _, torn = tv.setChannel(43)
+    store._map[(torn.version % 2) * store._SLOT.size + 6] ^= 0xFF  # corrupt the newest slot's channel
+    store.close()
+    recovered = MmapStateFile(state_path).recovered[""]
+    assert recovered == TvState(True, 42, torn.version - 1), recovered
+    return elapsed
+
+
+def _measure_startup(directory, devices, tail):
+    path = os.path.join(directory, "startup")
+    store = ChangeLogStore(path, compact_bytes=1)  # every write compacts: the snapshot holds all devices
+    for device_id in map(str, range(devices)):
+        store.record(device_id, TvState(True, 1 + int(device_id) % CHANNELS, 1))
+    store.close()
+    store = ChangeLogStore(path)  # now a log tail on top of it
+    rng = random.Random(3)
+    for version in range(2, tail + 2):
+        store.record(str(rng.randrange(devices)), TvState(True, rng.randint(1, CHANNELS), version))
+        if version % 1000 == 0:
+            time.sleep(0.001)  # let the writer append instead of coalescing everything into one batch
+    store.close()
+    start = time.perf_counter()
+    recovered = ChangeLogStore(path).recovered
+    elapsed = time.perf_counter() - start
+    assert len(recovered) == devices, len(recovered)
+    return elapsed, os.path.getsize(path + ".log")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--devices", type=int, default=10_000)
+    parser.add_argument("--tail", type=int, default=100_000, help="log records on top of the snapshot at startup")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, stats in _measure_command_path(directory, args.ops).items():
+            print(f"{name:>10}: channel up/down p50 {stats['p50']:.0f} ns, p99 {stats['p99']:.0f} ns, "
+                  f"max {stats['max'] / 1000:.0f} us")
+        crash_recovery = _check_crash(directory, args.devices)
+        print(f"     crash: {args.devices} devices recovered intact past a torn log tail in "
+              f"{crash_recovery * 1000:.1f} ms; mmap fell back to the older slot")
+        startup, log_bytes = _measure_startup(directory, args.devices, args.tail)
+        print(f"   startup: {args.devices} devices from snapshot + {log_bytes // 1024} KiB log tail in "
+              f"{startup * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Pipelined-client stress test for TCP command framing.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.PipelineStress --clients 8 --commands 5000
+
+Each client writes thousands of newline-terminated commands in a single
+buffer, sliced at random byte offsets so commands straddle TCP segments.
+Every command must produce exactly one reply and none may be reported as
+unsupported; the script exits non-zero otherwise.
+"""
+import argparse
+import contextlib
+import io
+import random
+import socket
+import sys
+import threading
+import time
+
+from SmartTvTcpServer import SmartTVServer
+from transport.TcpTransport import TcpTransport
+from transport.AsyncioTransport import AsyncioTcpTransport
+
+TRANSPORTS = {
+    "threaded": TcpTransport,
+    "asyncio": AsyncioTcpTransport,
+}
+COMMANDS = [b"status", b"channel active", b"channel total", b"STATUS  "]
+
+
+def _start_server(name):
+    """Start a server on a port the OS picks; returns the port."""
+    transport = TRANSPORTS[name]("127.0.0.1", 0, None)
+    server = SmartTVServer(transport, available_channels=120)
+    transport.server = server
+    threading.Thread(target=server.start, daemon=True).start()
+    if not transport.ready.wait(5):
+        raise RuntimeError("server did not start")
+    return transport.port
+
+
+def _client(port, commands, results, index):
+    payload = b"".join(random.choice(COMMANDS) + b"\n" for _ in range(commands))
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def writer():
+        pos = 0
+        while pos < len(payload):
+            step = random.randint(1, 8192)
+            sock.sendall(payload[pos:pos + step])
+            pos += step
+
+    threading.Thread(target=writer, daemon=True).start()
+    received = bytearray()
+    while received.count(b"\n") < commands:
+        data = sock.recv(65536)
+        if not data:
+            break
+        received += data
+    sock.close()
+    results[index] = (received.count(b"\n"), received.count(b"Unsupported"))
+
+
+def run(name, clients, commands):
+    with contextlib.redirect_stdout(io.StringIO()):
+        port = _start_server(name)
+        results = [None] * clients
+        threads = [
+            threading.Thread(target=_client, args=(port, commands, results, i))
+            for i in range(clients)
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        time.sleep(0.2)
+    replies = sum(r[0] for r in results)
+    unsupported = sum(r[1] for r in results)
+    return replies, unsupported, clients * commands / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--commands", type=int, default=5000)
+    args = parser.parse_args()
+
+    ok = True
+    expected = args.clients * args.commands
+    for name in TRANSPORTS:
+        replies, unsupported, rate = run(name, args.clients, args.commands)
+        passed = replies == expected and unsupported == 0
+        ok = ok and passed
+        print(
+            f"{name:>9}: {replies}/{expected} replies | {unsupported} unsupported | "
+            f"{rate:.0f} cmd/s | {'OK' if passed else 'FAIL'}"
+        )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Throughput of the pre-fork (SO_REUSEPORT) server as the worker count grows.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.PreforkBenchmark --workers 1 2 4 --load-procs 4
+
+For each worker count the cluster is started in a subprocess and several
+load processes drive pipelined ``status`` commands over many connections.
+Scaling is only visible on a machine with at least as many cores as
+workers plus load processes.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.TransportBenchmark import _free_port
+
+BATCH = 100
+
+
+def _wait_for_port(port, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"cluster on port {port} did not come up")
+
+
+async def _connection(port, rounds):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = b"status\n" * BATCH
+    for _ in range(rounds):
+        writer.write(payload)
+        pending = BATCH
+        while pending:
+            pending -= (await reader.read(65536)).count(b"\n")
+    writer.close()
+
+
+def _load_process(port, connections, rounds, results):
+    async def drive():
+        await asyncio.gather(*(_connection(port, rounds) for _ in range(connections)))
+
+    start = time.perf_counter()
+    asyncio.run(drive())
+    results.put((connections * rounds * BATCH, time.perf_counter() - start))
+
+
+def run(workers, load_procs, connections, rounds):
+    port = _free_port()  # the workers share it (SO_REUSEPORT), so it is chosen up front
+    cluster = subprocess.Popen(
+        [sys.executable, "SmartTvCluster.py", "--workers", str(workers), "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for_port(port)
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=_load_process, args=(port, connections, rounds, results))
+            for _ in range(load_procs)
+        ]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        commands = sum(results.get()[0] for _ in procs)
+        elapsed = time.perf_counter() - start
+        for p in procs:
+            p.join()
+        return commands / elapsed
+    finally:
+        cluster.terminate()
+        cluster.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--load-procs", type=int, default=os.cpu_count())
+    parser.add_argument("--connections", type=int, default=50, help="per load process")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    baseline = None
+    for workers in args.workers:
+        rate = run(workers, args.load_procs, args.connections, args.rounds)
+        baseline = baseline or rate
+        print(f"{workers:>3} workers: {rate:,.0f} cmd/s ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
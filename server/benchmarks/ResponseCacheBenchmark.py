@@ -0,0 +1,86 @@
+"""Reply path cost: format + colorize + encode per request vs. the pre-encoded response cache.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.ResponseCacheBenchmark --iterations 200000
+
+Two measurements:
+  * encode only: the previous per-request f-string/colorize/encode against
+    SmartTV's prebuilt message tables plus ResponseCache lookups;
+  * end to end: commands through SmartTVServer._process_command into an
+    in-memory session, with the cache enabled and with caching disabled.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from SmartTvLogic import channel_messages
+from SmartTvTcpServer import SmartTVServer, AsyncClientSession
+from helpers.Colors import Colors
+from helpers.ResponseCache import ResponseCache
+from transport.BaseTransport import BaseTransport
+from benchmarks.FleetBenchmark import _MemoryConnection
+
+CHANNELS = 120
+COMMANDS = ["channel up", "channel active", "channel down", "status", "channel set 42", "channel total", "turn on"]
+
+
+def _legacy_reply(channel, ok):
+    """What a channel-up reply used to cost: an f-string, colorize, newline and encode."""
+    msg = f"Channel went up to {channel}"
+    msg = Colors.colorize(msg, ok)
+    if not msg.endswith("\n"):
+        msg += "\n"
+    return msg.encode("utf-8")
+
+
+def _measure_encode(iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        _legacy_reply(i % CHANNELS + 1, i % 7 != 0)
+    legacy = iterations / (time.perf_counter() - start)
+
+    messages = channel_messages(CHANNELS)
+    cache = ResponseCache()
+    start = time.perf_counter()
+    for i in range(iterations):
+        cache.encode(messages.went_up[i % CHANNELS + 1], i % 7 != 0)
+    cached = iterations / (time.perf_counter() - start)
+    return legacy, cached
+
+
+async def _measure_server(iterations, cache_entries):
+    transport = BaseTransport("127.0.0.1", 0, None)
+    transport.loop = asyncio.get_running_loop()
+    server = SmartTVServer(transport, available_channels=CHANNELS)
+    server.responses = ResponseCache(cache_entries)
+    session = AsyncClientSession(server, _MemoryConnection(), ("bench", 0))
+    server.tcp_clients.add(session)
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        server._process_command(session, COMMANDS[i % len(COMMANDS)])
+        if i % 256 == 0:
+            session.conn.received.clear()
+            await asyncio.sleep(0)  # let the session flush
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    legacy, cached = _measure_encode(args.iterations)
+    print(f"encode only: per request {legacy:,.0f}/s | cached {cached:,.0f}/s ({cached / legacy:.1f}x)")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        uncached = asyncio.run(_measure_server(args.iterations, 0))
+        cached = asyncio.run(_measure_server(args.iterations, 4096))
+    print(f"end to end:  no cache {uncached:,.0f} cmd/s | cache {cached:,.0f} cmd/s ({cached / uncached:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Lock-step commands vs. pipelined tagged commands vs. batch commands.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.RoundTripBenchmark --commands 20000 --window 32
+
+The server runs in its own process. One remote sends ``--commands``
+commands three ways: waiting for every reply before the next command,
+pipelining ``--window`` commands tagged "@<id>" per write, and packing
+``--window`` commands into one "batch" line. Replies of the tagged modes
+are matched to their request ids; the run fails on any mismatch.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import sys
+import time
+
+from benchmarks.TransportBenchmark import TRANSPORTS, _free_port, _run_server, _wait_for_port
+
+COMMANDS = ["status", "channel active", "channel total"]
+
+
+class _Remote:
+    def __init__(self, port):
+        self.sock = socket.create_connection(("127.0.0.1", port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buf = b""
+        self.reads = 0
+        self.sock.sendall(b"turn on\n")
+        self.lines(1)
+
+    def lines(self, count):
+        lines = []
+        while len(lines) < count:
+            while b"\n" not in self.buf:
+                self.buf += self.sock.recv(65536)
+                self.reads += 1
+            *complete, self.buf = self.buf.split(b"\n")
+            lines.extend(complete)
+        return lines
+
+    def close(self):
+        self.sock.close()
+
+
+def _lockstep(remote, commands, window):
+    for i in range(commands):
+        remote.sock.sendall(f"{COMMANDS[i % 3]}\n".encode())
+        remote.lines(1)
+    return 0
+
+
+def _pipelined(remote, commands, window):
+    mismatched = 0
+    for start in range(0, commands, window):
+        ids = range(start, min(start + window, commands))
+        remote.sock.sendall("".join(f"@{i} {COMMANDS[i % 3]}\n" for i in ids).encode())
+        for i, line in zip(ids, remote.lines(len(ids))):
+            mismatched += not line.startswith(f"@{i} ".encode())
+    return mismatched
+
+
+def _batched(remote, commands, window):
+    mismatched = 0
+    for start in range(0, commands, window):
+        count = min(window, commands - start)
+        items = "; ".join(COMMANDS[i % 3] for i in range(start, start + count))
+        remote.sock.sendall(f"@b{start} batch {items}\n".encode())
+        lines = remote.lines(count + 1)  # one reply per command, then "Batch done"
+        for n, line in enumerate(lines[:-1], start=1):
+            mismatched += not line.startswith(f"@b{start}.{n} ".encode())
+        mismatched += not lines[-1].startswith(f"@b{start} Batch done".encode())
+    return mismatched
+
+
+MODES = {"lock-step": _lockstep, "pipelined": _pipelined, "batch": _batched}
+
+
+def run(name, commands, window):
+    port = _free_port()
+    proc = multiprocessing.Process(target=_run_server, args=(name, port), daemon=True)
+    proc.start()
+    results = {}
+    try:
+        asyncio.run(_wait_for_port(port))
+        for mode, drive in MODES.items():
+            remote = _Remote(port)
+            start = time.perf_counter()
+            mismatched = drive(remote, commands, window)
+            elapsed = time.perf_counter() - start
+            results[mode] = (commands / elapsed, remote.reads, mismatched)
+            remote.close()
+    finally:
+        proc.terminate()
+        proc.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=20000)
+    parser.add_argument("--window", type=int, default=32)
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), action="append")
+    args = parser.parse_args()
+
+    ok = True
+    for name in args.transport or ["threaded", "asyncio"]:
+        for mode, (rate, reads, mismatched) in run(name, args.commands, args.window).items():
+            ok = ok and not mismatched
+            print(f"{name:>9} {mode:>10}: {rate:,.0f} cmd/s | {reads} client reads | {mismatched} mismatched ids")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Multithreaded contention benchmark and correctness check for the SmartTV state engine.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.StateContentionBenchmark --writers 4 --readers 2 --ops 20000
+
+Writers surf channels (up/down/set, plus optimistic read-then-
+compare_and_set updates) while readers poll status and the active
+channel. Afterwards the run is checked: every successful write must have
+bumped the version exactly once, every returned snapshot must match the
+reply text, a compare_and_set may only fail if the version really moved,
+and a reader must never see the version go backwards. compare_and_set is
+also checked to reject unknown fields and invalid values without
+touching the state.
+The script exits non-zero if any check fails.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+
+from SmartTvLogic import SmartTV
+
+
+def _writer(tv, ops, results, index):
+    rng = random.Random(index)
+    successes = 0
+    errors = []
+    for _ in range(ops):
+        choice = rng.random()
+        if choice < 0.4:
+            ok, msg, state = tv.upChannel()
+            expected = f"Channel went up to {state.active_channel}"
+        elif choice < 0.8:
+            ok, msg, state = tv.downChannel()
+            expected = f"Channel went down to {state.active_channel}"
+        elif choice < 0.9:
+            seen = tv.state
+            channel = rng.randint(1, tv.available_channels)
+            ok, state = tv.compare_and_set(seen.version, active_channel=channel)
+            if ok and (state.version != seen.version + 1 or state.active_channel != channel):
+                errors.append(f"compare_and_set {channel} at {seen} returned snapshot {state}")
+            elif not ok and state.version == seen.version:
+                errors.append(f"compare_and_set at {seen} failed without a conflict")
+            successes += ok
+            continue
+        else:
+            channel = rng.randint(1, tv.available_channels)
+            ok, msg, state = tv.setChannel(channel)
+            expected = f"Active channel set to: {channel}"
+            if ok and state.active_channel != channel:
+                errors.append(f"set {channel} returned snapshot {state}")
+        if ok:
+            successes += 1
+            if msg != expected:
+                errors.append(f"reply {msg!r} does not match snapshot {state}")
+    results[index] = (successes, errors)
+
+
+def _check_rejects(tv) -> list:
+    """compare_and_set must refuse bad requests outright instead of reporting a conflict."""
+    errors = []
+    before = tv.state
+    bad = [{"version": 0}, {"volume": 3}, {"is_on": "banana"}, {"is_on": 1},
+           {"active_channel": 0}, {"active_channel": tv.available_channels + 1}, {"active_channel": "7"}]
+    for changes in bad:
+        try:
+            tv.compare_and_set(before.version, **changes)
+        except (TypeError, ValueError):
+            continue
+        errors.append(f"compare_and_set accepted {changes}")
+    if tv.state != before:
+        errors.append(f"rejected compare_and_set calls changed the state: {before} -> {tv.state}")
+    ok, state = tv.compare_and_set(before.version - 1, active_channel=1)
+    if ok or state != before:
+        errors.append(f"compare_and_set with a stale version returned {(ok, state)}")
+    return errors
+
+
+def _reader(tv, stop, results, index):
+    reads = 0
+    last_version = -1
+    errors = []
+    while not stop.is_set():
+        state = tv.state
+        if state.version < last_version:
+            errors.append(f"version went backwards: {last_version} -> {state.version}")
+        last_version = state.version
+        tv.getChannel()
+        reads += 2
+    results[index] = (reads, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--ops", type=int, default=20000, help="operations per writer")
+    args = parser.parse_args()
+
+    tv = SmartTV(120)
+    tv.turnOn()
+    start_version = tv.state.version
+
+    writer_results = [None] * args.writers
+    reader_results = [None] * args.readers
+    stop = threading.Event()
+    writers = [threading.Thread(target=_writer, args=(tv, args.ops, writer_results, i))
+               for i in range(args.writers)]
+    readers = [threading.Thread(target=_reader, args=(tv, stop, reader_results, i))
+               for i in range(args.readers)]
+
+    start = time.perf_counter()
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in readers:
+        t.join()
+
+    successes = sum(r[0] for r in writer_results)
+    reads = sum(r[0] for r in reader_results)
+    errors = [e for r in writer_results + reader_results for e in r[1]]
+    final = tv.state
+    if final.version - start_version != successes:
+        errors.append(f"version advanced {final.version - start_version} times for {successes} writes")
+    errors += _check_rejects(tv)
+
+    print(f"writes: {args.writers * args.ops / elapsed:,.0f} ops/s ({successes} changed state)")
+    print(f"reads : {reads / elapsed:,.0f} ops/s")
+    print(f"final : {final}")
+    for error in errors[:10]:
+        print(f"FAIL: {error}")
+    print("OK" if not errors else f"{len(errors)} check(s) failed")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
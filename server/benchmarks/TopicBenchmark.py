@@ -0,0 +1,87 @@
+"""Broadcast cost when only some remotes subscribe: topic index vs. every connected client.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.TopicBenchmark --remotes 10000 --subscribed 0.1
+
+``remotes`` AsyncClientSessions with in-memory connections are connected
+to one server; a ``subscribed`` share of them sends "subscribe channel".
+A channel notification is then broadcast to the "channel" topic (only
+those remotes are visited) and, for comparison, to every connected
+client, as broadcast() did before topics. Delivery counts are checked:
+subscribers get every topic notification and nobody else gets one.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+
+from SmartTvTcpServer import SmartTVServer, AsyncClientSession
+from transport.BaseTransport import BaseTransport
+from benchmarks.BenchStats import summarize
+from benchmarks.FleetBenchmark import _MemoryConnection
+
+
+def _time_broadcasts(server, notification, topic, rounds, sessions):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        server.broadcast(notification, topic=topic)
+        samples.append(time.perf_counter() - start)
+        for session in sessions:
+            session.outbox.clear()
+    return summarize(samples)
+
+
+async def _run(remotes, share, rounds):
+    transport = BaseTransport("127.0.0.1", 0, None)
+    transport.loop = asyncio.get_running_loop()
+    server = SmartTVServer(transport, available_channels=120)
+    sessions, subscribed = [], set()
+    for n in range(remotes):
+        session = AsyncClientSession(server, _MemoryConnection(), ("remote", n))
+        server.tcp_clients.add(session)
+        if n < remotes * share:
+            server._process_command(session, "subscribe channel")
+            subscribed.add(session)
+        sessions.append(session)
+    await asyncio.sleep(0)
+    for session in sessions:
+        session.conn.received.clear()
+
+    # Correctness: one notification, delivered to the subscribers only.
+    server.broadcast(server.responses.channel_notification(42), topic="channel")
+    await asyncio.sleep(0)
+    for session in sessions:
+        got = sum(chunk.count(b"[Notification]") for chunk in session.conn.received)
+        assert got == (session in subscribed), (session.addr, got)
+
+    # Timing: the sessions are not flushed in between, so only the fan-out itself is measured.
+    notification = server.responses.channel_notification(43)
+    return {
+        "topic": _time_broadcasts(server, notification, "channel", rounds, sessions),
+        "everyone": _time_broadcasts(server, notification, None, rounds, sessions),
+        "subscribers": len(subscribed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--remotes", type=int, default=10000)
+    parser.add_argument("--subscribed", type=float, default=0.1, help="share of remotes that subscribe")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = asyncio.run(_run(args.remotes, args.subscribed, args.rounds))
+    for name in ("topic", "everyone"):
+        stats = result[name]
+        print(f"{name:>9}: broadcast p50 {stats['p50'] * 1e6:,.0f} us, p99 {stats['p99'] * 1e6:,.0f} us "
+              f"({result['subscribers']} of {args.remotes} remotes subscribed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Trace capture overhead and deterministic in-process replay (SmartTvReplay.py).
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.TraceBenchmark --remotes 200 --commands 50000
+
+Two measurements:
+  * capture: time to run one read's worth of commands through
+    SmartTVServer._receive with and without a TraceRecorder attached
+    (per-read p50/p99);
+  * replay: a synthetic workload (TCP remotes sending pipelined and split
+    commands, UDP remotes, disconnects) is recorded from an in-process
+    server, then replayed twice. Both replays must end in the recorded TV
+    state and send every connection exactly the bytes the recorded server
+    sent it (same digest).
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from SmartTvTcpServer import AsyncClientSession
+from SmartTvReplay import (ReplayServer, replay_in_process, output_digest,
+                           _MemoryConnection, _MemoryDatagramSocket, _MemoryDatagramTarget)
+from helpers.TraceLog import TraceRecorder, read_trace
+from transport.BaseTransport import BaseTransport
+from benchmarks.BenchStats import summarize
+
+COMMANDS = ["channel up"] * 6 + ["channel down"] * 4 + ["status", "channel active", "turn on", "turn off"]
+
+
+def _server(trace=None):
+    transport = BaseTransport("127.0.0.1", 0, None)
+    transport.loop = asyncio.get_running_loop()
+    udp_targets = {}
+    transport.server_socket = _MemoryDatagramSocket(udp_targets)
+    return ReplayServer(transport, available_channels=120, trace=trace), udp_targets
+
+
+def _command(rng, n):
+    command = rng.choice(COMMANDS) if rng.random() < 0.95 else f"channel set {rng.randint(1, 120)}"
+    return f"@{n} {command}\n"
+
+
+async def _measure_capture(directory, reads):
+    chunk = "".join(f"@{n} channel up\n" for n in range(4)).encode()
+    results = {}
+    for name in ("off", "on"):
+        trace = TraceRecorder(os.path.join(directory, "capture.trace")) if name == "on" else None
+        server, _ = _server(trace)
+        session = AsyncClientSession(server, _MemoryConnection(), ("remote", 0))
+        server.tcp_clients.add(session)
+        framer = server._receive(session, None, b"subscribe\n")
+        samples = []
+        clock = time.perf_counter_ns
+        for i in range(reads):
+            start = clock()
+            server._receive(session, framer, chunk)
+            samples.append(clock() - start)
+            if i % 64 == 0:
+                await asyncio.sleep(0)
+        if trace is not None:
+            trace.stop()
+            assert trace.records == reads + 2, trace.records  # open, subscribe, reads
+        results[name] = summarize(samples)
+    return results
+
+
+async def _record(path, remotes, commands, seed):
+    """Run a random workload on a traced server; returns the digest of its output and its final TV state."""
+    rng = random.Random(seed)
+    trace = TraceRecorder(path)
+    server, udp_targets = _server(trace)
+    sessions, pending = [], {}
+    for n in range(remotes):
+        session = AsyncClientSession(server, _MemoryConnection(), ("remote", n))
+        server.tcp_clients.add(session)
+        sessions.append(session)
+        pending[session] = server._receive(session, None, b"subscribe\n" if n % 2 else b"status\n")
+    for n in range(remotes // 4):
+        target = udp_targets[("10.0.0.1", 5000 + n)] = _MemoryDatagramTarget(("10.0.0.1", 5000 + n))
+        server.handle_datagram(b"subscribe", target)
+
+    targets = list(udp_targets.values())
+    for n in range(commands):
+        if n % 64 == 0:
+            await asyncio.sleep(0)
+        if rng.random() < 0.1:
+            server.handle_datagram(rng.choice(COMMANDS).encode(), rng.choice(targets))
+            continue
+        session = rng.choice(sessions)
+        data = "".join(_command(rng, n) for _ in range(rng.randint(1, 4))).encode()
+        if rng.random() < 0.2:  # a command split across two reads
+            cut = rng.randrange(1, len(data))
+            pending[session] = server._receive(session, pending[session], data[:cut])
+            data = data[cut:]
+        pending[session] = server._receive(session, pending[session], data)
+        if rng.random() < 0.002 and len(sessions) > 1:
+            sessions.remove(session)
+            server._remove_client(session)
+    await asyncio.sleep(0)
+    for session in sessions:
+        server._remove_client(session)
+    trace.stop()
+
+    outputs = {session.trace_id: session.conn for session in pending}
+    outputs.update((trace._udp_ids[addr], target) for addr, target in udp_targets.items())
+    return output_digest(outputs), list(server.smart_tv.state[:2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reads", type=int, default=100_000, help="reads timed for the capture overhead")
+    parser.add_argument("--remotes", type=int, default=200)
+    parser.add_argument("--commands", type=int, default=50_000)
+    args = parser.parse_args()
+
+    # The servers log to stdout
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        capture = asyncio.run(_measure_capture(directory, args.reads))
+        path = os.path.join(directory, "workload.trace")
+        digest, state = asyncio.run(_record(path, args.remotes, args.commands, seed=11))
+        events = list(read_trace(path))
+        size = os.path.getsize(path)
+        replays = [asyncio.run(replay_in_process(events)) for _ in range(2)]
+
+    for name, stats in capture.items():
+        print(f"capture {name:>3}: one read of 4 commands p50 {stats['p50'] / 1000:.1f} us, "
+              f"p99 {stats['p99'] / 1000:.1f} us")
+    for report in replays:
+        assert report["digest"] == digest, (report["digest"], digest)
+        assert report["tv_states"][""] == state, (report["tv_states"], state)
+    print(f"     replay: {len(events)} events ({size // 1024} KiB trace) at "
+          f"{replays[0]['events_per_s']:,} / {replays[1]['events_per_s']:,} events/s; "
+          f"both replays match the recorded output (digest {digest})")
+
+
+if __name__ == "__main__":
+    main()
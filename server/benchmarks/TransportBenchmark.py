@@ -0,0 +1,137 @@
+"""Compare the threaded TCP transport against the asyncio TCP transport.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.TransportBenchmark --clients 2000 --rounds 20
+
+Each transport is started in its own process. N remotes connect from a single
+asyncio loop and each performs a number of ``status`` round trips; the server's
+thread count and resident memory are read from /proc while all remotes are
+connected.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import socket
+import time
+
+from SmartTvTcpServer import SmartTVServer
+from transport.TcpTransport import TcpTransport
+from transport.AsyncioTransport import AsyncioTcpTransport
+
+TRANSPORTS = {
+    "threaded": TcpTransport,
+    "asyncio": AsyncioTcpTransport,
+}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _run_server(name, port):
+    transport = TRANSPORTS[name]("127.0.0.1", port, None)
+    server = SmartTVServer(transport, available_channels=120)
+    transport.server = server
+    # Per-connection prints would dominate the measurement.
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.start()
+
+
+def _proc_status(pid):
+    """Return (threads, rss_kb) for a process, or (None, None) off Linux."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["Threads"]), int(fields["VmRSS"].split()[0])
+    except OSError:
+        return None, None
+
+
+async def _wait_for_port(port, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+
+async def _remote(port, rounds, connected, go):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    connected()
+    await go.wait()
+    for _ in range(rounds):
+        writer.write(b"status\n")
+        reply = await reader.readline()
+        assert reply.startswith(b"Smart TV is"), reply  # not "Server busy" or a dropped connection
+    writer.close()
+
+
+async def _drive(pid, port, clients, rounds):
+    await _wait_for_port(port)
+    go = asyncio.Event()
+    count = 0
+    all_connected = asyncio.Event()
+
+    def connected():
+        nonlocal count
+        count += 1
+        if count == clients:
+            all_connected.set()
+
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(_remote(port, rounds, connected, go)) for _ in range(clients)]
+    await all_connected.wait()
+    connect_time = time.perf_counter() - start
+    await asyncio.sleep(0.5)  # let the server settle its per-client resources
+    threads, rss_kb = _proc_status(pid)
+
+    start = time.perf_counter()
+    go.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    return {
+        "connect_s": connect_time,
+        "requests_per_s": clients * rounds / elapsed,
+        "server_threads": threads,
+        "server_rss_kb": rss_kb,
+    }
+
+
+def run(name, clients, rounds):
+    port = _free_port()
+    proc = multiprocessing.Process(target=_run_server, args=(name, port), daemon=True)
+    proc.start()
+    try:
+        return asyncio.run(_drive(proc.pid, port, clients, rounds))
+    finally:
+        proc.terminate()
+        proc.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), action="append")
+    args = parser.parse_args()
+
+    for name in args.transport or ["threaded", "asyncio"]:
+        result = run(name, args.clients, args.rounds)
+        print(
+            f"{name:>9}: {args.clients} clients | connect {result['connect_s']:.2f}s | "
+            f"{result['requests_per_s']:.0f} req/s | "
+            f"threads {result['server_threads']} | rss {result['server_rss_kb']} kB"
+        )
+
+
+if __name__ == "__main__":
+    main()
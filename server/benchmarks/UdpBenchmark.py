@@ -0,0 +1,97 @@
+"""Datagrams per second on loopback: UdpTransport vs. BatchedUdpTransport.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.UdpBenchmark --senders 4 --window 64 --seconds 3
+
+Each transport runs in its own process. Sender processes keep ``--window``
+``status`` datagrams in flight and count the replies they get back.
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import socket
+import threading
+import time
+
+from SmartTvTcpServer import SmartTVServer
+from transport.UdpTransport import UdpTransport
+from transport.BatchedUdpTransport import BatchedUdpTransport
+
+TRANSPORTS = {
+    "udp": lambda host, port: UdpTransport(host, port, None),
+    "batched": lambda host, port: BatchedUdpTransport(host, port, None),
+    "batched+pool": lambda host, port: BatchedUdpTransport(host, port, None, workers=4),
+}
+
+
+def _run_server(name, ports):
+    """Serve on a port the OS picks and report it on ``ports`` once bound."""
+    transport = TRANSPORTS[name]("127.0.0.1", 0)
+    server = SmartTVServer(transport, available_channels=120)
+    transport.server = server
+
+    def report_port():
+        transport.ready.wait()
+        ports.put(transport.port)
+
+    threading.Thread(target=report_port, daemon=True).start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.start()
+
+
+def _sender(port, window, seconds, results):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(0.2)
+    target = ("127.0.0.1", port)
+    replies = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(window):
+            sock.sendto(b"status", target)
+        for _ in range(window):
+            try:
+                sock.recv(4096)
+                replies += 1
+            except socket.timeout:
+                break
+    results.put(replies)
+
+
+def run(name, senders, window, seconds):
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_run_server, args=(name, ports), daemon=True)
+    server.start()
+    port = ports.get(timeout=10)
+    try:
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=_sender, args=(port, window, seconds, results))
+            for _ in range(senders)
+        ]
+        for p in procs:
+            p.start()
+        replies = sum(results.get() for _ in procs)
+        for p in procs:
+            p.join()
+        return replies / seconds
+    finally:
+        server.terminate()
+        server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--senders", type=int, default=4)
+    parser.add_argument("--window", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    for name in TRANSPORTS:
+        rate = run(name, args.senders, args.window, args.seconds)
+        print(f"{name:>13}: {rate:,.0f} datagrams/s")
+
+
+if __name__ == "__main__":
+    main()
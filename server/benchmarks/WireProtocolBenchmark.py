@@ -0,0 +1,154 @@
+"""Compare the text protocol against the binary protocol: bytes on the wire and commands/sec.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.WireProtocolBenchmark --clients 50 --rounds 200 --depth 16
+
+The server (asyncio transport, fleet mode) runs in its own process and every
+remote selects its own TV, so the only traffic is request/reply. Each remote
+sends ``depth`` pipelined commands per round and reads all the replies. The
+measurement covers the client's side too: text replies are stripped of color
+codes and parsed back into a number, binary replies are unpacked with struct.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import re
+import time
+
+from SmartTvTcpServer import SmartTVServer
+from helpers.BinaryProtocol import BinaryProtocol
+from helpers.Colors import Colors
+from transport.AsyncioTransport import AsyncioTcpTransport
+from benchmarks.TransportBenchmark import _free_port, _wait_for_port
+
+# (command, argument) pairs cycled through by every remote
+WORKLOAD = [
+    ("channel up", None),
+    ("channel active", None),
+    ("channel set", 42),
+    ("status", None),
+    ("channel down", None),
+    ("channel total", None),
+]
+
+_NUMBER = re.compile(rb"(\d+)\s*$")
+
+
+def _run_server(port):
+    transport = AsyncioTcpTransport("127.0.0.1", port, None)
+    server = SmartTVServer(transport, available_channels=120, fleet=True)
+    transport.server = server
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.start()
+
+
+def _parse_text(line: bytes):
+    """What a text client has to do to get a value back out of a reply."""
+    line = line.replace(Colors.RED.encode(), b"").replace(Colors.RESET.encode(), b"")
+    match = _NUMBER.search(line)
+    if match:
+        return int(match.group(1))
+    return 1 if line.endswith(b" on") else 0
+
+
+class _TextRemote:
+    def __init__(self, device):
+        self.setup = f"select {device}\nturn on\n".encode()
+        self.setup_replies = 2
+        self.received = 0
+
+    def encode(self, commands):
+        return b"".join(f"{c} {a}\n".encode() if a is not None else f"{c}\n".encode() for c, a in commands)
+
+    async def read(self, reader, buf, count):
+        lines = []
+        while len(lines) < count:
+            while b"\n" not in buf:
+                chunk = await reader.read(65536)
+                self.received += len(chunk)
+                buf += chunk
+            *complete, buf = buf.split(b"\n")
+            lines.extend(complete)
+        return [_parse_text(line) for line in lines], buf
+
+
+class _BinaryRemote:
+    def __init__(self, device):
+        self.setup = (BinaryProtocol.MAGIC + BinaryProtocol.request("select", device)
+                      + BinaryProtocol.request("turn on"))
+        self.setup_replies = 3  # hello, select, turn on
+        self.received = 0
+
+    def encode(self, commands):
+        return b"".join(BinaryProtocol.request(c, a) for c, a in commands)
+
+    async def read(self, reader, buf, count):
+        size = count * BinaryProtocol.REPLY.size
+        while len(buf) < size:
+            chunk = await reader.read(65536)
+            self.received += len(chunk)
+            buf += chunk
+        values = [value for _, _, _, value in BinaryProtocol.REPLY.iter_unpack(buf[:size])]
+        return values, buf[size:]
+
+
+async def _remote(port, remote, rounds, depth, totals):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(remote.setup)
+    _, buf = await remote.read(reader, b"", remote.setup_replies)
+    remote.received = len(buf)  # count from the first measured reply on
+
+    batches = [[WORKLOAD[(r * depth + i) % len(WORKLOAD)] for i in range(depth)] for r in range(len(WORKLOAD))]
+    for r in range(rounds):
+        payload = remote.encode(batches[r % len(batches)])
+        writer.write(payload)
+        totals["sent"] += len(payload)
+        values, buf = await remote.read(reader, buf, depth)
+        assert len(values) == depth
+    writer.close()
+    totals["received"] += remote.received
+    totals["commands"] += rounds * depth
+
+
+async def _measure(port, make_remote, clients, rounds, depth):
+    totals = {"sent": 0, "received": 0, "commands": 0}
+    remotes = [make_remote(f"{make_remote.__name__}{i}") for i in range(clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(_remote(port, r, rounds, depth, totals) for r in remotes))
+    elapsed = time.perf_counter() - start
+    commands = totals["commands"]
+    return commands / elapsed, totals["sent"] / commands, totals["received"] / commands
+
+
+async def _drive(port, clients, rounds, depth):
+    await _wait_for_port(port)
+    results = {}
+    for name, make_remote in (("text", _TextRemote), ("binary", _BinaryRemote)):
+        results[name] = await _measure(port, make_remote, clients, rounds, depth)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--depth", type=int, default=16)
+    args = parser.parse_args()
+
+    port = _free_port()
+    proc = multiprocessing.Process(target=_run_server, args=(port,), daemon=True)
+    proc.start()
+    try:
+        results = asyncio.run(_drive(port, args.clients, args.rounds, args.depth))
+    finally:
+        proc.terminate()
+        proc.join()
+    for name, (rate, request_bytes, reply_bytes) in results.items():
+        print(f"{name:>6}: {rate:,.0f} cmd/s | {request_bytes:.1f} request + {reply_bytes:.1f} reply bytes/cmd")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """``rate`` tokens per second, at most ``burst`` saved up; one token per command."""
+
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+
+    def take(self, now: float) -> bool:
+        tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if tokens < 1:
+            self.tokens = tokens
+            return False
+        self.tokens = tokens - 1
+        return True
+
+    def full(self, now: float) -> bool:
+        return self.tokens + (now - self.stamp) * self.rate >= self.burst
+
+
+class AdmissionControl:
+    """Connection caps (total and per IP) and per-IP command rate limits.
+
+    Connection counts change under a lock, once per connect and disconnect.
+    Command buckets are looked up and drawn from without one: concurrent
+    sessions from the same IP may very rarely both get the last token,
+    which is cheaper than serializing every command. A limit of None
+    disables that check.
+    """
+
+    # Idle (full) buckets are dropped once this many IPs have one
+    MAX_BUCKETS = 65536
+
+    def __init__(self, max_connections=None, max_per_ip=None, command_rate=None, command_burst=None,
+                 clock=time.monotonic):
+        self.max_connections = max_connections
+        self.max_per_ip = max_per_ip
+        self.command_rate = command_rate
+        self.command_burst = command_burst or command_rate
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._per_ip = {}   # ip -> open connections
+        self._buckets = {}  # ip -> TokenBucket
+        self.connections = 0
+
+    def admit(self, ip) -> str:
+        """Count a new connection from ``ip``; returns why it is refused, or None if admitted."""
+        with self._lock:
+            if self.max_connections is not None and self.connections >= self.max_connections:
+                return "too many connections"
+            count = self._per_ip.get(ip, 0)
+            if self.max_per_ip is not None and count >= self.max_per_ip:
+                return "too many connections from this address"
+            self._per_ip[ip] = count + 1
+            self.connections += 1
+        return None
+
+    def release(self, ip):
+        """Forget one admitted connection from ``ip``."""
+        with self._lock:
+            if ip not in self._per_ip:
+                return  # never admitted (sessions created directly, as in the benchmarks)
+            count = self._per_ip[ip] - 1
+            if count > 0:
+                self._per_ip[ip] = count
+            else:
+                self._per_ip.pop(ip, None)
+            self.connections -= 1
+
+    def allow_command(self, ip) -> bool:
+        """Draw one token from ``ip``'s bucket (always True without a rate limit)."""
+        if self.command_rate is None:
+            return True
+        now = self.clock()
+        bucket = self._buckets.get(ip)
+        if bucket is None:
+            if len(self._buckets) >= self.MAX_BUCKETS:
+                self._prune(now)
+            bucket = self._buckets.setdefault(ip, TokenBucket(self.command_rate, self.command_burst, now))
+        return bucket.take(now)
+
+    def _prune(self, now: float):
+        # A full bucket is indistinguishable from a new one, so dropping it loses nothing.
+        with self._lock:
+            for ip, bucket in list(self._buckets.items()):
+                if bucket.full(now):
+                    del self._buckets[ip]
+
+    def stats(self) -> dict:
+        return {"connections": self.connections, "addresses": len(self._per_ip), "rate_buckets": len(self._buckets)}
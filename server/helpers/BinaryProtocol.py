@@ -0,0 +1,142 @@
+import struct
+from collections import namedtuple
+from helpers.ProtocolConfig import Protocol
+
+
+class Status:
+    """One-byte status codes of binary reply frames."""
+
+    OK = 0
+    REJECTED = 1        # nothing to do: already on/off, channel already at its limit
+    TV_OFF = 2
+    OUT_OF_RANGE = 3
+    BAD_REQUEST = 4     # missing or malformed arguments
+    UNSUPPORTED = 5     # unknown opcode
+    NO_DEVICE = 6       # fleet mode: select a device first
+    TOO_LONG = 7
+    UNAVAILABLE = 8     # single-TV server, or the device limit was reached
+    INTERNAL_ERROR = 9
+    RATE_LIMITED = 10   # this address sent commands faster than its rate limit
+
+
+# A notification encoded for both protocols (text line and binary frame, both bytes);
+# the pair travels together through broadcast()
+Notification = namedtuple("Notification", ["text", "frame"])
+
+
+class BinaryProtocol:
+    """Compact length-prefixed alternative to the text protocol.
+
+    A TCP client opts in by sending ``MAGIC`` as the very first byte of the
+    connection (a text command never starts with a NUL byte); the server
+    answers with a ``HELLO`` reply whose value is ``VERSION``.
+
+    Request:  u16 length | u8 opcode | payload     (length counts opcode + payload)
+    Reply:    u16 length | u8 opcode | u8 status | i32 value   (always 8 bytes)
+
+    Opcodes are the positions of the commands in ``Protocol.COMMANDS``
+    (``Protocol.OPCODES``). ``channel set`` carries an i32 channel,
+    ``select`` the UTF-8 device id, ``subscribe`` and ``unsubscribe``
+    space-separated UTF-8 topics (none: all) and ``batch`` a sequence of
+    complete request frames; every other request has no payload. Replies
+    echo the request's opcode and come back in request order; the value is
+    the channel, channel count or power state the command produced (0 where
+    there is none; the number of commands run for ``batch``; for
+    ``subscribe`` and ``unsubscribe`` the topics now subscribed, as a bit
+    mask over ``Protocol.TOPICS``). Notifications are reply frames with
+    opcode ``NOTIFY_CHANNEL`` (value: the channel) or ``NOTIFY_POWER``
+    (value: 1 on, 0 off).
+    All integers are big-endian.
+    """
+
+    MAGIC = b"\x00"
+    VERSION = 1
+
+    HELLO = 0
+    NOTIFY_CHANNEL = 0x80
+    NOTIFY_POWER = 0x81
+
+    HEADER = struct.Struct("!HB")     # length, opcode
+    REPLY = struct.Struct("!HBBi")    # length, opcode, status, value
+    INT = struct.Struct("!i")
+
+    REPLY_LENGTH = REPLY.size - 2
+
+    # A queued notification frame starts with these bytes (see OutboundQueue)
+    CHANNEL_NOTIFICATION = HEADER.pack(REPLY_LENGTH, NOTIFY_CHANNEL)
+
+    @classmethod
+    def request(cls, command: str, argument=None) -> bytes:
+        """Encode ``command`` (a ``Protocol.COMMANDS`` value) with its optional argument."""
+        if argument is None:
+            payload = b""
+        elif isinstance(argument, (bytes, bytearray)):
+            payload = bytes(argument)
+        elif isinstance(argument, int):
+            payload = cls.INT.pack(argument)
+        else:
+            payload = str(argument).encode("utf-8")
+        return cls.HEADER.pack(1 + len(payload), Protocol.OPCODES[command]) + payload
+
+    @classmethod
+    def batch(cls, requests) -> bytes:
+        """One ``batch`` frame carrying already encoded request frames."""
+        return cls.request(Protocol.COMMANDS["BATCH"], b"".join(requests))
+
+    @classmethod
+    def reply(cls, opcode: int, status: int, value: int = 0) -> bytes:
+        return cls.REPLY.pack(cls.REPLY_LENGTH, opcode, status, value)
+
+    @classmethod
+    def notification(cls, channel: int) -> bytes:
+        return cls.REPLY.pack(cls.REPLY_LENGTH, cls.NOTIFY_CHANNEL, Status.OK, channel)
+
+    @classmethod
+    def power_notification(cls, is_on: bool) -> bytes:
+        return cls.REPLY.pack(cls.REPLY_LENGTH, cls.NOTIFY_POWER, Status.OK, int(is_on))
+
+    @staticmethod
+    def topic_mask(topics) -> int:
+        return sum(1 << i for i, topic in enumerate(Protocol.TOPICS) if topic in topics)
+
+    @classmethod
+    def decode_reply(cls, frame) -> tuple:
+        """Return ``(opcode, status, value)`` for one complete reply frame."""
+        _, opcode, status, value = cls.REPLY.unpack(frame)
+        return opcode, status, value
+
+    @classmethod
+    def decode_arguments(cls, command: str, payload) -> list:
+        """Request payload -> handler arguments, like CommandRouter does for text.
+
+        Raises ValueError for a malformed payload.
+        """
+        if not payload:
+            return []
+        if command == Protocol.COMMANDS["CHANNEL_SET"]:
+            if len(payload) != cls.INT.size:
+                raise ValueError("Channel must be a 4-byte integer")
+            return [cls.INT.unpack(payload)[0]]
+        if command == Protocol.COMMANDS["SELECT"]:
+            return [bytes(payload).decode("utf-8").lower()]
+        if command in (Protocol.COMMANDS["SUBSCRIBE"], Protocol.COMMANDS["UNSUBSCRIBE"]):
+            return bytes(payload).decode("utf-8").lower().split()
+        if command == Protocol.COMMANDS["BATCH"]:
+            return cls.split_frames(payload)
+        raise ValueError(f"'{command}' takes no arguments")
+
+    @classmethod
+    def split_frames(cls, data) -> list:
+        """Split a buffer of complete request frames; raises ValueError if one is truncated."""
+        frames = []
+        view = memoryview(data)
+        start = 0
+        while start < len(view):
+            end = start + 2
+            if end <= len(view):
+                end += (view[start] << 8) | view[start + 1]
+            if end > len(view):
+                raise ValueError("Truncated frame in batch")
+            frames.append(bytes(view[start + 2:end]))
+            start = end
+        return frames
@@ -0,0 +1,58 @@
+class CommandArgumentError(ValueError):
+    """A command matched but one of its arguments could not be converted."""
+
+
+class CommandRouter:
+    """Token trie built once from the command table.
+
+    ``route`` walks the tokens of a command line a single time and returns
+    the handler of the longest matching command together with its
+    arguments, converted with the per-command argument spec.
+    """
+
+    _HANDLER = object()  # trie key holding (handler, converters) for a complete command
+
+    def __init__(self, dispatch: dict, arguments: dict = None):
+        # dispatch: "channel set" -> handler; arguments: "channel set" -> [(convert, error message)]
+        arguments = arguments or {}
+        self._root = {}
+        self._max_depth = 0
+        self._max_args = 0
+        for command, handler in dispatch.items():
+            tokens = command.split()
+            node = self._root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            converters = tuple(arguments.get(command, ()))
+            node[self._HANDLER] = (handler, converters)
+            self._max_depth = max(self._max_depth, len(tokens))
+            self._max_args = max(self._max_args, len(converters))
+
+    def route(self, text: str):
+        """Return ``(handler, args)`` for ``text``, or ``None`` if no command matches.
+
+        Raises CommandArgumentError if an argument has the wrong type.
+        """
+        # Split no further than the longest command plus its arguments, so long
+        # junk input is never tokenized in full.
+        tokens = text.split(None, self._max_depth + self._max_args)
+        node = self._root
+        match = None
+        for depth, token in enumerate(tokens):
+            node = node.get(token)
+            if node is None:
+                break
+            entry = node.get(self._HANDLER)
+            if entry is not None:
+                match = (entry, depth + 1)
+        if match is None:
+            return None
+
+        (handler, converters), length = match
+        args = tokens[length:]
+        for i, (convert, error) in enumerate(converters[:len(args)]):
+            try:
+                args[i] = convert(args[i])
+            except ValueError:
+                raise CommandArgumentError(error) from None
+        return handler, args
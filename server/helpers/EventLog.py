@@ -0,0 +1,63 @@
+import json
+import sys
+import threading
+import time
+
+
+class EventLog:
+    """Structured, sampled event log: one JSON object per line.
+
+    Every event name gets at most ``burst`` lines per ``interval`` seconds;
+    the rest are counted, and the next line written for that event carries
+    a ``suppressed`` field. A storm of connects or errors therefore costs a
+    dict lookup and a counter per event instead of a write to stdout.
+    Events below ``level`` are dropped before any work is done.
+    """
+
+    LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+    def __init__(self, level: str = "info", burst: int = 20, interval: float = 1.0, stream=None,
+                 clock=time.monotonic):
+        self.threshold = self.LEVELS[level]
+        self.burst = burst
+        self.interval = interval
+        self.stream = stream  # None: sys.stdout at write time
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._windows = {}  # event -> [window start, lines written in window, suppressed]
+
+    def debug(self, event: str, **fields):
+        self._emit(10, "debug", event, fields)
+
+    def info(self, event: str, **fields):
+        self._emit(20, "info", event, fields)
+
+    def warning(self, event: str, **fields):
+        self._emit(30, "warning", event, fields)
+
+    def error(self, event: str, **fields):
+        self._emit(40, "error", event, fields)
+
+    def _emit(self, severity: int, level: str, event: str, fields: dict):
+        if severity < self.threshold:
+            return
+        now = self.clock()
+        with self._lock:
+            window = self._windows.get(event)
+            if window is None:
+                window = self._windows[event] = [now, 0, 0]
+            elif now - window[0] >= self.interval:
+                window[0], window[1] = now, 0
+            if window[1] >= self.burst:
+                window[2] += 1
+                return
+            window[1] += 1
+            suppressed, window[2] = window[2], 0
+
+        record = {"ts": round(time.time(), 6), "level": level, "event": event}
+        record.update(fields)
+        if suppressed:
+            record["suppressed"] = suppressed
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            (self.stream or sys.stdout).write(line)
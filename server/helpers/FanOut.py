@@ -0,0 +1,63 @@
+import threading
+
+
+class FanOut:
+    """Subscriber set that delivers one pre-encoded payload to every member.
+
+    Membership changes happen under a lock and invalidate a cached tuple
+    snapshot, so ``publish`` hands an immutable copy to ``deliver`` and never
+    holds the lock while doing I/O. ``deliver`` is called once per publish
+    with the whole snapshot (one loop per transport, no call per
+    subscriber), and the same ``bytes`` object goes to every subscriber.
+    """
+
+    def __init__(self, deliver):
+        # deliver(subscribers, payload, exclude) -> int sends to every subscriber
+        # but ``exclude`` and returns how many it sent to.
+        self.deliver = deliver
+        self._lock = threading.Lock()
+        self._members = set()
+        self._snapshot = ()
+
+    def add(self, subscriber):
+        if subscriber in self._members:
+            return
+        with self._lock:
+            self._members.add(subscriber)
+            self._snapshot = None
+
+    def remove(self, subscriber) -> bool:
+        """Remove ``subscriber``; returns False if it was not a member."""
+        with self._lock:
+            if subscriber not in self._members:
+                return False
+            self._members.remove(subscriber)
+            self._snapshot = None
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._members.clear()
+            self._snapshot = ()
+
+    def snapshot(self) -> tuple:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = tuple(self._members)
+                snapshot = self._snapshot
+        return snapshot
+
+    def publish(self, payload: bytes, exclude=None) -> int:
+        """Deliver ``payload`` to every subscriber except ``exclude``; returns the count."""
+        return self.deliver(self.snapshot(), payload, exclude)
+
+    def __contains__(self, subscriber):
+        return subscriber in self._members
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def __len__(self):
+        return len(self._members)
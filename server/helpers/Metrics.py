@@ -0,0 +1,144 @@
+import bisect
+import time
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (seconds), Prometheus style."""
+
+    BOUNDS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0  # reported for quantiles in the +Inf bucket
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (0 when empty).
+
+        Past the last bound, the largest observation: the stats JSON must
+        stay finite for strict parsers.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.BOUNDS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000,
+        }
+
+
+class Metrics:
+    """Counters and histograms updated on the hot path.
+
+    Updates are plain attribute and list increments without a lock: under
+    the threaded transports an increment can very rarely be lost, which is
+    the price for keeping instrumentation off the critical path. Gauges
+    (connections, queue depths) are read from the server when a snapshot
+    is taken instead of being maintained per event.
+    """
+
+    TRANSPORTS = ("tcp", "udp")
+    # Per-client outbound queue series: name, type, OutboundQueue.stats() field, help
+    OUTBOX_METRICS = (
+        ("client_outbox_messages", "gauge", "depth", "Messages queued for one TCP client"),
+        ("client_outbox_bytes", "gauge", "bytes", "Bytes queued for one TCP client"),
+        ("client_outbox_dropped_total", "counter", "dropped", "Notifications dropped for one TCP client"),
+    )
+    BOUND_LABELS = tuple(f"{b:g}" for b in Histogram.BOUNDS) + ("+Inf",)
+
+    def __init__(self, commands):
+        self.started = time.time()
+        self.commands = {command: Histogram() for command in commands}
+        self.unsupported = 0
+        self.errors = 0
+        self.bytes_in = dict.fromkeys(self.TRANSPORTS, 0)
+        self.bytes_out = dict.fromkeys(self.TRANSPORTS, 0)
+        self.connections = 0
+        self.refused = 0        # connections turned away by admission control
+        self.rate_limited = 0   # commands rejected by the per-IP rate limit
+        self.idle_timeouts = 0  # sessions disconnected for sending nothing
+        self.broadcasts = Histogram()  # time to hand one notification to every subscriber
+        self.deliveries = 0
+
+    def snapshot(self, gauges: dict, outboxes: dict = None) -> dict:
+        """Everything as plain data (the ``stats`` command's JSON); ``outboxes`` maps clients to queue stats."""
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "commands": {name: h.summary() for name, h in self.commands.items() if h.count},
+            "unsupported": self.unsupported,
+            "errors": self.errors,
+            "bytes_in": dict(self.bytes_in),
+            "bytes_out": dict(self.bytes_out),
+            "connections_total": self.connections,
+            "refused": self.refused,
+            "rate_limited": self.rate_limited,
+            "idle_timeouts": self.idle_timeouts,
+            "broadcasts": self.broadcasts.summary(),
+            "deliveries": self.deliveries,
+            **gauges,
+            "outboxes": outboxes or {},
+        }
+
+    def prometheus(self, gauges: dict, outboxes: dict = None) -> str:
+        """Render in the Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP smarttv_{name} {help_text}")
+            lines.append(f"# TYPE smarttv_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"smarttv_{name}{labels} {value}")
+
+        def histogram_samples(h, label=""):
+            sep = "," if label else ""
+            cumulative = 0
+            for bound, n in zip(self.BOUND_LABELS, h.counts):
+                cumulative += n
+                yield f'_bucket{{{label}{sep}le="{bound}"}}', cumulative
+            yield f"_sum{{{label}}}" if label else "_sum", h.sum
+            yield f"_count{{{label}}}" if label else "_count", h.count
+
+        metric("command_seconds", "histogram", "Time to run one command, by command",
+               [s for name, h in self.commands.items() for s in histogram_samples(h, f'command="{name}"')])
+        metric("unsupported_commands_total", "counter", "Commands that matched no handler",
+               [("", self.unsupported)])
+        metric("errors_total", "counter", "Handler and socket errors", [("", self.errors)])
+        metric("bytes_received_total", "counter", "Bytes received from clients, by transport",
+               [(f'{{transport="{t}"}}', n) for t, n in self.bytes_in.items()])
+        metric("bytes_sent_total", "counter", "Bytes sent to clients, by transport",
+               [(f'{{transport="{t}"}}', n) for t, n in self.bytes_out.items()])
+        metric("connections_total", "counter", "TCP connections accepted", [("", self.connections)])
+        metric("connections_refused_total", "counter", "TCP connections refused by admission control",
+               [("", self.refused)])
+        metric("rate_limited_total", "counter", "Commands rejected by the per-IP rate limit",
+               [("", self.rate_limited)])
+        metric("idle_timeouts_total", "counter", "TCP sessions closed after IDLE_TIMEOUT of silence",
+               [("", self.idle_timeouts)])
+        metric("broadcast_seconds", "histogram", "Time to fan one notification out to every subscriber",
+               list(histogram_samples(self.broadcasts)))
+        metric("deliveries_total", "counter", "Notifications handed to subscribers", [("", self.deliveries)])
+        for name, value in gauges.items():
+            metric(name, "gauge", name.replace("_", " ").capitalize(), [("", value)])
+        outboxes = outboxes or {}
+        for name, kind, field, help_text in self.OUTBOX_METRICS:
+            metric(name, kind, help_text,
+                   [(f'{{client="{client}"}}', stats[field]) for client, stats in outboxes.items()])
+        return "\n".join(lines) + "\n"
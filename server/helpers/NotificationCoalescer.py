@@ -0,0 +1,68 @@
+import threading
+
+
+class NotificationCoalescer:
+    """Merges state-change notifications that arrive within a short window.
+
+    The first notification for a key opens a window of ``window`` seconds;
+    later notifications for the same key only replace the pending message.
+    When the window closes the latest message is published once. The sender
+    is excluded only if every change in the window came from the same client.
+    A window of 0 publishes immediately.
+    """
+
+    _MIXED = object()  # changes in the window came from different clients
+
+    def __init__(self, window: float, publish, call_later):
+        # publish(message, exclude=...) sends; call_later(delay, fn) schedules the flush.
+        self.window = window
+        self.publish = publish
+        self.call_later = call_later
+        self._lock = threading.Lock()
+        self._pending = {}  # key -> [message, origin]
+
+        self.submitted = 0
+        self.published = 0
+
+    def submit(self, key, message: str, exclude=None):
+        self.submitted += 1
+        if self.window <= 0:
+            self.published += 1
+            self.publish(message, exclude=exclude)
+            return
+
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = [message, exclude]
+                schedule = True
+            else:
+                pending[0] = message
+                if not _same_origin(pending[1], exclude):
+                    pending[1] = self._MIXED
+                schedule = False
+        if schedule:
+            self.call_later(self.window, lambda: self._flush(key))
+
+    def flush_all(self):
+        """Publish everything still pending right away."""
+        with self._lock:
+            keys = list(self._pending)
+        for key in keys:
+            self._flush(key)
+
+    def _flush(self, key):
+        with self._lock:
+            pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        message, origin = pending
+        self.published += 1
+        self.publish(message, exclude=None if origin is self._MIXED else origin)
+
+
+def _same_origin(a, b) -> bool:
+    # UDP requests arrive as a fresh connection object per datagram; compare by address.
+    if a is b:
+        return True
+    return a is not None and b is not None and getattr(a, "addr", a) == getattr(b, "addr", b)
@@ -0,0 +1,135 @@
+from collections import deque
+from helpers.BinaryProtocol import BinaryProtocol
+
+
+class SlowConsumerPolicy:
+    """What a session does when its outbound queue reaches the high-water mark."""
+
+    DROP_OLDEST = "drop-oldest"  # discard the oldest queued messages
+    COALESCE = "coalesce"        # keep only the latest channel notification, then drop oldest
+    DISCONNECT = "disconnect"    # give up on the client
+
+    ALL = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+
+# Channel notifications supersede each other, so only the newest one matters.
+# Prefixes of the text and binary forms (bytes.startswith accepts a tuple).
+CHANNEL_NOTIFICATION = (b"[Notification] Channel changed to", BinaryProtocol.CHANNEL_NOTIFICATION)
+
+
+class OutboundQueue:
+    """Bounded queue of encoded messages waiting to be written to one client.
+
+    Entries are ``(data, is_notification)``: only notifications are ever
+    dropped or coalesced. Replies count towards the limits (callers wait
+    for room) but stay queued, in order, until written.
+    Not thread-safe on its own; the owning session serializes access.
+    """
+
+    def __init__(self, max_messages: int, max_bytes: int, policy: str):
+        if policy not in SlowConsumerPolicy.ALL:
+            raise ValueError(f"Unknown slow-consumer policy: {policy}")
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.messages = deque()
+        self.size = 0
+
+        # Per-session counters
+        self.enqueued = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.overflows = 0
+        self.peak_depth = 0
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __bool__(self):
+        return bool(self.messages)
+
+    def has_room(self, incoming: int) -> bool:
+        return not self._over_limit(incoming)
+
+    def push(self, data: bytes) -> bool:
+        """Queue the notification ``data``. Returns False if the client should be disconnected."""
+        if self._over_limit(len(data)):
+            self.overflows += 1
+            if self.policy == SlowConsumerPolicy.DISCONNECT:
+                return False
+            if self.policy == SlowConsumerPolicy.COALESCE and data.startswith(CHANNEL_NOTIFICATION):
+                self._drop_channel_notifications()
+            self._drop_oldest_notifications(len(data))
+            if self._over_limit(len(data)):
+                self.dropped += 1  # only replies are queued: the new notification goes instead
+                return True
+
+        self._append(data, True)
+        return True
+
+    def push_reply(self, data: bytes):
+        """Queue a direct reply. Replies bypass the policy; callers apply backpressure instead."""
+        self._append(data, False)
+
+    def _append(self, data: bytes, is_notification: bool):
+        self.messages.append((data, is_notification))
+        self.size += len(data)
+        self.enqueued += 1
+        if len(self.messages) > self.peak_depth:
+            self.peak_depth = len(self.messages)
+
+    def take(self, limit: int) -> list:
+        """Pop queued messages up to ``limit`` bytes (always at least one)."""
+        messages = self.messages
+        batch = [messages.popleft()[0]]
+        size = len(batch[0])
+        while messages and size + len(messages[0][0]) <= limit:
+            msg = messages.popleft()[0]
+            batch.append(msg)
+            size += len(msg)
+        self.size -= size
+        return batch
+
+    def clear(self):
+        self.messages.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self.messages),
+            "bytes": self.size,
+            "peak_depth": self.peak_depth,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "overflows": self.overflows,
+        }
+
+    def _over_limit(self, incoming: int) -> bool:
+        return (len(self.messages) + 1 > self.max_messages
+                or self.size + incoming > self.max_bytes)
+
+    def _drop_channel_notifications(self):
+        kept = deque()
+        for entry in self.messages:
+            msg, is_notification = entry
+            if is_notification and msg.startswith(CHANNEL_NOTIFICATION):
+                self.size -= len(msg)
+                self.coalesced += 1
+            else:
+                kept.append(entry)
+        self.messages = kept
+
+    def _drop_oldest_notifications(self, incoming: int):
+        """Drop notifications, oldest first, until ``incoming`` bytes fit; replies are kept."""
+        kept = deque()
+        depth, size = len(self.messages), self.size
+        for entry in self.messages:
+            msg, is_notification = entry
+            if is_notification and (depth + 1 > self.max_messages or size + incoming > self.max_bytes):
+                depth -= 1
+                size -= len(msg)
+                self.dropped += 1
+            else:
+                kept.append(entry)
+        self.messages, self.size = kept, size
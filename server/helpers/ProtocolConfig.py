@@ -9,4 +9,27 @@ class Protocol:
         "CHANNEL_DOWN": "channel down",
         "CHANNEL_UP": "channel up",
         "QUIT": "quit",
-    }
\ No newline at end of file
+        "SUBSCRIBE": "subscribe",
+        "HEARTBEAT": "heartbeat",
+        "SELECT": "select",
+        "BATCH": "batch",
+        "STATS": "stats",
+        "UNSUBSCRIBE": "unsubscribe",
+    }
+
+    # Notification topics: "subscribe [<topic> ...]" and "unsubscribe [<topic> ...]"
+    # (no topic means all of them)
+    TOPICS = ("channel", "power")
+
+    # "@<id> <command>" tags a request; every reply to it starts with "@<id> "
+    REQUEST_ID_PREFIX = "@"
+    # "batch <command>; <command>; ..." runs the commands in order
+    BATCH_SEPARATOR = ";"
+
+    # Typed positional arguments per command: (converter, error message on bad input)
+    ARGUMENTS = {
+        COMMANDS["CHANNEL_SET"]: [(int, "Channel must be an integer")],
+    }
+
+    # One-byte opcodes of the binary protocol (see BinaryProtocol), in command table order
+    OPCODES = {command: opcode for opcode, command in enumerate(COMMANDS.values(), start=1)}
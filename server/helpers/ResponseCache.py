@@ -0,0 +1,57 @@
+from helpers.Colors import Colors
+from helpers.BinaryProtocol import BinaryProtocol, Notification
+
+
+class ResponseCache:
+    """Reply lines and notifications, encoded once and reused.
+
+    ``encode`` maps a reply message (and whether it reports success) to the
+    exact bytes a text client receives: colored, newline-terminated, UTF-8.
+    The messages come from fixed strings and the tables of
+    ``SmartTvLogic.channel_messages``, so the cache fills within the first
+    few requests and then every reply is a dict lookup. Messages with
+    arbitrary content (device ids, out-of-range channels) stop being cached
+    once ``max_entries`` is reached.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._tables = {None: {}, True: {}, False: {}}  # ok -> message -> bytes
+        self._notifications = {}  # channel -> Notification
+        self._power = {
+            is_on: Notification(f"[Notification] Smart TV turned {'on' if is_on else 'off'}\n".encode("utf-8"),
+                                BinaryProtocol.power_notification(is_on))
+            for is_on in (False, True)
+        }
+        self._size = 0
+
+    def encode(self, message: str, ok: bool = None) -> bytes:
+        """Bytes for ``message``: uncolored when ``ok`` is None, else colorized like Colors.colorize."""
+        table = self._tables[ok]
+        data = table.get(message)
+        if data is None:
+            text = message if ok is None else Colors.colorize(message, ok)
+            if not text.endswith("\n"):
+                text += "\n"
+            data = text.encode("utf-8")
+            if self._size < self.max_entries:
+                table[message] = data
+                self._size += 1
+        return data
+
+    def channel_notification(self, channel: int) -> Notification:
+        """Text and binary encodings of the channel-change notification for ``channel``."""
+        notification = self._notifications.get(channel)
+        if notification is None:
+            notification = Notification(f"[Notification] Channel changed to {channel}\n".encode("utf-8"),
+                                        BinaryProtocol.notification(channel))
+            if len(self._notifications) < self.max_entries:
+                self._notifications[channel] = notification
+        return notification
+
+    def power_notification(self, is_on: bool) -> Notification:
+        """Text and binary encodings of the power on/off notification."""
+        return self._power[is_on]
+
+    def __len__(self):
+        return self._size + len(self._notifications)
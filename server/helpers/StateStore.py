@@ -0,0 +1,205 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from SmartTvLogic import TvState
+
+
+class StateStore:
+    """Keeps TV states on disk so a restarted server comes back where it left off.
+
+    ``attach`` restores a TV from what was recovered and hooks its
+    ``on_change``; from then on every committed state goes to ``record``,
+    which runs on the command path and must never touch the disk. The
+    default device is stored under the id "".
+    """
+
+    def __init__(self):
+        self.recovered = {}  # device id -> TvState found on disk at startup
+
+    def attach(self, device_id, smart_tv):
+        key = "" if device_id is None else str(device_id)
+        state = self.recovered.get(key)
+        if state is not None:
+            smart_tv.restore(state)
+        smart_tv.on_change = lambda new, key=key: self.record(key, new)
+
+    def record(self, key: str, state: TvState):
+        raise NotImplementedError
+
+    def close(self):
+        """Write out everything recorded so far."""
+
+
+# One state per record: crc32 of the rest, id length, is_on, channel, version, then the id (UTF-8)
+_RECORD = struct.Struct("!IH?Hq")
+
+
+def _encode(key: str, state: TvState) -> bytes:
+    ident = key.encode("utf-8")
+    body = _RECORD.pack(0, len(ident), state.is_on, state.active_channel, state.version)[4:] + ident
+    return struct.pack("!I", zlib.crc32(body)) + body
+
+
+def _decode_all(data: bytes, into: dict) -> int:
+    """Apply every intact record of ``data`` to ``into``; returns the length of the intact prefix."""
+    offset = 0
+    while offset + _RECORD.size <= len(data):
+        crc, length, is_on, channel, version = _RECORD.unpack_from(data, offset)
+        end = offset + _RECORD.size + length
+        if end > len(data) or zlib.crc32(data[offset + 4:end]) != crc:
+            break  # torn or corrupt tail: a crash during the last write
+        into[data[offset + _RECORD.size:end].decode("utf-8")] = TvState(is_on, channel, version)
+        offset = end
+    return offset
+
+
+class ChangeLogStore(StateStore):
+    """Append-only change log plus a compacted snapshot, written by a background thread.
+
+    ``record`` only puts the state in a dict of pending changes (so a TV
+    changed 50 times between two writes costs one record) and wakes the
+    writer. The writer appends pending states to ``<path>.log`` in one
+    write, fsyncs at most every ``sync_interval`` seconds, and once the log
+    exceeds ``compact_bytes`` writes every device's latest state to
+    ``<path>.snapshot`` (temp file, fsync, rename) and starts a new log.
+    Recovery reads the snapshot, then the log up to its last intact record.
+    """
+
+    def __init__(self, path: str, sync_interval: float = 1.0, compact_bytes: int = 4 * 1024 * 1024):
+        super().__init__()
+        self.snapshot_path = path + ".snapshot"
+        self.log_path = path + ".log"
+        self.sync_interval = sync_interval
+        self.compact_bytes = compact_bytes
+
+        for file_path in (self.snapshot_path, self.log_path):
+            if os.path.exists(file_path):
+                with open(file_path, "rb") as f:
+                    data = f.read()
+                intact = _decode_all(data, self.recovered)
+                if file_path == self.log_path and intact < len(data):
+                    os.truncate(file_path, intact)  # drop the torn tail before appending to it
+        self.latest = dict(self.recovered)  # writer thread only
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closing = False
+        self._log = open(self.log_path, "ab")
+        self._writer = threading.Thread(target=self._write_loop, name="state-writer", daemon=True)
+        self._writer.start()
+
+    def record(self, key: str, state: TvState):
+        with self._lock:
+            wake = not self._pending
+            self._pending[key] = state
+        if wake:
+            self._wakeup.set()
+
+    def close(self):
+        self._closing = True
+        self._wakeup.set()
+        self._writer.join()
+
+    def _write_loop(self):
+        unsynced, synced_at = False, time.monotonic()
+        while not self._closing:
+            # Woken by the first pending change; wake up anyway to fsync what is unsynced.
+            self._wakeup.wait(self.sync_interval if unsynced else None)
+            self._wakeup.clear()
+            unsynced = self._append() or unsynced
+            if unsynced and time.monotonic() - synced_at >= self.sync_interval:
+                os.fsync(self._log.fileno())
+                unsynced, synced_at = False, time.monotonic()
+        self._append()
+        os.fsync(self._log.fileno())
+        self._log.close()
+
+    def _append(self) -> bool:
+        """Hand pending states to the OS (a process crash no longer loses them); fsync is separate."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return False
+        self._log.write(b"".join(_encode(key, state) for key, state in pending.items()))
+        self._log.flush()
+        self.latest.update(pending)
+        if self._log.tell() >= self.compact_bytes:
+            self._compact()
+        return True
+
+    def _compact(self):
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(_encode(key, state) for key, state in self.latest.items()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        # A crash before the truncate only replays records the snapshot already holds.
+        self._log.close()
+        self._log = open(self.log_path, "wb")
+
+
+class MmapStateFile(StateStore):
+    """The single TV's state as a fixed-size record in a memory-mapped file.
+
+    ``record`` is a struct.pack_into the mapping: no system call, so it is
+    cheap enough to run inline. The two slots are written alternately,
+    each with its own CRC, so a crash mid-write leaves the other slot
+    intact; recovery takes the valid slot with the higher version. The
+    kernel writes dirty pages back on its own; a background thread
+    msyncs every ``sync_interval`` seconds to bound what a power loss
+    can take.
+    """
+
+    _SLOT = struct.Struct("!I?Hq")  # crc32 of the rest, is_on, channel, version
+
+    def __init__(self, path: str, sync_interval: float = 1.0):
+        super().__init__()
+        size = 2 * self._SLOT.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        newest = None
+        for slot in range(2):
+            crc, is_on, channel, version = self._SLOT.unpack_from(self._map, slot * self._SLOT.size)
+            body = self._map[slot * self._SLOT.size + 4:(slot + 1) * self._SLOT.size]
+            if crc == zlib.crc32(body) and channel and (newest is None or version > newest.version):
+                newest = TvState(is_on, channel, version)
+        if newest is not None:
+            self.recovered[""] = newest
+
+        self.sync_interval = sync_interval
+        self._closed = threading.Event()
+        threading.Thread(target=self._sync_loop, name="state-msync", daemon=True).start()
+
+    def attach(self, device_id, smart_tv):
+        if device_id is not None:
+            raise ValueError("MmapStateFile holds the single TV of a classic server; use ChangeLogStore for a fleet")
+        super().attach(device_id, smart_tv)
+
+    def record(self, key: str, state: TvState):
+        offset = (state.version % 2) * self._SLOT.size
+        self._SLOT.pack_into(self._map, offset, 0, state.is_on, state.active_channel, state.version)
+        struct.pack_into("!I", self._map, offset,
+                         zlib.crc32(self._map[offset + 4:offset + self._SLOT.size]))
+
+    def close(self):
+        self._closed.set()
+        self._map.flush()
+        self._map.close()
+
+    def _sync_loop(self):
+        while not self._closed.wait(self.sync_interval):
+            try:
+                self._map.flush()
+            except ValueError:
+                return  # closed meanwhile
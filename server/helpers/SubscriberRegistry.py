@@ -0,0 +1,93 @@
+import heapq
+import time
+from helpers.FanOut import FanOut
+
+
+class SubscriberRegistry(FanOut):
+    """FanOut for connectionless subscribers that expire after ``ttl`` seconds of silence.
+
+    Every datagram refreshes its sender's last-seen time with a single dict
+    write, under the lock so a refresh cannot race an eviction. Expiry is
+    lazy: a min-heap holds at most one deadline per subscriber, and
+    ``expire`` (run before every publish) only looks at the deadlines that
+    have passed, re-arming those that were refreshed since.
+    """
+
+    def __init__(self, deliver, ttl: float, clock=time.monotonic):
+        super().__init__(deliver)
+        self.ttl = ttl
+        self.clock = clock
+        self._last_seen = {}
+        self._deadlines = []  # heap of (deadline, subscriber)
+        self._armed = {}      # subscriber -> its one valid deadline in the heap
+        self.evicted = 0
+
+    def add(self, subscriber):
+        """Register ``subscriber`` or refresh its last-seen time."""
+        now = self.clock()
+        with self._lock:
+            if subscriber not in self._last_seen:
+                self._arm(subscriber, now + self.ttl)
+                self._members.add(subscriber)
+                self._snapshot = None
+            self._last_seen[subscriber] = now
+
+    touch = add
+
+    def live(self, subscriber, now=None) -> bool:
+        """Whether ``subscriber`` was seen within ``ttl``, whether or not expire() has run since."""
+        seen = self._last_seen.get(subscriber)
+        return seen is not None and seen + self.ttl > (self.clock() if now is None else now)
+
+    def remove(self, subscriber) -> bool:
+        with self._lock:
+            self._last_seen.pop(subscriber, None)
+            self._armed.pop(subscriber, None)
+        return super().remove(subscriber)
+
+    def clear(self):
+        with self._lock:
+            self._last_seen.clear()
+            self._deadlines.clear()
+            self._armed.clear()
+        super().clear()
+
+    def expire(self, now=None) -> int:
+        """Drop subscribers not seen for ``ttl`` seconds; returns how many were dropped."""
+        now = self.clock() if now is None else now
+        deadlines = self._deadlines
+        if not deadlines or deadlines[0][0] > now:
+            return 0
+        expired = 0
+        with self._lock:
+            while deadlines and deadlines[0][0] <= now:
+                deadline, subscriber = heapq.heappop(deadlines)
+                if self._armed.get(subscriber) != deadline:
+                    continue  # stale entry (removed or re-armed since)
+                seen = self._last_seen[subscriber]
+                if seen + self.ttl <= now:
+                    del self._last_seen[subscriber]
+                    del self._armed[subscriber]
+                    self._members.discard(subscriber)
+                    self._snapshot = None
+                    expired += 1
+                else:
+                    self._arm(subscriber, seen + self.ttl)
+            self.evicted += expired
+        return expired
+
+    def _arm(self, subscriber, deadline):
+        self._armed[subscriber] = deadline
+        heapq.heappush(self._deadlines, (deadline, subscriber))
+
+    def publish(self, payload: bytes, exclude=None) -> int:
+        self.expire()
+        return super().publish(payload, exclude)
+
+    def stats(self) -> dict:
+        return {
+            "live": len(self),
+            "evicted": self.evicted,
+            "pending_deadlines": len(self._deadlines),
+            "ttl": self.ttl,
+        }
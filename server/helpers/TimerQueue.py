@@ -0,0 +1,66 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class TimerQueue:
+    """Runs delayed callbacks for the threaded transports on one shared thread.
+
+    A threading.Timer per call costs a thread per pending callback (one per
+    open notification window, so one per busy TV in fleet mode). Here the
+    callbacks wait in a heap ordered by due time and a single daemon thread,
+    started on first use, sleeps on a condition until the earliest is due.
+    Callbacks run one after another, so they should be short.
+    """
+
+    def __init__(self, name: str = "timers", on_error=None, clock=time.monotonic):
+        # on_error() is called inside the except block when a callback raises
+        self.name = name
+        self.on_error = on_error
+        self.clock = clock
+        self._wakeup = threading.Condition(threading.Lock())
+        self._heap = []  # (due, sequence, callback)
+        self._sequence = itertools.count()  # equal due times run in call order
+        self._thread = None
+        self._stopped = False
+
+    def call_later(self, delay: float, callback):
+        """Run ``callback`` on the timer thread in ``delay`` seconds."""
+        with self._wakeup:
+            if self._stopped:
+                return
+            sequence = next(self._sequence)
+            heapq.heappush(self._heap, (self.clock() + delay, sequence, callback))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            elif self._heap[0][1] == sequence:
+                self._wakeup.notify()  # due before whatever the thread is waiting for
+
+    def __len__(self):
+        return len(self._heap)
+
+    def stop(self):
+        """Drop pending callbacks and end the timer thread."""
+        with self._wakeup:
+            self._stopped = True
+            self._heap.clear()
+            self._wakeup.notify()
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._stopped:
+                    delay = self._heap[0][0] - self.clock() if self._heap else None
+                    if delay is not None and delay <= 0:
+                        break
+                    self._wakeup.wait(delay)
+                if self._stopped:
+                    return
+                callback = heapq.heappop(self._heap)[2]
+            try:
+                callback()
+            except Exception:
+                if self.on_error is not None:
+                    self.on_error()
@@ -0,0 +1,42 @@
+class TopicIndex:
+    """Subscribers per notification topic, one FanOut per topic.
+
+    Publishing to a topic walks only that topic's subscribers, so remotes
+    that never subscribed cost nothing per broadcast. ``make_fanout``
+    builds the per-topic sets: plain FanOuts for TCP sessions,
+    SubscriberRegistries for UDP remotes, which expire when silent.
+    """
+
+    def __init__(self, topics, make_fanout):
+        self.fanouts = {topic: make_fanout() for topic in topics}
+
+    def subscribe(self, subscriber, topics) -> tuple:
+        """Add ``subscriber`` to ``topics``; returns every topic it is now subscribed to."""
+        for topic in topics:
+            self.fanouts[topic].add(subscriber)
+        return self.topics_of(subscriber)
+
+    def unsubscribe(self, subscriber, topics=None) -> tuple:
+        """Remove ``subscriber`` from ``topics`` (default: all); returns the topics it was removed from."""
+        topics = self.fanouts if topics is None else topics
+        return tuple(topic for topic in topics if self.fanouts[topic].remove(subscriber))
+
+    def topics_of(self, subscriber) -> tuple:
+        return tuple(topic for topic, fanout in self.fanouts.items() if subscriber in fanout)
+
+    def touch(self, subscriber):
+        """Refresh ``subscriber``'s last-seen time in the (SubscriberRegistry) topics it is subscribed to."""
+        for fanout in self.fanouts.values():
+            if subscriber in fanout:
+                fanout.touch(subscriber)
+
+    def publish(self, topic, payload, exclude=None) -> int:
+        return self.fanouts[topic].publish(payload, exclude=exclude)
+
+    def clear(self):
+        for fanout in self.fanouts.values():
+            fanout.clear()
+
+    def counts(self) -> dict:
+        """Subscribers per topic."""
+        return {topic: len(fanout) for topic, fanout in self.fanouts.items()}
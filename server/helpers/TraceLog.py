@@ -0,0 +1,114 @@
+import collections
+import json
+import struct
+import threading
+import time
+
+# File header, then one record per event: kind, microseconds since the
+# trace started, connection (or UDP remote) id, payload length, payload.
+MAGIC = b"STVTRACE\x01"
+_RECORD = struct.Struct("!BQII")
+
+
+class TraceKind:
+    OPEN = 1       # a TCP connection sent its first bytes; payload: JSON address
+    DATA = 2       # bytes read from a TCP connection, as one recv() returned them
+    CLOSE = 3      # the TCP connection went away
+    UDP_OPEN = 4   # first datagram from a UDP address; payload: JSON address
+    DATAGRAM = 5   # one UDP datagram
+
+
+# One decoded record; ``time`` is in seconds since the trace started
+TraceEvent = collections.namedtuple("TraceEvent", ["kind", "time", "conn", "payload"])
+
+
+class TraceRecorder:
+    """Writes incoming traffic to a compact binary trace, off the request path.
+
+    Recording packs one record and appends it to a deque (thread-safe, no
+    lock); a background thread writes what accumulated every
+    ``flush_interval`` seconds. Traffic is recorded exactly as read, so a
+    replay sees the same chunking (pipelining, partial lines) as the server.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.1, clock=time.perf_counter_ns):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.start = clock()
+        self.records = 0
+        self._ids = iter(range(1, 2 ** 32)).__next__
+        self._udp_ids = {}  # address -> id
+        self._pending = collections.deque()
+        self._stopped = threading.Event()
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+        self._writer.start()
+
+    def open(self, addr) -> int:
+        """Start recording a TCP connection from ``addr``; returns its id."""
+        conn = self._ids()
+        self._record(TraceKind.OPEN, conn, _address(addr))
+        return conn
+
+    def data(self, conn: int, data):
+        self._record(TraceKind.DATA, conn, bytes(data))
+
+    def close(self, conn: int):
+        self._record(TraceKind.CLOSE, conn, b"")
+
+    def datagram(self, addr, data):
+        conn = self._udp_ids.get(addr)
+        if conn is None:
+            conn = self._udp_ids.setdefault(addr, self._ids())
+            self._record(TraceKind.UDP_OPEN, conn, _address(addr))
+        self._record(TraceKind.DATAGRAM, conn, bytes(data))
+
+    def _record(self, kind, conn, payload: bytes):
+        elapsed = (self.clock() - self.start) // 1000
+        self._pending.append(_RECORD.pack(kind, elapsed, conn, len(payload)) + payload)
+
+    def stop(self):
+        """Write everything recorded so far and close the file."""
+        if not self._stopped.is_set():
+            self._stopped.set()
+            self._writer.join()
+
+    def _write_loop(self):
+        while not self._stopped.wait(self.flush_interval):
+            self._flush()
+        self._flush()
+        self._file.close()
+
+    def _flush(self):
+        pending = self._pending
+        chunks = [pending.popleft() for _ in range(len(pending))]
+        if chunks:
+            self.records += len(chunks)
+            self._file.write(b"".join(chunks))
+            self._file.flush()
+
+
+def _address(addr) -> bytes:
+    return json.dumps(list(addr) if isinstance(addr, tuple) else addr).encode("utf-8")
+
+
+def read_trace(path: str):
+    """Yield the TraceEvents of a trace file in order; a truncated last record is ignored."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a Smart TV trace")
+    offset = len(MAGIC)
+    while offset + _RECORD.size <= len(data):
+        kind, elapsed, conn, length = _RECORD.unpack_from(data, offset)
+        start = offset + _RECORD.size
+        if start + length > len(data):
+            break  # the recorder was killed mid-write
+        payload = data[start:start + length]
+        if kind in (TraceKind.OPEN, TraceKind.UDP_OPEN):
+            address = json.loads(payload)
+            payload = tuple(address) if isinstance(address, list) else address
+        yield TraceEvent(kind, elapsed / 1e6, conn, payload)
+        offset = start + length
@@ -0,0 +1,192 @@
+import asyncio
+import socket
+from .BaseTransport import BaseTransport
+from .SocketOptions import SocketOptions
+
+
+class AsyncioTcpTransport(BaseTransport):
+    """TCP transport that serves every connection on a single asyncio event loop.
+
+    Instead of two threads per remote, each connection is one coroutine
+    driven by ``server.handle_client_async``.
+    """
+
+    def __init__(self, host: str, port: int, server, backlog: int = 1024, reuse_port: bool = False,
+                 nodelay: bool = True, keepalive: bool = True):
+        super().__init__(host, port, server, reuse_port)
+        self.backlog = backlog
+        self.nodelay = nodelay
+        self.keepalive = keepalive
+        self.loop = None
+        self._server = None
+        self._done = None
+        self._connections = set()  # tasks serving a connection
+
+    def start(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._done = self.loop.create_future()
+        self._server = await asyncio.start_server(
+            self._on_connect, sock=self._bind(socket.SOCK_STREAM), backlog=self.backlog,
+        )
+        self.server.log.info("listening", transport="asyncio-tcp", host=self.host, port=self.port,
+                             backlog=self.backlog)
+        self.ready.set()
+        await self._done
+        # Let closing connections finish writing before the loop goes away
+        if self._connections:
+            await asyncio.wait(self._connections, timeout=self.POLL_INTERVAL)
+
+    def stop_accepting(self):
+        super().stop_accepting()
+        if self._server is not None:
+            # Closes this process's handle on the listening socket only
+            self.loop.call_soon_threadsafe(self._server.close)
+
+    def stop(self):
+        super().stop()
+        if self._done is not None:
+            self.loop.call_soon_threadsafe(lambda: self._done.done() or self._done.set_result(None))
+
+    async def _on_connect(self, reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            SocketOptions.tune(sock, self.nodelay, self.keepalive)
+        conn = AsyncioTcpConnection(reader, writer)
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            await self.server.handle_client_async(conn)
+        finally:
+            self._connections.discard(task)
+
+
+class AsyncioTcpConnection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.addr = writer.get_extra_info("peername")
+
+    async def recv(self, buffer_size: int):
+        return await self.reader.read(buffer_size)
+
+    def writelines(self, chunks):
+        """Queue several encoded messages on the stream as one write (never blocks)."""
+        self.writer.write(b"".join(chunks))
+
+    def set_write_limit(self, limit: int):
+        # Pause (and make drain() wait) well before the buffer reaches ``limit``.
+        self.writer.transport.set_write_buffer_limits(high=limit // 2)
+
+    def buffered(self) -> int:
+        """Bytes written to the stream but not yet accepted by the kernel."""
+        return self.writer.transport.get_write_buffer_size()
+
+    async def drain(self):
+        await self.writer.drain()
+
+    def send(self, data: str):
+        self.writer.write((data + "\n").encode())
+
+    def refuse(self, data: bytes):
+        """Final message, then close once it is written (never blocks)."""
+        self.writer.write(data)
+        self.writer.close()
+
+    def stop_reading(self):
+        """Take no more data; a pending recv returns what is buffered, then end-of-stream."""
+        self.writer.transport.pause_reading()
+        self.reader.feed_eof()
+
+    def abort(self):
+        self.writer.transport.abort()
+
+    def close(self):
+        self.writer.close()
+
+    async def wait_closed(self):
+        """Wait until everything written has been sent and the socket is closed."""
+        try:
+            await self.writer.wait_closed()
+        except OSError:
+            pass
+
+
+class AsyncioUdpTransport(BaseTransport):
+    """UDP transport built on an asyncio datagram endpoint."""
+
+    def __init__(self, host: str, port: int, server, reuse_port: bool = False):
+        super().__init__(host, port, server, reuse_port)
+        self.server_socket = None
+        self.loop = None
+        self._endpoint = None
+        self._done = None
+
+    def start(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._done = self.loop.create_future()
+        transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self), sock=self._bind(socket.SOCK_DGRAM),
+        )
+        self._endpoint = transport
+        # Exposed under the same name as a plain socket so broadcast() can sendto().
+        self.server_socket = _DatagramSocket(transport)
+        self.server.log.info("listening", transport="asyncio-udp", host=self.host, port=self.port)
+        self.ready.set()
+        try:
+            await self._done
+        finally:
+            transport.close()
+
+    def stop_accepting(self):
+        super().stop_accepting()
+        if self._endpoint is not None:
+            # Replies and broadcasts can still be sent
+            self.loop.call_soon_threadsafe(self._endpoint.pause_reading)
+
+    def stop(self):
+        super().stop()
+        if self._done is not None:
+            self.loop.call_soon_threadsafe(lambda: self._done.done() or self._done.set_result(None))
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, owner):
+        self.owner = owner
+
+    def datagram_received(self, data, addr):
+        conn = UdpDatagram(self.owner.server_socket, addr, data)
+        self.owner.server.handle_client(conn)
+
+
+class _DatagramSocket:
+    """Minimal socket-like wrapper so asyncio datagrams share the UDP send code."""
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def sendto(self, data: bytes, addr):
+        self.transport.sendto(data, addr)
+
+
+class UdpDatagram:
+    def __init__(self, server_socket, addr, data):
+        self.server_socket = server_socket
+        self.addr = addr
+        self._data = data
+
+    def recv(self, buffer_size: int):
+        data, self._data = self._data, b""
+        return data[:buffer_size]
+
+    def send(self, data: str):
+        self.server_socket.sendto((data + "\n").encode(), self.addr)
+
+    def close(self):
+        # nothing to close for UDP
+        pass
@@ -1,8 +1,58 @@
+import select
+import socket
+import threading
+
+
 class BaseTransport:
-    def __init__(self, host: str, port: int, server):
+    # Threaded transports wake up this often to notice stop_accepting()
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, host: str, port: int, server, reuse_port: bool = False):
         self.host = host
         self.port = port
         self.server = server
+        # SO_REUSEPORT lets several worker processes bind the same address
+        self.reuse_port = reuse_port
+        # Hot restart: a bound socket handed over by the previous process, used instead of binding
+        self.inherited_socket = None
+        self.listener = None           # the bound socket once started (what a hot restart hands over)
+        self.ready = threading.Event()  # set once the transport takes connections or datagrams
+        self.accepting = True
+        self._stopped = threading.Event()
 
     def start(self):
         raise NotImplementedError("Transport must implement start()")
+
+    def stop_accepting(self):
+        """Stop taking new connections (or datagrams); connected clients are unaffected."""
+        self.accepting = False
+
+    def stop(self):
+        """Make start() return."""
+        self.accepting = False
+        self._stopped.set()
+
+    def _readable(self, sock) -> bool:
+        """Wait up to POLL_INTERVAL for ``sock`` to become readable.
+
+        Datagram transports read with MSG_DONTWAIT and call this only when
+        there was nothing to read, so a busy socket costs no extra syscall
+        and stop_accepting() is noticed within POLL_INTERVAL. (A socket
+        timeout would add a poll to every send as well.)
+        """
+        return bool(select.select([sock], [], [], self.POLL_INTERVAL)[0])
+
+    def _bind(self, kind) -> socket.socket:
+        """The inherited socket after a hot restart, else a newly bound one of ``kind``."""
+        sock = self.inherited_socket
+        if sock is None:
+            sock = socket.socket(socket.AF_INET, kind)
+            if kind == socket.SOCK_STREAM:
+                # Rebind right after a restart despite connections left in TIME_WAIT
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind((self.host, self.port))
+        self.port = sock.getsockname()[1]
+        self.listener = sock
+        return sock
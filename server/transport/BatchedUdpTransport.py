@@ -0,0 +1,112 @@
+import queue
+import socket
+import threading
+from .UdpTransport import UdpTransport
+
+
+class UdpReply:
+    """Reply target for one datagram; replies are collected and sent after the batch."""
+
+    __slots__ = ("addr", "outbox", "tag")
+
+    def __init__(self, addr, outbox):
+        self.addr = addr
+        self.outbox = outbox
+        self.tag = None
+
+    def send(self, data: str):
+        if not data.endswith("\n"):
+            data += "\n"
+        self.outbox.append((data.encode(), self.addr))
+
+
+class BatchedUdpTransport(UdpTransport):
+    """High-throughput UDP transport.
+
+    The socket is read with MSG_DONTWAIT into preallocated receive buffers,
+    up to ``batch_size`` datagrams per batch, and the replies of a whole
+    batch are sent back to back afterwards. Only when nothing is queued does
+    the loop wait for the socket to become readable, for at most
+    POLL_INTERVAL, so stop_accepting() is noticed while idle.
+    Python's socket module has no recvmmsg/sendmmsg, so each datagram still
+    costs one recvfrom_into and one sendto, but no per-datagram connection
+    object or extra recvfrom wrapper.
+
+    With ``workers > 0`` datagrams are dispatched to a fixed pool of threads,
+    partitioned by client address so each remote's commands stay in order.
+    Each worker's queue holds at most ``queue_depth`` batches.
+    """
+
+    def __init__(self, host: str, port: int, server, reuse_port: bool = False,
+                 batch_size: int = 64, workers: int = 0, queue_depth: int = 64):
+        super().__init__(host, port, server, reuse_port)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._queues = []
+
+    def start(self):
+        server_socket = self._bind(socket.SOCK_DGRAM)
+        self.server_socket = server_socket  # used by the server to broadcast
+        self.server.log.info("listening", transport="batched-udp", host=self.host, port=self.port)
+
+        for i in range(self.workers):
+            q = queue.Queue(self.queue_depth)
+            self._queues.append(q)
+            threading.Thread(target=self._worker_loop, args=(q,), name=f"udp-worker-{i}", daemon=True).start()
+
+        views = [memoryview(bytearray(self.server.BUFFER_SIZE)) for _ in range(self.batch_size)]
+        first, rest = views[0], views[1:]
+        recv_into = server_socket.recvfrom_into
+
+        self.ready.set()
+        while self.accepting:
+            # Read the first datagram (waiting up to POLL_INTERVAL if there is none), then drain the rest.
+            try:
+                n, addr = recv_into(first, 0, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                self._readable(server_socket)
+                continue
+            except ConnectionError:
+                continue  # ICMP error from an earlier sendto
+            batch = [(bytes(first[:n]), addr)]
+            for view in rest:
+                try:
+                    n, addr = recv_into(view, 0, socket.MSG_DONTWAIT)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except ConnectionError:
+                    continue
+                batch.append((bytes(view[:n]), addr))
+
+            if self._queues:
+                self._dispatch(batch)
+            else:
+                self._process(batch)
+        self._stopped.wait()
+
+    def _dispatch(self, batch):
+        parts = [[] for _ in self._queues]
+        for item in batch:
+            parts[hash(item[1]) % len(parts)].append(item)
+        for q, part in zip(self._queues, parts):
+            if part:
+                q.put(part)  # blocks when the worker is saturated (backpressure)
+
+    def _worker_loop(self, q):
+        while True:
+            self._process(q.get())
+
+    def _process(self, batch):
+        outbox = []
+        for data, addr in batch:
+            self.server.handle_datagram(data, UdpReply(addr, outbox))
+        self._send_all(outbox)
+
+    def _send_all(self, outbox):
+        sendto = self.server_socket.sendto
+        for payload, addr in outbox:
+            try:
+                sendto(payload, addr)
+            except OSError as e:
+                self.server._socket_error("udp_send_error", addr, e)
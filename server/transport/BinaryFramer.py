@@ -0,0 +1,53 @@
+class BinaryFramer:
+    """Incremental framer for length-prefixed binary frames (u16 big-endian length).
+
+    Same contract as LineFramer: ``feed`` returns every complete frame
+    (without its length prefix) and keeps partial frames across reads. A
+    frame longer than ``max_frame_length`` is skipped without buffering it
+    and reported as ``None``.
+    """
+
+    def __init__(self, max_frame_length: int = 1024):
+        self.max_frame_length = max_frame_length
+        self._buf = bytearray()
+        self._skip = 0  # bytes of an over-long frame still to discard
+        self.frames = 0
+        self.too_long = 0
+
+    def feed(self, data):
+        """Add received bytes and return every complete frame."""
+        frames = []
+        buf = self._buf
+        buf += data
+        if self._skip:
+            skipped = min(self._skip, len(buf))
+            del buf[:skipped]
+            self._skip -= skipped
+
+        start = 0
+        end = len(buf)
+        while end - start >= 2:
+            length = (buf[start] << 8) | buf[start + 1]
+            if length > self.max_frame_length:
+                self.too_long += 1
+                frames.append(None)
+                available = end - start - 2
+                if length > available:
+                    self._skip = length - available
+                    start = end
+                    break
+                start += 2 + length
+                continue
+            if end - start - 2 < length:
+                break
+            self.frames += 1
+            frames.append(bytes(memoryview(buf)[start + 2:start + 2 + length]))
+            start += 2 + length
+
+        if start:
+            del buf[:start]
+        return frames
+
+    def pending(self) -> int:
+        """Number of buffered bytes waiting for the rest of their frame."""
+        return len(self._buf)
@@ -0,0 +1,58 @@
+class LineFramer:
+    """Incremental newline framer for a TCP byte stream.
+
+    Bytes that do not yet end in a newline are kept across reads, so a
+    command split over several segments is delivered once, intact. Newlines
+    are located in place with ``bytearray.find``; the consumed prefix is
+    removed once per ``feed`` call rather than once per line.
+
+    A line longer than ``max_line_length`` is discarded up to its newline and
+    reported as ``None`` so the caller can answer with an error.
+    """
+
+    def __init__(self, max_line_length: int = 1024):
+        self.max_line_length = max_line_length
+        self._buf = bytearray()
+        self._scanned = 0        # bytes of _buf already known to contain no newline
+        self._discarding = False  # inside an over-long line, dropping until newline
+        self.lines = 0
+        self.too_long = 0
+
+    def feed(self, data):
+        """Add received bytes and return every complete line (without the newline)."""
+        lines = []
+        buf = self._buf
+        buf += data
+        start = 0
+        end = len(buf)
+        while True:
+            nl = buf.find(b"\n", max(start, self._scanned))
+            if nl < 0:
+                break
+            self._scanned = 0
+            if self._discarding:
+                self._discarding = False
+            elif nl - start > self.max_line_length:
+                self.too_long += 1
+                lines.append(None)
+            else:
+                self.lines += 1
+                lines.append(bytes(memoryview(buf)[start:nl]))
+            start = nl + 1
+
+        if start:
+            del buf[:start]
+        pending = end - start
+        if pending > self.max_line_length:
+            if not self._discarding:
+                self._discarding = True
+                self.too_long += 1
+                lines.append(None)
+            buf.clear()
+            pending = 0
+        self._scanned = pending
+        return lines
+
+    def pending(self) -> int:
+        """Number of buffered bytes waiting for a newline."""
+        return len(self._buf)
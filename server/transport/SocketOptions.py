@@ -0,0 +1,30 @@
+import socket
+
+
+class SocketOptions:
+    """Options applied to every accepted TCP connection."""
+
+    # Keepalive probes: first after this many idle seconds, then every
+    # INTERVAL seconds; the peer is declared dead after COUNT unanswered ones.
+    KEEPALIVE_IDLE = 60
+    KEEPALIVE_INTERVAL = 10
+    KEEPALIVE_COUNT = 5
+
+    @classmethod
+    def tune(cls, sock, nodelay: bool = True, keepalive: bool = True):
+        """Disable Nagle (replies are small and latency bound) and enable keepalive probes.
+
+        ``sock`` is a socket or an asyncio transport's socket wrapper. The
+        per-connection keepalive timings are Linux/BSD options and are
+        skipped where the platform lacks them.
+        """
+        if nodelay:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if keepalive:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            for name, value in (("TCP_KEEPIDLE", cls.KEEPALIVE_IDLE),
+                                ("TCP_KEEPINTVL", cls.KEEPALIVE_INTERVAL),
+                                ("TCP_KEEPCNT", cls.KEEPALIVE_COUNT)):
+                option = getattr(socket, name, None)
+                if option is not None:
+                    sock.setsockopt(socket.IPPROTO_TCP, option, value)
@@ -1,17 +1,41 @@
 import socket
+import time
 from .BaseTransport import BaseTransport
+from .SocketOptions import SocketOptions
 
 class TcpTransport(BaseTransport):
+    # Pause after a failed accept (e.g. out of file descriptors) instead of spinning
+    ACCEPT_ERROR_BACKOFF = 0.1
+
+    def __init__(self, host: str, port: int, server, backlog: int = 1024, reuse_port: bool = False,
+                 nodelay: bool = True, keepalive: bool = True):
+        super().__init__(host, port, server, reuse_port)
+        self.backlog = backlog
+        self.nodelay = nodelay
+        self.keepalive = keepalive
+
     def start(self):
-        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server_socket.bind((self.host, self.port))
-        server_socket.listen()
-        print(f"TCP server listening on {self.host}:{self.port}")
-
-        while True:
-            conn, addr = server_socket.accept()
-            print(f"TCP connection with {addr}")
+        server_socket = self._bind(socket.SOCK_STREAM)
+        server_socket.listen(self.backlog)
+        # The listening socket may be shared with another process during a hot
+        # restart, so accept() polls instead of being woken by shutdown().
+        server_socket.settimeout(self.POLL_INTERVAL)
+        self.server.log.info("listening", transport="tcp", host=self.host, port=self.port, backlog=self.backlog)
+        self.ready.set()
+
+        while self.accepting:
+            try:
+                conn, addr = server_socket.accept()
+                SocketOptions.tune(conn, self.nodelay, self.keepalive)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                self.server.log.warning("accept_error", error=str(e))
+                time.sleep(self.ACCEPT_ERROR_BACKOFF)
+                continue
             self.server.handle_client(TcpConnection(conn, addr))
+        server_socket.close()  # this process's handle only; an inheriting process keeps its own
+        self._stopped.wait()
 
 class TcpConnection:
     def __init__(self, conn, addr):
@@ -21,8 +45,37 @@ class TcpConnection:
     def recv(self, buffer_size: int):
         return self.conn.recv(buffer_size)
 
+    def recv_into(self, buffer):
+        return self.conn.recv_into(buffer)
+
     def send(self, data: str):
         self.conn.sendall((data + "\n").encode())
 
+    def writelines(self, chunks):
+        """Write several encoded messages with a single sendall."""
+        self.conn.sendall(b"".join(chunks))
+
+    def refuse(self, data: bytes):
+        """Best-effort final message without blocking the accept loop, then close."""
+        try:
+            self.conn.send(data, socket.MSG_DONTWAIT)
+        except OSError:
+            pass
+        self.conn.close()
+
+    def stop_reading(self):
+        """Make a blocked recv return end-of-stream; queued replies can still be sent."""
+        try:
+            self.conn.shutdown(socket.SHUT_RD)
+        except OSError:
+            pass
+
+    def abort(self):
+        """Shut the socket down so threads blocked in send/recv wake up."""
+        try:
+            self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
     def close(self):
         self.conn.close()
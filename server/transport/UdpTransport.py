@@ -2,14 +2,26 @@ import socket
 from .BaseTransport import BaseTransport
 
 class UdpTransport(BaseTransport):
+    def __init__(self, host: str, port: int, server, reuse_port: bool = False):
+        super().__init__(host, port, server, reuse_port)
+        self.server_socket = None
+
     def start(self):
-        server_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        server_socket.bind((self.host, self.port))
-        print(f"UDP server listening on {self.host}:{self.port}")
+        server_socket = self._bind(socket.SOCK_DGRAM)
+        self.server_socket = server_socket  # used by the server to broadcast
+        self.server.log.info("listening", transport="udp", host=self.host, port=self.port)
+        self.ready.set()
 
-        while True:
-            data, addr = server_socket.recvfrom(self.server.BUFFER_SIZE)
+        while self.accepting:
+            try:
+                data, addr = server_socket.recvfrom(self.server.BUFFER_SIZE, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                self._readable(server_socket)  # only wait when there is nothing to read
+                continue
+            except ConnectionError:
+                continue  # ICMP error from an earlier sendto
             self.server.handle_client(UdpConnection(server_socket, addr, data))
+        self._stopped.wait()
 
 class UdpConnection:
     def __init__(self, server_socket, addr, initial_data):